@@ -0,0 +1,256 @@
+"""snapshot store
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "3f1c2a9d7b10"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The columns are spelled out as they were when the store was added, later changes to the collections come with
+    # their own revision.
+    op.create_table(
+        "fpl_snapshots",
+        sa.Column("player_id", sa.Integer(), nullable=False),
+        sa.Column("gameweek", sa.Integer(), nullable=False),
+        sa.Column("snapshot_date", sa.Date(), nullable=False),
+        sa.Column("name", sa.Text()),
+        sa.Column("display_slug", sa.Text()),
+        sa.Column("team_id", sa.Integer()),
+        sa.Column("team", sa.Text()),
+        sa.Column("team_slug", sa.Text()),
+        sa.Column("position", sa.Text()),
+        sa.Column("points_per_game", sa.Float()),
+        sa.Column("form", sa.Float()),
+        sa.Column("news", sa.Text()),
+        sa.Column("news_added_at", sa.Text()),
+        sa.Column("status", sa.Text()),
+        sa.Column("total_points", sa.Integer()),
+        sa.Column("value_form", sa.Float()),
+        sa.Column("value_season", sa.Float()),
+        sa.Column("selected_by_percent", sa.Float()),
+        sa.Column("influence_rank_overall", sa.Integer()),
+        sa.Column("creativity_rank_overall", sa.Integer()),
+        sa.Column("threat_rank_overall", sa.Integer()),
+        sa.Column("influence_rank_by_position", sa.Integer()),
+        sa.Column("creativity_rank_by_position", sa.Integer()),
+        sa.Column("threat_rank_by_position:", sa.Integer()),
+        sa.Column("ict_index", sa.Integer()),
+        sa.Column("ict_index_by_position", sa.Integer()),
+        sa.Column("dreamteam_count", sa.Integer()),
+        sa.Column("transfers_in", sa.Integer()),
+        sa.Column("transfers_out", sa.Integer()),
+        sa.Column("chance_of_playing_next_round", sa.Integer()),
+        sa.Column("chance_of_playing_this_round", sa.Integer()),
+        sa.Column("cost_change_event", sa.Integer()),
+        sa.Column("cost_change_event_fall", sa.Integer()),
+        sa.Column("cost_change_start", sa.Integer()),
+        sa.Column("cost_change_start_fall", sa.Integer()),
+        sa.Column("ep_next", sa.Text()),
+        sa.Column("ep_this", sa.Text()),
+        sa.Column("now_cost", sa.Integer()),
+        sa.Column("transfers_in_event", sa.Integer()),
+        sa.Column("transfers_out_event", sa.Integer()),
+        sa.Column("goals_scored", sa.Integer()),
+        sa.Column("assists", sa.Integer()),
+        sa.Column("clean_sheets", sa.Integer()),
+        sa.Column("goals_conceded", sa.Integer()),
+        sa.Column("penalties_saved", sa.Integer()),
+        sa.Column("penalties_missed", sa.Integer()),
+        sa.Column("saves", sa.Integer()),
+        sa.Column("bonus", sa.Integer()),
+        sa.Column("bps", sa.Integer()),
+        sa.Column("corners_and_indirect_freekicks_order", sa.Integer()),
+        sa.Column("corners_and_indirect_freekicks_text", sa.Text()),
+        sa.Column("direct_freekicks_order", sa.Integer()),
+        sa.Column("direct_freekicks_text", sa.Text()),
+        sa.Column("penalties_order", sa.Integer()),
+        sa.Column("penalties_text", sa.Text()),
+        sa.PrimaryKeyConstraint("player_id", "gameweek", "snapshot_date", name="pk_fpl_snapshots"),
+    )
+    op.create_index("ix_fpl_snapshots_gameweek_snapshot_date", "fpl_snapshots", ["gameweek", "snapshot_date"])
+    op.create_table(
+        "fbref_snapshots",
+        sa.Column("fbref_id", sa.Text(), nullable=False),
+        sa.Column("key_occurrence", sa.Integer(), nullable=False),
+        sa.Column("gameweek", sa.Integer(), nullable=False),
+        sa.Column("snapshot_date", sa.Date(), nullable=False),
+        sa.Column("name", sa.Text()),
+        sa.Column("profile_url", sa.Text()),
+        sa.Column("nationality", sa.Text()),
+        sa.Column("position", sa.Text()),
+        sa.Column("age", sa.Text()),
+        sa.Column("minutes_90s_x", sa.Float()),
+        sa.Column("goals", sa.Integer()),
+        sa.Column("shots_total", sa.Integer()),
+        sa.Column("shots_on_target", sa.Integer()),
+        sa.Column("shots_on_target_pct", sa.Float()),
+        sa.Column("shots_total_per90", sa.Float()),
+        sa.Column("goals_per_shot", sa.Float()),
+        sa.Column("goals_per_shot_on_target", sa.Float()),
+        sa.Column("shots_free_kicks", sa.Float()),
+        sa.Column("pens_made", sa.Integer()),
+        sa.Column("pens_att", sa.Integer()),
+        sa.Column("xg", sa.Float()),
+        sa.Column("npxg", sa.Float()),
+        sa.Column("npxg_per_shot", sa.Float()),
+        sa.Column("xg_net", sa.Text()),
+        sa.Column("npxg_net", sa.Text()),
+        sa.Column("passes_completed_x", sa.Integer()),
+        sa.Column("passes", sa.Integer()),
+        sa.Column("passes_pct", sa.Float()),
+        sa.Column("passes_total_distance", sa.Float()),
+        sa.Column("passes_progressive_distance", sa.Float()),
+        sa.Column("passes_completed_short", sa.Integer()),
+        sa.Column("passes_short", sa.Integer()),
+        sa.Column("passes_pct_short", sa.Float()),
+        sa.Column("passes_completed_medium", sa.Integer()),
+        sa.Column("passes_medium", sa.Integer()),
+        sa.Column("passes_pct_medium", sa.Float()),
+        sa.Column("passes_completed_long", sa.Integer()),
+        sa.Column("passes_long", sa.Integer()),
+        sa.Column("passes_pct_long", sa.Float()),
+        sa.Column("assists", sa.Integer()),
+        sa.Column("xa", sa.Float()),
+        sa.Column("xa_net", sa.Text()),
+        sa.Column("assisted_shots", sa.Integer()),
+        sa.Column("passes_into_final_third", sa.Integer()),
+        sa.Column("passes_into_penalty_area", sa.Integer()),
+        sa.Column("crosses_into_penalty_area", sa.Integer()),
+        sa.Column("progressive_passes", sa.Integer()),
+        sa.Column("passes_live", sa.Integer()),
+        sa.Column("passes_dead", sa.Integer()),
+        sa.Column("passes_free_kicks", sa.Integer()),
+        sa.Column("through_balls", sa.Integer()),
+        sa.Column("passes_pressure", sa.Integer()),
+        sa.Column("passes_switches", sa.Integer()),
+        sa.Column("crosses_x", sa.Integer()),
+        sa.Column("corner_kicks", sa.Integer()),
+        sa.Column("corner_kicks_in", sa.Integer()),
+        sa.Column("corner_kicks_out", sa.Integer()),
+        sa.Column("corner_kicks_straight", sa.Integer()),
+        sa.Column("passes_ground", sa.Integer()),
+        sa.Column("passes_low", sa.Integer()),
+        sa.Column("passes_high", sa.Integer()),
+        sa.Column("passes_left_foot", sa.Integer()),
+        sa.Column("passes_right_foot", sa.Integer()),
+        sa.Column("passes_head", sa.Integer()),
+        sa.Column("throw_ins", sa.Integer()),
+        sa.Column("passes_other_body", sa.Integer()),
+        sa.Column("passes_completed_y", sa.Integer()),
+        sa.Column("passes_offsides", sa.Integer()),
+        sa.Column("passes_oob", sa.Integer()),
+        sa.Column("passes_intercepted", sa.Integer()),
+        sa.Column("passes_blocked", sa.Integer()),
+        sa.Column("sca", sa.Integer()),
+        sa.Column("sca_per90", sa.Float()),
+        sa.Column("sca_passes_live", sa.Integer()),
+        sa.Column("sca_passes_dead", sa.Integer()),
+        sa.Column("sca_dribbles", sa.Integer()),
+        sa.Column("sca_shots", sa.Integer()),
+        sa.Column("sca_fouled", sa.Integer()),
+        sa.Column("gca", sa.Integer()),
+        sa.Column("gca_per90", sa.Float()),
+        sa.Column("gca_passes_live", sa.Integer()),
+        sa.Column("gca_passes_dead", sa.Integer()),
+        sa.Column("gca_dribbles", sa.Integer()),
+        sa.Column("gca_shots", sa.Integer()),
+        sa.Column("gca_fouled", sa.Integer()),
+        sa.Column("gca_og_for", sa.Integer()),
+        sa.Column("tackles", sa.Integer()),
+        sa.Column("tackles_won_x", sa.Integer()),
+        sa.Column("tackles_def_3rd", sa.Integer()),
+        sa.Column("tackles_mid_3rd", sa.Integer()),
+        sa.Column("tackles_att_3rd", sa.Integer()),
+        sa.Column("dribble_tackles", sa.Integer()),
+        sa.Column("dribbles_vs", sa.Integer()),
+        sa.Column("dribble_tackles_pct", sa.Float()),
+        sa.Column("dribbled_past", sa.Integer()),
+        sa.Column("pressures", sa.Integer()),
+        sa.Column("pressure_regains", sa.Integer()),
+        sa.Column("pressure_regain_pct", sa.Float()),
+        sa.Column("pressures_def_3rd", sa.Integer()),
+        sa.Column("pressures_mid_3rd", sa.Integer()),
+        sa.Column("pressures_att_3rd", sa.Integer()),
+        sa.Column("blocks", sa.Integer()),
+        sa.Column("blocked_shots", sa.Integer()),
+        sa.Column("blocked_shots_saves", sa.Integer()),
+        sa.Column("blocked_passes", sa.Integer()),
+        sa.Column("interceptions_x", sa.Integer()),
+        sa.Column("tackles_interceptions", sa.Integer()),
+        sa.Column("clearances", sa.Integer()),
+        sa.Column("errors", sa.Integer()),
+        sa.Column("touches", sa.Integer()),
+        sa.Column("touches_def_pen_area", sa.Integer()),
+        sa.Column("touches_def_3rd", sa.Integer()),
+        sa.Column("touches_mid_3rd", sa.Integer()),
+        sa.Column("touches_att_3rd", sa.Integer()),
+        sa.Column("touches_att_pen_area", sa.Integer()),
+        sa.Column("touches_live_ball", sa.Integer()),
+        sa.Column("dribbles_completed", sa.Integer()),
+        sa.Column("dribbles", sa.Integer()),
+        sa.Column("dribbles_completed_pct", sa.Float()),
+        sa.Column("players_dribbled_past", sa.Integer()),
+        sa.Column("nutmegs", sa.Integer()),
+        sa.Column("carries", sa.Integer()),
+        sa.Column("carry_distance", sa.Integer()),
+        sa.Column("carry_progressive_distance", sa.Integer()),
+        sa.Column("pass_targets", sa.Integer()),
+        sa.Column("passes_received", sa.Integer()),
+        sa.Column("passes_received_pct", sa.Float()),
+        sa.Column("miscontrols", sa.Integer()),
+        sa.Column("dispossessed", sa.Integer()),
+        sa.Column("games", sa.Integer()),
+        sa.Column("minutes", sa.Float()),
+        sa.Column("minutes_per_game", sa.Float()),
+        sa.Column("minutes_pct", sa.Float()),
+        sa.Column("minutes_90s_y", sa.Float()),
+        sa.Column("games_starts", sa.Integer()),
+        sa.Column("minutes_per_start", sa.Float()),
+        sa.Column("games_subs", sa.Integer()),
+        sa.Column("minutes_per_sub", sa.Float()),
+        sa.Column("unused_subs", sa.Integer()),
+        sa.Column("points_per_match", sa.Float()),
+        sa.Column("on_goals_for", sa.Float()),
+        sa.Column("on_goals_against", sa.Float()),
+        sa.Column("plus_minus", sa.Text()),
+        sa.Column("plus_minus_per90", sa.Text()),
+        sa.Column("plus_minus_wowy", sa.Text()),
+        sa.Column("on_xg_for", sa.Float()),
+        sa.Column("on_xg_against", sa.Float()),
+        sa.Column("xg_plus_minus", sa.Text()),
+        sa.Column("xg_plus_minus_per90", sa.Text()),
+        sa.Column("xg_plus_minus_wowy", sa.Text()),
+        sa.Column("cards_yellow", sa.Integer()),
+        sa.Column("cards_red", sa.Integer()),
+        sa.Column("cards_yellow_red", sa.Integer()),
+        sa.Column("fouls", sa.Integer()),
+        sa.Column("fouled", sa.Integer()),
+        sa.Column("offsides", sa.Integer()),
+        sa.Column("crosses_y", sa.Integer()),
+        sa.Column("interceptions_y", sa.Integer()),
+        sa.Column("tackles_won_y", sa.Integer()),
+        sa.Column("pens_won", sa.Integer()),
+        sa.Column("pens_conceded", sa.Integer()),
+        sa.Column("own_goals", sa.Integer()),
+        sa.Column("ball_recoveries", sa.Integer()),
+        sa.Column("aerials_won", sa.Integer()),
+        sa.Column("aerials_lost", sa.Integer()),
+        sa.Column("aerials_won_pct", sa.Float()),
+        sa.PrimaryKeyConstraint("fbref_id", "key_occurrence", "gameweek", "snapshot_date", name="pk_fbref_snapshots"),
+    )
+    op.create_index("ix_fbref_snapshots_gameweek_snapshot_date", "fbref_snapshots", ["gameweek", "snapshot_date"])
+
+
+def downgrade():
+    op.drop_table("fbref_snapshots")
+    op.drop_table("fpl_snapshots")
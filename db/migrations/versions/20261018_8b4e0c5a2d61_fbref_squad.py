@@ -0,0 +1,25 @@
+"""fbref squad
+
+Revision ID: 8b4e0c5a2d61
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 11:00:00
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "8b4e0c5a2d61"
+down_revision = "3f1c2a9d7b10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("fbref_snapshots") as batch_op:
+        batch_op.add_column(sa.Column("squad", sa.Text()))
+
+
+def downgrade():
+    with op.batch_alter_table("fbref_snapshots") as batch_op:
+        batch_op.drop_column("squad")
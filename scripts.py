@@ -7,7 +7,8 @@ from subprocess import CalledProcessError, check_call
 import click
 from loguru import logger
 
-from src.run_scripts import run_fbref, run_fpl_official, run_stats_combiner
+# The src imports (pandas, boto3, requests, bs4/lxml, ...) live inside the commands that need them, so that --help,
+# lint and tests start without paying for the scraping stack.
 
 THIS_DIRECTORY = Path(__file__).parent
 
@@ -31,7 +32,12 @@ def lint() -> None:
 
 
 def test() -> None:
-    _call("pytest --disable-pytest-warnings -v -s")
+    # Timings run separately through benchmarks, so a slow machine does not fail the functional tests.
+    _call("pytest --disable-pytest-warnings -v -s --ignore=tests/benchmarks")
+
+
+def benchmarks() -> None:
+    _call("pytest tests/benchmarks --disable-pytest-warnings -v -s")
 
 
 @click.command()
@@ -47,24 +53,225 @@ def migrations():
     logger.info("Completed successfully")
 
 
+FORMAT_OPTION = click.option(
+    "--format", "file_format", type=click.Choice(["csv", "parquet"]), default="csv", help="Snapshot file format"
+)
+DELTA_OPTION = click.option(
+    "--delta/--no-delta", default=False, help="Upload only the rows that changed since the previous run of the gameweek"
+)
+STORE_OPTION = click.option(
+    "--store/--no-store", default=False, help="Also insert the snapshot into the local SQLite snapshot store"
+)
+RESPONSE_CACHE_OPTIONS = [
+    click.option("--cache/--no-cache", default=True, help="Store responses in the local response cache"),
+    click.option("--replay/--no-replay", default=False, help="Run from cached responses without network access"),
+    click.option("--replay-date", default=None, help="Fetch date (YYYYMMDD) to replay, defaults to today"),
+]
+
+
+METRICS_OPTIONS = [
+    click.option("--metrics-jsonl", default=None, help="Append per-stage timing spans to this JSON lines file"),
+    click.option("--metrics-prom", default=None, help="Write a Prometheus textfile with per-stage totals here"),
+]
+
+
+def response_cache_options(command):
+    for option in reversed(RESPONSE_CACHE_OPTIONS):
+        command = option(command)
+    return command
+
+
+def metrics_options(command):
+    for option in reversed(METRICS_OPTIONS):
+        command = option(command)
+    return command
+
+
 @click.command()
 @click.option("--debug/--no-debug", default=False, help="Prints debug info")
-def fbref_scraper(debug: bool):
+@click.option("--fetch-workers", default=1, show_default=True, help="Squad pages downloaded in parallel")
+@click.option("--parse-workers", default=1, show_default=True, help="Processes used to parse squad pages")
+@click.option(
+    "--competitions",
+    default="premier_league",
+    show_default=True,
+    help="Comma separated competitions to scrape (premier_league, la_liga, serie_a, bundesliga, ligue_1)",
+)
+@click.option(
+    "--seasons", default=None, help="Comma separated seasons to backfill (2019-2020), defaults to the current"
+)
+@click.option("--resume/--no-resume", default=True, help="Skip (team, table) units already checkpointed")
+@FORMAT_OPTION
+@DELTA_OPTION
+@STORE_OPTION
+@response_cache_options
+@metrics_options
+def fbref_scraper(
+    debug: bool,
+    fetch_workers: int,
+    parse_workers: int,
+    competitions: str,
+    seasons: str,
+    resume: bool,
+    file_format: str,
+    delta: bool,
+    store: bool,
+    cache: bool,
+    replay: bool,
+    replay_date: str,
+    metrics_jsonl: str,
+    metrics_prom: str,
+):
+    from src.metrics import configure_metrics
+    from src.response_cache import configure_response_cache
+    from src.run_scripts import run_fbref
+
+    configure_response_cache(enabled=cache, replay=replay, fetch_date=replay_date)
+    configure_metrics(jsonl_path=metrics_jsonl, prometheus_path=metrics_prom)
     logger.info("Starting scraping for Fbref...")
-    run_fbref(debug=debug)
+    run_fbref(
+        debug=debug,
+        fetch_workers=fetch_workers,
+        parse_workers=parse_workers,
+        file_format=file_format,
+        delta=delta,
+        store=store,
+        competitions=competitions.split(","),
+        seasons=seasons.split(",") if seasons else None,
+        resume=resume,
+    )
 
 
 @click.command()
 @click.option("--debug/--no-debug", default=False, help="Prints debug info")
-def fpl_data_fetcher(debug: bool):
+@FORMAT_OPTION
+@DELTA_OPTION
+@STORE_OPTION
+@response_cache_options
+@metrics_options
+def fpl_data_fetcher(
+    debug: bool,
+    file_format: str,
+    delta: bool,
+    store: bool,
+    cache: bool,
+    replay: bool,
+    replay_date: str,
+    metrics_jsonl: str,
+    metrics_prom: str,
+):
+    from src.metrics import configure_metrics
+    from src.response_cache import configure_response_cache
+    from src.run_scripts import run_fpl_official
+
+    configure_response_cache(enabled=cache, replay=replay, fetch_date=replay_date)
+    configure_metrics(jsonl_path=metrics_jsonl, prometheus_path=metrics_prom)
     logger.info("Starting scraping for FPL Official Data...")
-    run_fpl_official(debug=debug)
+    run_fpl_official(debug=debug, file_format=file_format, delta=delta, store=store)
 
 
 @click.command()
-def stats_combiner():
+@FORMAT_OPTION
+@click.option("--fbref-columns", default=None, help="Comma separated fbref columns to read, defaults to all")
+@click.option("--fpl-columns", default=None, help="Comma separated FPL columns to read, defaults to all")
+@click.option(
+    "--auto-match/--no-auto-match",
+    default=False,
+    help="Match players missing from the mapping CSV by club, position and name, uncertain ones go to review",
+)
+@click.option(
+    "--gameweeks",
+    default=None,
+    help="Comma separated gameweeks to combine from their latest snapshots, defaults to today's live gameweek",
+)
+@click.option(
+    "--feature-store/--no-feature-store",
+    default=False,
+    help="Append every combined gameweek to the local xP lag feature store, in the order given",
+)
+@metrics_options
+def stats_combiner(
+    file_format: str,
+    fbref_columns: str,
+    fpl_columns: str,
+    auto_match: bool,
+    gameweeks: str,
+    feature_store: bool,
+    metrics_jsonl: str,
+    metrics_prom: str,
+):
+    from src.metrics import configure_metrics
+    from src.run_scripts import run_stats_combiner
+
+    configure_metrics(jsonl_path=metrics_jsonl, prometheus_path=metrics_prom)
     logger.info("Starting data processing and combining Fbref and official FPL stats...")
-    run_stats_combiner()
+    run_stats_combiner(
+        file_format=file_format,
+        fbref_columns=fbref_columns.split(",") if fbref_columns else None,
+        fpl_columns=fpl_columns.split(",") if fpl_columns else None,
+        auto_match=auto_match,
+        gameweeks=[int(gameweek) for gameweek in gameweeks.split(",")] if gameweeks else None,
+        feature_store=feature_store,
+    )
+
+
+@click.command()
+@FORMAT_OPTION
+@click.option(
+    "--features",
+    "features_path",
+    default=None,
+    help="Local CSV or parquet table by player_id or element, with the XP_FEATURES the combined snapshot lacks",
+)
+@click.option("--gameweek", type=int, default=None, help="Gameweek to score, defaults to the live one")
+@click.option("--model", "model_path", default=None, help="Pickled model, relative to models/, defaults to XP_MODEL")
+@metrics_options
+def xp_predictions(
+    file_format: str, features_path: str, gameweek: int, model_path: str, metrics_jsonl: str, metrics_prom: str
+):
+    from src.constants import XP_MODEL
+    from src.metrics import configure_metrics
+    from src.run_scripts import run_xp_predictions
+
+    configure_metrics(jsonl_path=metrics_jsonl, prometheus_path=metrics_prom)
+    logger.info("Starting expected points predictions...")
+    run_xp_predictions(
+        features_path=features_path, file_format=file_format, gameweek=gameweek, model_path=model_path or XP_MODEL
+    )
+
+
+@click.command()
+@FORMAT_OPTION
+@click.option("--gameweek", type=int, default=None, help="First gameweek to plan, defaults to today's live gameweek")
+@click.option("--horizon", type=int, default=None, help="Gameweeks to plan, defaults to OPTIMIZER_HORIZON")
+@click.option("--squad", default=None, help="Comma separated player ids of the current squad, omitted for a new squad")
+@click.option("--bank", type=int, default=0, help="Money in the bank, in now_cost units (0.1m)")
+@click.option("--free-transfers", type=int, default=1, help="Free transfers available for the first gameweek")
+@metrics_options
+def squad_optimizer(
+    file_format: str,
+    gameweek: int,
+    horizon: int,
+    squad: str,
+    bank: int,
+    free_transfers: int,
+    metrics_jsonl: str,
+    metrics_prom: str,
+):
+    from src.constants import OPTIMIZER_HORIZON
+    from src.metrics import configure_metrics
+    from src.run_scripts import run_squad_optimizer
+
+    configure_metrics(jsonl_path=metrics_jsonl, prometheus_path=metrics_prom)
+    logger.info("Starting the squad optimizer...")
+    run_squad_optimizer(
+        file_format=file_format,
+        gameweek=gameweek,
+        horizon=horizon or OPTIMIZER_HORIZON,
+        current_squad=[int(player_id) for player_id in squad.split(",")] if squad else None,
+        bank=bank,
+        free_transfers=free_transfers,
+    )
 
 
 @click.command()
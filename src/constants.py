@@ -23,14 +23,64 @@ TEAM_URLS = {
     "arsenal": "https://fbref.com/en/squads/18bb7c10/Arsenal-Stats",
 }
 
-FBREF_SHOOTING = "stats_shooting_10728"
-FBREF_PASSING = "stats_passing_10728"
-FBREF_XTRA_PASSING = "stats_passing_types_10728"
-FBREF_GCA = "stats_gca_10728"
-FBREF_DEF_ACTIONS = "stats_defense_10728"
-FBREF_POSSESSION = "stats_possession_10728"
-FBREF_PLAYING_TIME = "stats_playing_time_10728"
-FBREF_MISC = "stats_misc_10728"
+# FPL short name of every squad in TEAM_URLS, used to put fbref and FPL players of the same club in one block.
+FBREF_TEAM_SLUGS = {
+    "liverpool": "LIV",
+    "aston_villa": "AVL",
+    "leeds_united": "LEE",
+    "crystal_palace": "CRY",
+    "chelsea": "CHE",
+    "leicester_city": "LEI",
+    "wolves": "WOL",
+    "tottenham_hotspurs": "TOT",
+    "westham_united": "WHU",
+    "manchester_city": "MCI",
+    "everton": "EVE",
+    "southampton": "SOU",
+    "newcastle_united": "NEW",
+    "manchester_united": "MUN",
+    "brighton": "BHA",
+    "westbrom": "WBA",
+    "burnley": "BUR",
+    "sheffield_united": "SHU",
+    "fulham": "FUL",
+    "arsenal": "ARS",
+}
+# fbref position codes and the FPL position they correspond to, fbref lists several for versatile players ("DF,MF").
+FBREF_POSITIONS = {"GK": "GKP", "DF": "DEF", "MF": "MID", "FW": "FWD"}
+
+FBREF_URL = "https://fbref.com"
+# fbref competition id and url name of the leagues that publish every stat table scraped from squad pages.
+FBREF_COMPETITIONS = {
+    "premier_league": (9, "Premier-League"),
+    "la_liga": (12, "La-Liga"),
+    "serie_a": (11, "Serie-A"),
+    "bundesliga": (20, "Bundesliga"),
+    "ligue_1": (13, "Ligue-1"),
+}
+FBREF_DEFAULT_COMPETITION = "premier_league"
+
+# Squad pages suffix every table id with the competition and season ("stats_shooting_10728"), tables are resolved
+# by these prefixes.
+FBREF_SHOOTING = "stats_shooting"
+FBREF_PASSING = "stats_passing"
+FBREF_XTRA_PASSING = "stats_passing_types"
+FBREF_GCA = "stats_gca"
+FBREF_DEF_ACTIONS = "stats_defense"
+FBREF_POSSESSION = "stats_possession"
+FBREF_PLAYING_TIME = "stats_playing_time"
+FBREF_MISC = "stats_misc"
+
+FBREF_TABLES = {
+    "shooting_stats": FBREF_SHOOTING,
+    "passing_stats": FBREF_PASSING,
+    "extra_passing_stats": FBREF_XTRA_PASSING,
+    "gca_stats": FBREF_GCA,
+    "defensive_action_stats": FBREF_DEF_ACTIONS,
+    "possession_stats": FBREF_POSSESSION,
+    "playing_time_stats": FBREF_PLAYING_TIME,
+    "misc_stats": FBREF_MISC,
+}
 
 STATS_AVAILABLE = [
     "shooting_stats",
@@ -49,3 +99,75 @@ ROOT_DIRECTORY = Path(__file__).parents[2]
 FBREF_DATA = Path(ROOT_DIRECTORY / "data/fbref-data")
 FPL_DATA = Path(ROOT_DIRECTORY / "data/fpl-data")
 FPL_URL_STATIC = "https://fantasy.premierleague.com/api/bootstrap-static/"
+FPL_URL_FIXTURES = "https://fantasy.premierleague.com/api/fixtures/"
+SEASON_GAMEWEEKS = 38
+
+CACHE_DIRECTORY = Path(__file__).parents[1] / ".cache"
+FPL_BOOTSTRAP_CACHE = Path(CACHE_DIRECTORY / "fpl/bootstrap-static.json")
+FPL_BOOTSTRAP_TTL = 600
+RESPONSE_CACHE = Path(CACHE_DIRECTORY / "responses")
+REPLAY_OUTPUT = Path(CACHE_DIRECTORY / "replay-output")
+CHECKPOINTS = Path(CACHE_DIRECTORY / "checkpoints")
+FEATURE_STORE = Path(CACHE_DIRECTORY / "features")
+SNAPSHOT_STORE = Path(Path(__file__).parents[1] / "data/snapshots.sqlite")
+MODELS_DIRECTORY = Path(Path(__file__).parents[1] / "models")
+MIGRATIONS_DIRECTORY = Path(Path(__file__).parents[1] / "db/migrations")
+
+HTTP_TIMEOUT = 120
+HTTP_POOL_SIZE = 10
+HTTP_RETRIES = 5
+HTTP_BACKOFF_FACTOR = 0.5
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Only the timings of the latest requests are kept, a long scrape would otherwise hold one entry per page.
+HTTP_TIMINGS_KEPT = 1000
+
+# Spaces uploads: bodies from UPLOAD_MULTIPART_THRESHOLD up are sent as multipart uploads of UPLOAD_PART_SIZE parts,
+# UPLOAD_PART_WORKERS at a time, and UPLOAD_WORKERS background uploads run next to the scraping and transforms.
+UPLOAD_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+UPLOAD_PART_SIZE = 8 * 1024 * 1024
+UPLOAD_PART_WORKERS = 4
+UPLOAD_WORKERS = 4
+
+# Expected points models: gameweek stats summed over the previous XP_WINDOWS gameweeks of each player, plus the
+# gameweek's own features, in the column order the pickled models were trained on (they carry no feature names).
+XP_MODEL = "2020-21/xP_baseline_2021_v1.pkl"
+XP_WINDOWS = (1, 3, 5, 10)
+XP_LAG_VARIABLES = [
+    "assists",
+    "bonus",
+    "bps",
+    "clean_sheets",
+    "goals_conceded",
+    "goals_scored",
+    "minutes",
+    "own_goals",
+    "penalties_missed",
+    "penalties_saved",
+    "red_cards",
+    "yellow_cards",
+    "saves",
+    "selected",
+    "threat",
+    "transfers_in",
+    "transfers_out",
+]
+XP_FEATURES = ["creativity", "ict_index", "influence", "value", "was_home", "fdr"] + [
+    f"{variable}_in_prev_{window}" for variable in XP_LAG_VARIABLES for window in XP_WINDOWS
+]
+XP_BATCH_SIZE = 4096
+# Name of the lag feature store the combiner appends every combined gameweek to, under FEATURE_STORE.
+XP_FEATURE_STORE = "combined_stats"
+
+# Squad rules of the optimizer, costs in now_cost units (0.1m). Transfers beyond the free ones cost TRANSFER_HIT points,
+# unused free transfers roll over up to MAX_FREE_TRANSFERS, and bench players count BENCH_WEIGHT of their points.
+SQUAD_BUDGET = 1000
+SQUAD_POSITIONS = {"GKP": 2, "DEF": 5, "MID": 5, "FWD": 3}
+LINEUP_POSITIONS = {"GKP": (1, 1), "DEF": (3, 5), "MID": (2, 5), "FWD": (1, 3)}
+LINEUP_SIZE = 11
+CLUB_LIMIT = 3
+MAX_FREE_TRANSFERS = 2
+TRANSFER_HIT = 4
+BENCH_WEIGHT = 0.1
+OPTIMIZER_HORIZON = 3
+OPTIMIZER_POOL_SIZE = 25
+OPTIMIZER_TIME_LIMIT = 60
@@ -0,0 +1,66 @@
+import json
+import shutil
+from pathlib import Path
+
+from loguru import logger
+
+from src.constants import CHECKPOINTS, STATS_AVAILABLE
+from src.fbref.collections import COLLECTIONS
+from src.response_cache import atomic_write, cache_date
+
+# A scrape is split into (team, table) units per (competition, season) shard. Each unit is written under the fetch
+# date as soon as its page is parsed, so a rerun on the same day only fetches the squads with missing units.
+
+
+def shard_directory(shard: tuple) -> Path:
+    competition, season = shard
+    return CHECKPOINTS / "fbref" / cache_date() / competition / (season or "current")
+
+
+def _unit_path(shard: tuple, team: str, category: str) -> Path:
+    return shard_directory(shard) / team / f"{category}.json"
+
+
+def write_unit(shard: tuple, team: str, category: str, rows: list) -> None:
+    atomic_write(_unit_path(shard, team, category), json.dumps([list(row) for row in rows]).encode())
+
+
+def read_unit(shard: tuple, team: str, category: str) -> list:
+    collection = COLLECTIONS[category]
+    return [collection(*row) for row in json.loads(_unit_path(shard, team, category).read_bytes())]
+
+
+def missing_units(shard: tuple, team_urls: dict) -> dict:
+    missing = {}
+    for team in team_urls:
+        categories = [category for category in STATS_AVAILABLE if not _unit_path(shard, team, category).exists()]
+        if categories:
+            missing[team] = categories
+    return missing
+
+
+def write_squads(shard: tuple, team_urls: dict) -> None:
+    atomic_write(shard_directory(shard) / "squads.json", json.dumps(team_urls).encode())
+
+
+def read_squads(shard: tuple) -> dict:
+    path = shard_directory(shard) / "squads.json"
+    return json.loads(path.read_bytes()) if path.exists() else None
+
+
+def clear_shard(shard: tuple) -> None:
+    if shard_directory(shard).exists():
+        logger.info(f"[CHECKPOINT] Clearing {shard_directory(shard)}")
+        shutil.rmtree(shard_directory(shard))
+
+
+def assemble_shard(shard: tuple, team_urls: dict) -> list:
+    # Same shape as scrape_teams returns, in the order of team_urls.
+    return [
+        {
+            "team": team.upper(),
+            "fbref_url": url,
+            **{category: read_unit(shard, team, category) for category in STATS_AVAILABLE},
+        }
+        for team, url in team_urls.items()
+    ]
@@ -0,0 +1,79 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+from fastcore.basics import typed
+from loguru import logger
+
+from src.constants import (
+    FBREF_COMPETITIONS,
+    FBREF_DEFAULT_COMPETITION,
+    FBREF_URL,
+    TEAM_URLS,
+)
+from src.fbref.checkpoints import read_squads, write_squads
+from src.metrics import span
+from src.utilities import request_obj
+
+LEAGUE_TABLE_ID = re.compile(r"^results.*_overall$")
+SQUAD_LINK = re.compile(r"^/en/squads/([0-9a-f]{8})/(?:\d{4}-\d{4}/)?([^/]+)-Stats$")
+# Squads already in TEAM_URLS keep their name there, which the player matcher knows the FPL club of.
+KNOWN_SQUADS = {url.split("/")[5]: team for team, url in TEAM_URLS.items()}
+
+
+def competition_url(competition: str, season: str = None) -> str:
+    competition_id, name = FBREF_COMPETITIONS[competition]
+    if season is None:
+        return f"{FBREF_URL}/en/comps/{competition_id}/{name}-Stats"
+    return f"{FBREF_URL}/en/comps/{competition_id}/{season}/{season}-{name}-Stats"
+
+
+def squad_key(squad_id: str, name: str) -> str:
+    return KNOWN_SQUADS.get(squad_id) or name.lower().replace("-", "_")
+
+
+@typed
+def parse_competition_html(content: bytes) -> dict:
+    # The overall league table links every squad of the season once, in table order.
+    with span("parse", "competition_page") as parse_span:
+        league_table = SoupStrainer("table", attrs={"id": LEAGUE_TABLE_ID})
+        page = BeautifulSoup(content, features="lxml", parse_only=league_table)
+        parse_span.add(bytes=len(content))
+    squads = {}
+    for link in page.find_all("a", href=SQUAD_LINK):
+        squad_id, name = SQUAD_LINK.match(link.attrs["href"]).groups()
+        squads.setdefault(squad_key(squad_id, name), f"{FBREF_URL}{link.attrs['href']}")
+    if not squads:
+        raise ValueError("No league table with squad links on the competition page")
+    return squads
+
+
+def _discover_shard(shard: tuple, proxies: list, via_proxy: bool) -> dict:
+    competition, season = shard
+    logger.info(f"[COMPETITION:{competition.upper()}] Discovering squads of season {season or 'current'}")
+    return parse_competition_html(
+        request_obj(url=competition_url(competition, season), proxies=proxies, via_proxy=via_proxy).content
+    )
+
+
+def discover_squads(shards: list, proxies: list, via_proxy: bool = False, fetch_workers: int = 1) -> dict:
+    # Every (competition, season) shard is discovered independently, one that fails is logged and left out. The squads
+    # found are checkpointed with the shard, a rerun on the same day scrapes the same squads.
+    squads = {shard: read_squads(shard) for shard in shards}
+    with ThreadPoolExecutor(max_workers=max(fetch_workers, 1)) as pool:
+        discoveries = {
+            shard: pool.submit(_discover_shard, shard, proxies, via_proxy) for shard in shards if squads[shard] is None
+        }
+        for shard, discovery in discoveries.items():
+            try:
+                squads[shard] = discovery.result()
+                write_squads(shard, squads[shard])
+            except Exception as err:
+                logger.exception(err)
+    # The current Premier League season keeps working from the known squads when its page cannot be read. They are
+    # not checkpointed, a rerun tries the competition page again.
+    default_shard = (FBREF_DEFAULT_COMPETITION, None)
+    if default_shard in squads and not squads[default_shard]:
+        logger.warning(f"[COMPETITION:{FBREF_DEFAULT_COMPETITION.upper()}] No squads discovered, using TEAM_URLS")
+        squads[default_shard] = dict(TEAM_URLS)
+    return {shard: team_urls for shard, team_urls in squads.items() if team_urls is not None}
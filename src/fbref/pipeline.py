@@ -0,0 +1,141 @@
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from functools import partial
+
+from loguru import logger
+
+from src.constants import STATS_AVAILABLE
+from src.fbref.checkpoints import assemble_shard, missing_units, write_unit
+from src.fbref.scraper import extract_table_units, extract_tables_from_html
+from src.utilities import request_obj
+
+
+def _fetch_team_page(team: str, url: str, proxies: list, via_proxy: bool) -> bytes:
+    logger.info(f"[TEAM:{team.upper()}] Fetching data from Fbref")
+    return request_obj(url=url, proxies=proxies, via_proxy=via_proxy).content
+
+
+def _page_result(extracted):
+    try:
+        return extracted.result() if isinstance(extracted, Future) else extracted
+    except Exception as err:
+        return err
+
+
+def _parse_page(content: bytes, categories: tuple, debug: bool):
+    if categories is None:
+        return extract_tables_from_html(content, debug=debug)
+    return extract_table_units(content, categories)
+
+
+def _scrape_pages(
+    pages: dict,
+    proxies: list,
+    via_proxy: bool,
+    debug: bool,
+    fetch_workers: int,
+    parse_workers: int,
+    on_page=None,
+) -> dict:
+    # pages maps a key to the (team, url, categories) of a squad page, categories None meaning all tables. Downloads
+    # run on a bounded thread pool, and each page is handed to the parser as soon as it arrives. With
+    # parse_workers > 1 the lxml parsing is fanned out to a process pool so it runs on several cores. A page that
+    # fails leaves its exception in place of the tables, on_page(key, tables) is called as soon as a page is done.
+    parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 1 else None
+    extracted = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(fetch_workers, 1)) as fetch_pool:
+            fetches = {
+                fetch_pool.submit(_fetch_team_page, team, url, proxies, via_proxy): key
+                for key, (team, url, _) in pages.items()
+            }
+            for fetch in as_completed(fetches):
+                key = fetches[fetch]
+                try:
+                    content = fetch.result()
+                    if parse_pool:
+                        extracted[key] = parse_pool.submit(_parse_page, content, pages[key][2], debug)
+                    else:
+                        extracted[key] = _parse_page(content, pages[key][2], debug)
+                except Exception as err:
+                    extracted[key] = err
+                if on_page and isinstance(extracted[key], Future):
+                    extracted[key].add_done_callback(partial(_page_done, on_page, key))
+                elif on_page:
+                    on_page(key, extracted[key])
+        return {key: _page_result(extracted[key]) for key in pages}
+    finally:
+        # Shutting the parse pool down also waits for its done callbacks, every page has been handed to on_page.
+        if parse_pool:
+            parse_pool.shutdown()
+
+
+def _page_done(on_page, key, future: Future) -> None:
+    on_page(key, _page_result(future))
+
+
+def scrape_teams(
+    team_urls: dict,
+    proxies: list,
+    via_proxy: bool = False,
+    debug: bool = False,
+    fetch_workers: int = 1,
+    parse_workers: int = 1,
+) -> list:
+    pages = {team: (team, url, None) for team, url in team_urls.items()}
+    extracted = _scrape_pages(pages, proxies, via_proxy, debug, fetch_workers, parse_workers)
+    for tables in extracted.values():
+        if isinstance(tables, Exception):
+            raise tables
+    # Results are always returned in the order of team_urls, whatever order the pages finished in.
+    return [{"team": team.upper(), "fbref_url": url, **extracted[team]} for team, url in team_urls.items()]
+
+
+def _checkpoint_page(key: tuple, units) -> None:
+    shard, team = key
+    if isinstance(units, Exception):
+        logger.opt(exception=units).error(f"[SHARD:{shard}] {team} failed")
+        return
+    for category, rows in units.items():
+        if isinstance(rows, Exception):
+            logger.opt(exception=rows).error(f"[SHARD:{shard}] {team} {category} failed")
+        else:
+            write_unit(shard, team, category, rows)
+
+
+def scrape_shards(
+    shard_urls: dict,
+    proxies: list,
+    via_proxy: bool = False,
+    debug: bool = False,
+    fetch_workers: int = 1,
+    parse_workers: int = 1,
+) -> dict:
+    # shard_urls maps each (competition, season) shard to its team urls. The squad pages of all shards share the
+    # same pools, so a run over several leagues or seasons keeps every worker busy until the last page. Only squads
+    # with units missing from the checkpoints are fetched, and only those units are extracted and written. Shards
+    # with every unit present are assembled from the checkpoints, the others are left for a rerun.
+    pages = {
+        (shard, team): (team, team_urls[team], tuple(categories))
+        for shard, team_urls in shard_urls.items()
+        for team, categories in missing_units(shard, team_urls).items()
+    }
+    units = sum(len(team_urls) for team_urls in shard_urls.values()) * len(STATS_AVAILABLE)
+    logger.info(f"[CHECKPOINT] {sum(len(page[2]) for page in pages.values())} of {units} units left to scrape")
+    _scrape_pages(pages, proxies, via_proxy, debug, fetch_workers, parse_workers, on_page=_checkpoint_page)
+
+    shards = {}
+    for shard, team_urls in shard_urls.items():
+        missing = missing_units(shard, team_urls)
+        if missing:
+            logger.error(
+                f"[SHARD:{shard}] {sum(map(len, missing.values()))} units missing for {', '.join(missing)}, "
+                "rerun to scrape only those"
+            )
+            continue
+        shards[shard] = assemble_shard(shard, team_urls)
+    return shards
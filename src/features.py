@@ -0,0 +1,158 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.constants import FEATURE_STORE, XP_LAG_VARIABLES, XP_WINDOWS
+from src.fpl.collections import FPL_FIELD_TYPES
+from src.metrics import span
+from src.schemas import fbref_columns
+
+# Rolling sums of gameweek stats per player, the {variable}_in_prev_{window} lag features of the xP models. Every
+# player keeps the last max(windows) gameweeks it played in a ring buffer next to one running sum per window, so a
+# gameweek is appended in O(players x variables) instead of rolling over the whole season again. As with
+# groupby(player).rolling(window).sum() in the notebooks, a window includes the latest gameweek of the player and is
+# NaN until the player has played that many gameweeks.
+
+# Lag variables the snapshots carry as season-to-date totals, read from the FPL snapshot when it has them and from the
+# fbref tables otherwise. red_cards, yellow_cards, selected and threat are in neither, see src.predictions.
+FPL_LAG_VARIABLES = [variable for variable in XP_LAG_VARIABLES if variable in FPL_FIELD_TYPES]
+FBREF_LAG_VARIABLES = [
+    variable for variable in XP_LAG_VARIABLES if variable in fbref_columns() and variable not in FPL_FIELD_TYPES
+]
+SNAPSHOT_LAG_VARIABLES = [
+    variable for variable in XP_LAG_VARIABLES if variable in FPL_LAG_VARIABLES + FBREF_LAG_VARIABLES
+]
+
+
+class FeatureStore:
+    __slots__ = ("variables", "windows", "player_ids", "rows", "played", "history", "sums", "totals", "gameweeks")
+
+    def __init__(self, variables: list = SNAPSHOT_LAG_VARIABLES, windows: tuple = XP_WINDOWS):
+        self.variables = list(variables)
+        self.windows = tuple(sorted(windows))
+        self.player_ids = np.empty(0, dtype=np.int64)
+        self.rows = {}
+        self.played = np.empty(0, dtype=np.int64)
+        self.history = np.empty((0, self.windows[-1], len(self.variables)))
+        self.sums = np.empty((len(self.windows), 0, len(self.variables)))
+        # Last season-to-date totals of each player, for snapshots appended with cumulative=True.
+        self.totals = np.empty((0, len(self.variables)))
+        self.gameweeks = []
+
+    def __len__(self) -> int:
+        return len(self.player_ids)
+
+    def _player_rows(self, player_ids: np.ndarray) -> np.ndarray:
+        # Unseen players get the next free rows, the arrays grow by doubling.
+        new_ids = [player_id for player_id in dict.fromkeys(player_ids.tolist()) if player_id not in self.rows]
+        if new_ids:
+            size = len(self.player_ids) + len(new_ids)
+            if size > len(self.played):
+                self._grow(max(size, 2 * len(self.played)))
+            self.rows.update(zip(new_ids, range(len(self.player_ids), size)))
+            self.player_ids = np.concatenate([self.player_ids, np.asarray(new_ids, dtype=np.int64)])
+        return np.fromiter((self.rows[player_id] for player_id in player_ids.tolist()), np.int64, len(player_ids))
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - len(self.played)
+        self.played = np.concatenate([self.played, np.zeros(extra, dtype=np.int64)])
+        self.history = np.concatenate([self.history, np.zeros((extra,) + self.history.shape[1:])])
+        self.sums = np.concatenate([self.sums, np.zeros((len(self.windows), extra, len(self.variables)))], axis=1)
+        self.totals = np.concatenate([self.totals, np.zeros((extra, len(self.variables)))])
+
+    def append_gameweek(self, gameweek: int, dataframe: pd.DataFrame, cumulative: bool = False) -> None:
+        # dataframe has a player_id and every variable column. A player on several rows (a double gameweek) is summed,
+        # a player missing from it did not play and keeps its windows. Snapshots of season-to-date totals (the
+        # combined_stats snapshots, through combined_lag_frame) are appended with cumulative=True and differenced
+        # against the previous snapshot of the player, its first snapshot counting in full.
+        missing = [variable for variable in self.variables if variable not in dataframe.columns]
+        if missing:
+            raise ValueError(f"{len(missing)} feature store variables missing from GW{gameweek}: {', '.join(missing)}")
+        if gameweek in self.gameweeks:
+            raise ValueError(f"GW{gameweek} is already in the feature store")
+        with span("features", "append_gameweek") as append_span:
+            player_ids, codes = np.unique(dataframe.player_id.to_numpy(dtype=np.int64), return_inverse=True)
+            values = np.zeros((len(player_ids), len(self.variables)))
+            np.add.at(values, codes, dataframe[self.variables].to_numpy(dtype=np.float64, na_value=0.0))
+            rows = self._player_rows(player_ids)
+            if cumulative:
+                values, self.totals[rows] = values - self.totals[rows], values
+
+            played = self.played[rows]
+            for position, window in enumerate(self.windows):
+                # The gameweek leaving the window sits window slots back in the ring, zeros until the ring filled up.
+                leaving = self.history[rows, (played - window) % self.windows[-1]]
+                self.sums[position, rows] += values - np.where((played >= window)[:, None], leaving, 0.0)
+            self.history[rows, played % self.windows[-1]] = values
+            self.played[rows] = played + 1
+            self.gameweeks.append(gameweek)
+            append_span.add(rows=len(rows))
+
+    def feature_names(self) -> list:
+        return [f"{variable}_in_prev_{window}" for variable in self.variables for window in self.windows]
+
+    def lag_features(self, player_ids=None) -> pd.DataFrame:
+        # One row per player (all of them, or player_ids in that order, NaN for unknown players) with the
+        # {variable}_in_prev_{window} columns in XP_FEATURES order.
+        if player_ids is None:
+            player_ids = self.player_ids
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        rows = np.fromiter((self.rows.get(player_id, -1) for player_id in player_ids.tolist()), np.int64)
+        known = rows >= 0
+        played = np.zeros(len(rows), dtype=np.int64)
+        played[known] = self.played[rows[known]]
+        columns = {"player_id": player_ids}
+        for window_position, window in enumerate(self.windows):
+            sums = np.full((len(rows), len(self.variables)), np.nan)
+            complete = played >= window
+            sums[complete] = self.sums[window_position, rows[complete]]
+            for variable_position, variable in enumerate(self.variables):
+                columns[f"{variable}_in_prev_{window}"] = sums[:, variable_position]
+        columns = {column: columns[column] for column in ["player_id"] + self.feature_names()}
+        return pd.DataFrame(columns)
+
+
+def combined_lag_frame(combined_stats: pd.DataFrame) -> pd.DataFrame:
+    # One row per player of a combined_stats snapshot with the SNAPSHOT_LAG_VARIABLES totals. Players listed by two
+    # squads are on two rows, their FPL totals are taken once and their fbref totals summed.
+    columns = combined_stats.rename(columns={f"{variable}_fpl": variable for variable in FPL_LAG_VARIABLES})
+    players = columns.groupby("player_id", sort=False)
+    lag_frame = pd.concat([players[FPL_LAG_VARIABLES].first(), players[FBREF_LAG_VARIABLES].sum(min_count=1)], axis=1)
+    return lag_frame[SNAPSHOT_LAG_VARIABLES].reset_index()
+
+
+def save_feature_store(store: FeatureStore, name: str) -> Path:
+    path = FEATURE_STORE / f"{name}.npz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    size = len(store)
+    np.savez_compressed(
+        path,
+        variables=np.asarray(store.variables),
+        windows=np.asarray(store.windows),
+        gameweeks=np.asarray(store.gameweeks, dtype=np.int64),
+        player_ids=store.player_ids,
+        played=store.played[:size],
+        history=store.history[:size],
+        sums=store.sums[:, :size],
+        totals=store.totals[:size],
+    )
+    logger.info(f"[FEATURES] Saved {size} players over {len(store.gameweeks)} gameweeks to {path}")
+    return path
+
+
+def load_feature_store(name: str) -> FeatureStore:
+    path = FEATURE_STORE / f"{name}.npz"
+    if not path.exists():
+        return None
+    with np.load(path) as saved:
+        store = FeatureStore(saved["variables"].tolist(), tuple(saved["windows"].tolist()))
+        store.gameweeks = saved["gameweeks"].tolist()
+        store.player_ids = saved["player_ids"]
+        store.rows = {player_id: row for row, player_id in enumerate(store.player_ids.tolist())}
+        store.played = saved["played"]
+        store.history = saved["history"]
+        store.sums = saved["sums"]
+        store.totals = saved["totals"]
+    return store
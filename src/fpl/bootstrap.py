@@ -0,0 +1,90 @@
+import json
+import mmap
+import re
+from pathlib import Path
+
+# Walks the top level of the bootstrap-static object without decoding all of it. Unwanted values are skipped by
+# matching brackets, everything between two brackets (strings included) being consumed by one regex match. Wanted
+# values are decoded straight from their offset, first from a small window (enough for events) and otherwise from
+# the rest of the payload.
+DECODE_WINDOW = 64 * 1024
+_DECODER = json.JSONDecoder()
+_STRING_PATTERN = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_STRING = re.compile(_STRING_PATTERN)
+_FILLER = re.compile(rb'(?:[^"\[\]{}]+|' + _STRING_PATTERN + rb")*")
+_SCALAR = re.compile(rb"[^,}\s]*")
+_WHITESPACE = re.compile(rb"\s*")
+
+
+def _skip_whitespace(body, position: int) -> int:
+    return _WHITESPACE.match(body, position).end()
+
+
+def _value_end(body, start: int) -> int:
+    if body[start : start + 1] == b'"':
+        return _STRING.match(body, start).end()
+    if body[start : start + 1] not in (b"[", b"{"):
+        return _SCALAR.match(body, start).end()
+    depth = 0
+    position = start
+    while True:
+        bracket = body[position : position + 1]
+        if not bracket:
+            raise ValueError("Truncated bootstrap-static payload")
+        depth += 1 if bracket in (b"[", b"{") else -1
+        position += 1
+        if depth == 0:
+            return position
+        position = _FILLER.match(body, position).end()
+
+
+def _decode_value(body, start: int, last: bool) -> tuple:
+    # Returns the value and the offset right after it, which is left as None for the last wanted section.
+    window = body[start : start + DECODE_WINDOW]
+    try:
+        # A multi-byte character cut by the window edge is dropped, the value has to end before it anyway.
+        text = window.decode("utf-8", errors="ignore")
+        value, end = _DECODER.raw_decode(text)
+    except json.JSONDecodeError:
+        if len(window) < DECODE_WINDOW:
+            raise
+        with memoryview(body) as view:
+            text = str(view[start:], "utf-8")
+        value, end = _DECODER.raw_decode(text)
+    return value, None if last else start + len(text[:end].encode("utf-8"))
+
+
+def iter_sections(body, sections: tuple = None):
+    # Yields (name, value) for the requested top-level keys in payload order and stops once all of them are found.
+    wanted = set(sections) if sections is not None else None
+    position = _skip_whitespace(body, 0)
+    if body[position : position + 1] != b"{":
+        raise ValueError("bootstrap-static payload is not a JSON object")
+    position += 1
+    while wanted is None or wanted:
+        position = _skip_whitespace(body, position)
+        if body[position : position + 1] == b"}":
+            return
+        key_end = _STRING.match(body, position).end()
+        name = json.loads(body[position:key_end])
+        start = _skip_whitespace(body, _skip_whitespace(body, key_end) + 1)
+        if wanted is None or name in wanted:
+            if wanted is not None:
+                wanted.discard(name)
+            value, end = _decode_value(body, start, last=wanted == set())
+            yield name, value
+            if end is None:
+                return
+        else:
+            end = _value_end(body, start)
+        position = _skip_whitespace(body, end)
+        if body[position : position + 1] == b",":
+            position += 1
+
+
+def read_sections(source, sections: tuple = None) -> dict:
+    # source is the payload itself or the path of a cached copy, which is memory-mapped instead of read whole.
+    if not isinstance(source, Path):
+        return dict(iter_sections(source, sections))
+    with source.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as body:
+        return dict(iter_sections(body, sections))
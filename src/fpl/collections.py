@@ -0,0 +1,58 @@
+# Value kind of every key emitted by extract_player_fpl_stats, using the same vocabulary as the fbref FIELD_TYPES.
+# ep_next/ep_this and the news timestamp are passed through from the API untouched. ep_next/ep_this are numbers in
+# text ("signed"), parsed by the compact schema of src.schemas.
+FPL_FIELD_TYPES = {
+    "player_id": "int",
+    "name": "text",
+    "display_slug": "text",
+    "team_id": "int",
+    "team": "text",
+    "team_slug": "text",
+    "position": "text",
+    "points_per_game": "to_float",
+    "form": "to_float",
+    "news": "text",
+    "news_added_at": "text",
+    "status": "text",
+    "total_points": "int",
+    "value_form": "to_float",
+    "value_season": "to_float",
+    "selected_by_percent": "to_float",
+    "influence_rank_overall": "int",
+    "creativity_rank_overall": "int",
+    "threat_rank_overall": "int",
+    "influence_rank_by_position": "int",
+    "creativity_rank_by_position": "int",
+    "threat_rank_by_position:": "int",
+    "ict_index": "int",
+    "ict_index_by_position": "int",
+    "dreamteam_count": "int",
+    "transfers_in": "int",
+    "transfers_out": "int",
+    "chance_of_playing_next_round": "int",
+    "chance_of_playing_this_round": "int",
+    "cost_change_event": "int",
+    "cost_change_event_fall": "int",
+    "cost_change_start": "int",
+    "cost_change_start_fall": "int",
+    "ep_next": "signed",
+    "ep_this": "signed",
+    "now_cost": "int",
+    "transfers_in_event": "int",
+    "transfers_out_event": "int",
+    "goals_scored": "int",
+    "assists": "int",
+    "clean_sheets": "int",
+    "goals_conceded": "int",
+    "penalties_saved": "int",
+    "penalties_missed": "int",
+    "saves": "int",
+    "bonus": "int",
+    "bps": "int",
+    "corners_and_indirect_freekicks_order": "int",
+    "corners_and_indirect_freekicks_text": "text",
+    "direct_freekicks_order": "int",
+    "direct_freekicks_text": "text",
+    "penalties_order": "int",
+    "penalties_text": "text",
+}
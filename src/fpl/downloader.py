@@ -1,8 +1,36 @@
+import numpy as np
+import pandas as pd
 from fastcore.basics import typed
 
 from src.constants import CATEGORY_TYPES
+from src.fpl.collections import FPL_FIELD_TYPES
 from src.utilities import to_float
 
+# API key behind every column of extract_player_fpl_stats that is copied (or only converted) from the element.
+# name, team, team_slug and position are derived and built separately in extract_fpl_elements.
+FPL_ELEMENT_SOURCES = {
+    "player_id": "id",
+    "display_slug": "web_name",
+    "team_id": "team",
+    "points_per_game": "points_per_game",
+    "form": "form",
+    "news": "news",
+    "news_added_at": "news_added",
+    "status": "status",
+    "total_points": "total_points",
+    "value_form": "value_form",
+    "value_season": "value_season",
+    "selected_by_percent": "selected_by_percent",
+    "influence_rank_overall": "influence_rank",
+    "creativity_rank_overall": "creativity_rank",
+    "threat_rank_overall": "threat_rank",
+    "influence_rank_by_position": "influence_rank_type",
+    "creativity_rank_by_position": "creativity_rank_type",
+    "threat_rank_by_position:": "threat_rank_type",
+    "ict_index": "ict_index_rank",
+    "ict_index_by_position": "ict_index_rank_type",
+}
+
 
 @typed
 def extract_team_details(team: dict) -> dict:
@@ -69,3 +97,30 @@ def extract_player_fpl_stats(player: dict, fpl_team_mapper: dict) -> dict:
         "penalties_order": player["penalties_order"],
         "penalties_text": player["penalties_text"],
     }
+
+
+def _to_float_column(values: list) -> np.ndarray:
+    # Column-wide to_float: empty and missing values become 0.0, everything else goes through str -> float.
+    return np.fromiter((float(str(value)) if value else 0.0 for value in values), dtype=float, count=len(values))
+
+
+@typed
+def extract_fpl_elements(elements: list, teams: list) -> pd.DataFrame:
+    def column(key):
+        return [element[key] for element in elements]
+
+    team_codes = pd.Series(column("team_code"))
+    team_names = {team["code"]: team["name"].lower().replace(" ", "_") for team in teams}
+    team_slugs = {team["code"]: team["short_name"] for team in teams}
+    columns = {
+        "name": [f"{first} {second}" for first, second in zip(column("first_name"), column("second_name"))],
+        "team": team_codes.map(team_names).to_numpy(),
+        "team_slug": team_codes.map(team_slugs).to_numpy(),
+        "position": pd.Series(column("element_type")).astype(str).map(CATEGORY_TYPES).to_numpy(),
+    }
+    for name, kind in FPL_FIELD_TYPES.items():
+        if name in columns:
+            continue
+        values = column(FPL_ELEMENT_SOURCES.get(name, name))
+        columns[name] = _to_float_column(values) if kind == "to_float" else values
+    return pd.DataFrame({name: columns[name] for name in FPL_FIELD_TYPES})
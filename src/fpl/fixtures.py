@@ -0,0 +1,97 @@
+import collections
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.constants import FPL_URL_FIXTURES, SEASON_GAMEWEEKS
+from src.metrics import span
+
+# Fixtures of a season as dense team x gameweek arrays, rows in the order of teams and column g for gameweek g + 1.
+# fixtures counts the matches of a team in a gameweek (0 for a blank, 2 for a double), home its home matches and
+# difficulty the sum of their FDR. The cumulative arrays hold the running totals along the season with a leading
+# zero column, so the total over any window of gameweeks is one subtraction for every team at once.
+FixtureMatrix = collections.namedtuple("FixtureMatrix", ["teams", "fixtures", "home", "difficulty", "cumulative"])
+FIXTURE_FIELDS = ("fixtures", "home", "difficulty")
+_FIXTURES = {}
+
+
+def fixture_matrix(
+    teams: np.ndarray,
+    gameweeks: np.ndarray,
+    was_home: np.ndarray,
+    difficulty: np.ndarray,
+    season_gameweeks: int = SEASON_GAMEWEEKS,
+) -> FixtureMatrix:
+    # One entry per team per fixture, unscheduled fixtures (no gameweek yet) are left out.
+    scheduled = ~pd.isna(gameweeks)
+    team_ids, rows = np.unique(np.asarray(teams)[scheduled].astype(np.int64), return_inverse=True)
+    columns = np.asarray(gameweeks)[scheduled].astype(np.int64) - 1
+    arrays = {field: np.zeros((len(team_ids), season_gameweeks), dtype=np.int16) for field in FIXTURE_FIELDS}
+    np.add.at(arrays["fixtures"], (rows, columns), 1)
+    np.add.at(arrays["home"], (rows, columns), np.asarray(was_home)[scheduled].astype(np.int16))
+    np.add.at(arrays["difficulty"], (rows, columns), np.asarray(difficulty)[scheduled].astype(np.int16))
+    cumulative = {
+        field: np.concatenate([np.zeros((len(team_ids), 1), dtype=np.int32), values.cumsum(axis=1, dtype=np.int32)], 1)
+        for field, values in arrays.items()
+    }
+    return FixtureMatrix(teams=team_ids, cumulative=cumulative, **arrays)
+
+
+def fixtures_from_api(fixtures: list) -> FixtureMatrix:
+    # Rows of the FPL fixtures endpoint, one per match, become a home and an away entry.
+    frame = pd.DataFrame(fixtures, columns=["event", "team_h", "team_a", "team_h_difficulty", "team_a_difficulty"])
+    return fixture_matrix(
+        teams=np.concatenate([frame.team_h.to_numpy(), frame.team_a.to_numpy()]),
+        gameweeks=np.concatenate([frame.event.to_numpy(), frame.event.to_numpy()]),
+        was_home=np.repeat([1, 0], len(frame)),
+        difficulty=np.concatenate([frame.team_h_difficulty.to_numpy(), frame.team_a_difficulty.to_numpy()]),
+    )
+
+
+def fixtures_from_gw_data(dataframe: pd.DataFrame) -> FixtureMatrix:
+    # The gw_data tables of the xP notebooks: team id, "h" or "a", "gw_<n>" and fdr, one row per team per fixture.
+    return fixture_matrix(
+        teams=dataframe.id.to_numpy(),
+        gameweeks=dataframe.gw.str.replace("gw_", "").astype(int).to_numpy(),
+        was_home=(dataframe.fixture == "h").to_numpy(),
+        difficulty=dataframe.fdr.to_numpy(),
+    )
+
+
+def load_fixtures(proxies: list = None, via_proxy: bool = False, refresh: bool = False) -> FixtureMatrix:
+    # Fetched once per process, every query of the run reads the same arrays.
+    from src.utilities import request_obj
+
+    if refresh or "matrix" not in _FIXTURES:
+        response = request_obj(url=FPL_URL_FIXTURES, proxies=proxies or [], via_proxy=via_proxy)
+        response.raise_for_status()
+        with span("parse", "fpl_fixtures") as parse_span:
+            _FIXTURES["matrix"] = fixtures_from_api(response.json())
+            parse_span.add(bytes=len(response.content))
+        logger.info(f"[FIXTURES] Loaded the fixtures of {len(_FIXTURES['matrix'].teams)} teams")
+    return _FIXTURES["matrix"]
+
+
+def team_rows(matrix: FixtureMatrix, team_ids) -> np.ndarray:
+    # Row of each team id in the matrix, -1 for teams without fixtures.
+    team_ids = np.asarray(team_ids, dtype=np.int64)
+    rows = np.searchsorted(matrix.teams, team_ids).clip(max=len(matrix.teams) - 1)
+    return np.where(matrix.teams[rows] == team_ids, rows, -1)
+
+
+def window_sums(matrix: FixtureMatrix, start, window: int, field: str = "difficulty") -> np.ndarray:
+    # Totals over gameweeks start .. start + window - 1 for every team, windows running past the end of the season
+    # stop there. start is a gameweek or an array of them, giving a (teams, starts) array.
+    cumulative = matrix.cumulative[field]
+    first = np.clip(np.asarray(start) - 1, 0, cumulative.shape[1] - 1)
+    last = np.clip(first + window, 0, cumulative.shape[1] - 1)
+    return cumulative[:, last] - cumulative[:, first]
+
+
+def window_difficulty(matrix: FixtureMatrix, start, window: int) -> np.ndarray:
+    # Mean FDR per match over the window, NaN for teams without a match in it.
+    fixtures = window_sums(matrix, start, window, "fixtures")
+    difficulty = window_sums(matrix, start, window, "difficulty")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(fixtures > 0, difficulty / fixtures, np.nan)
@@ -0,0 +1,171 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+import pandas as pd
+from loguru import logger
+
+from src.constants import FBREF_POSITIONS, FBREF_TEAM_SLUGS
+
+# A pair is matched when its score clears MATCH_THRESHOLD and beats the runner-up candidate by MATCH_MARGIN, pairs
+# between REVIEW_THRESHOLD and that go to the review queue together with everything that could not be decided.
+MATCH_THRESHOLD = 0.85
+MATCH_MARGIN = 0.1
+REVIEW_THRESHOLD = 0.5
+NGRAM = 3
+# Columns the matcher reads from each snapshot, kept when the combiner projects columns.
+MATCH_COLUMNS = {
+    "fbref": ["name", "position", "squad"],
+    "fpl_official": ["name", "display_slug", "team_slug", "position"],
+}
+# Letters that have no ASCII decomposition under NFKD.
+TRANSLITERATIONS = str.maketrans({"ł": "l", "ø": "o", "ð": "d", "đ": "d", "þ": "th", "æ": "ae", "ß": "ss", "ı": "i"})
+REVIEW_COLUMNS = [
+    "fbref_id",
+    "fbref_name",
+    "squad",
+    "fbref_position",
+    "player_id",
+    "fpl_name",
+    "score",
+    "runner_up_score",
+    "reason",
+]
+
+
+def normalize_name(name: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", str(name).lower().translate(TRANSLITERATIONS))
+    ascii_name = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", ascii_name).split())
+
+
+def _ngrams(name: str) -> frozenset:
+    padded = f"  {name} "
+    return frozenset(padded[position : position + NGRAM] for position in range(len(padded) - NGRAM + 1))
+
+
+def _name_features(name: str) -> tuple:
+    name = normalize_name(name)
+    return _ngrams(name), frozenset(name.split())
+
+
+def _dice(left: frozenset, right: frozenset) -> float:
+    return 2 * len(left & right) / (len(left) + len(right)) if left and right else 0.0
+
+
+def name_score(fbref_features: tuple, fpl_features: tuple) -> float:
+    # fbref mostly prints the common name ("Bruno Fernandes"), FPL the full one ("Bruno Miguel Borges Fernandes")
+    # plus a short web name, so the best of trigram similarity against either and token containment is kept.
+    # A shortened first name counts as contained when it starts an FPL token ("Ben" Chilwell, "Benjamin" Chilwell).
+    grams, tokens = fbref_features
+    full_grams, short_grams, fpl_tokens = fpl_features
+    contained = sum(
+        token in fpl_tokens or (len(token) >= 3 and any(fpl_token.startswith(token) for fpl_token in fpl_tokens))
+        for token in tokens
+    )
+    containment = contained / len(tokens) if tokens else 0.0
+    return max(_dice(grams, full_grams), _dice(grams, short_grams), containment)
+
+
+def _fpl_index(fpl_players: pd.DataFrame) -> tuple:
+    features = {}
+    blocks = defaultdict(list)
+    for player_id, name, display_slug, team_slug, position in zip(
+        fpl_players.player_id,
+        fpl_players.name,
+        fpl_players.display_slug,
+        fpl_players.team_slug,
+        fpl_players.position,
+    ):
+        full_grams, tokens = _name_features(name)
+        short_grams, short_tokens = _name_features(display_slug)
+        features[player_id] = (full_grams, short_grams, tokens | short_tokens)
+        for block in ((team_slug, position), team_slug, position, None):
+            blocks[block].append(player_id)
+    return features, blocks
+
+
+def _candidates(blocks: dict, team: str, positions: set) -> list:
+    # Narrowest block first: same club and position, the whole club (fbref and FPL disagree on some positions), and
+    # for clubs without a known FPL slug the position across the league.
+    if team:
+        return [
+            [player_id for position in sorted(positions) for player_id in blocks.get((team, position), [])],
+            blocks.get(team, []),
+        ]
+    return [[player_id for position in sorted(positions) for player_id in blocks.get(position, [])], blocks[None]]
+
+
+def _best_candidates(fbref_features: tuple, fpl_features: dict, candidate_blocks: list) -> tuple:
+    best, runner_up = (None, 0.0), 0.0
+    for candidates in candidate_blocks:
+        for player_id in candidates:
+            score = name_score(fbref_features, fpl_features[player_id])
+            if score > best[1]:
+                best, runner_up = (player_id, score), best[1]
+            elif score > runner_up and player_id != best[0]:
+                runner_up = score
+        if best[1] >= MATCH_THRESHOLD:
+            break
+    return best[0], best[1], runner_up
+
+
+def match_players(fpl_players: pd.DataFrame, fbref_players: pd.DataFrame) -> tuple:
+    # fpl_players needs player_id, name, display_slug, team_slug and position, fbref_players fbref_id, name,
+    # position and squad. Returns the confident (player_id, fbref_id, score) matches and the review queue.
+    fpl_features, blocks = _fpl_index(fpl_players)
+    fpl_names = dict(zip(fpl_players.player_id, fpl_players.name))
+    squads = fbref_players.squad if "squad" in fbref_players else [None] * len(fbref_players)
+
+    proposals = []
+    for fbref_id, name, position, squad in zip(
+        fbref_players.fbref_id, fbref_players.name, fbref_players.position, squads
+    ):
+        positions = {FBREF_POSITIONS[code] for code in str(position).split(",") if code in FBREF_POSITIONS}
+        candidate_blocks = _candidates(blocks, FBREF_TEAM_SLUGS.get(squad), positions)
+        player_id, score, runner_up = _best_candidates(_name_features(name), fpl_features, candidate_blocks)
+        proposals.append((score, runner_up, fbref_id, name, squad, position, player_id))
+
+    # Pairs are accepted best score first, an FPL player already taken by a better pair sends the rest to review.
+    # A player listed by two squads (a mid-season transfer) is only matched once.
+    matches, review, taken, matched = [], [], set(), set()
+    for score, runner_up, fbref_id, name, squad, position, player_id in sorted(
+        proposals, key=lambda proposal: -proposal[0]
+    ):
+        if fbref_id in matched:
+            continue
+        if player_id is None:
+            reason = "no candidates"
+        elif player_id in taken:
+            reason = "candidate already matched"
+        elif score < REVIEW_THRESHOLD:
+            reason = "low score"
+        elif score < MATCH_THRESHOLD:
+            reason = "below match threshold"
+        elif score - runner_up < MATCH_MARGIN:
+            reason = "ambiguous"
+        else:
+            taken.add(player_id)
+            matched.add(fbref_id)
+            matches.append((player_id, fbref_id, round(score, 3)))
+            continue
+        review.append(
+            (fbref_id, name, squad, position, player_id, fpl_names.get(player_id), round(score, 3), round(runner_up, 3))
+            + (reason,)
+        )
+
+    logger.info(f"[MATCH] {len(matches)} players matched, {len(review)} sent to review")
+    return (
+        pd.DataFrame(matches, columns=["player_id", "fbref_id", "score"]),
+        pd.DataFrame(review, columns=REVIEW_COLUMNS).drop_duplicates("fbref_id"),
+    )
+
+
+def resolve_player_mapping(fpl_data: pd.DataFrame, fbref_data: pd.DataFrame, mappers: pd.DataFrame) -> tuple:
+    # The hand-maintained mapping stays authoritative, only players it does not cover on either side are matched.
+    fbref_ids = fbref_data.fbref_id if "fbref_id" in fbref_data else fbref_data.profile_url.str.split("/").str[5]
+    fbref_players = fbref_data.assign(fbref_id=fbref_ids).drop_duplicates("fbref_id")
+    fbref_players = fbref_players[~fbref_players.fbref_id.isin(mappers.fbref_id)]
+    fpl_players = fpl_data[~fpl_data.player_id.isin(mappers.player_id)].drop_duplicates("player_id")
+    matches, review = match_players(fpl_players, fbref_players)
+    return pd.concat([mappers, matches[["player_id", "fbref_id"]]], ignore_index=True), review
@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # resource is POSIX only, peak RSS is reported as 0 elsewhere
+    resource = None
+
+_METRICS = {"enabled": False, "jsonl": None, "prometheus": None, "totals": defaultdict(lambda: defaultdict(float))}
+PROMETHEUS_PREFIX = "fpl_stats"
+# Spans close on the scraper's worker threads, the totals and the JSONL file are shared between them.
+_METRICS_LOCK = threading.Lock()
+
+
+def configure_metrics(jsonl_path: str = None, prometheus_path: str = None) -> None:
+    _METRICS.update(
+        enabled=bool(jsonl_path or prometheus_path),
+        jsonl=Path(jsonl_path) if jsonl_path else None,
+        prometheus=Path(prometheus_path) if prometheus_path else None,
+    )
+    with _METRICS_LOCK:
+        _METRICS["totals"].clear()
+
+
+def metrics_enabled() -> bool:
+    return _METRICS["enabled"]
+
+
+def peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Span:
+    __slots__ = ("stage", "name", "counters", "wall_started", "cpu_started")
+
+    def __init__(self, stage: str, name: str = ""):
+        self.stage = stage
+        self.name = name
+        self.counters = {}
+
+    def add(self, **counters) -> None:
+        for counter, value in counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def __enter__(self):
+        self.wall_started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        record = {
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "stage": self.stage,
+            "name": self.name,
+            "wall_seconds": round(time.perf_counter() - self.wall_started, 6),
+            "cpu_seconds": round(time.thread_time() - self.cpu_started, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "ok": exc_type is None,
+            **self.counters,
+        }
+        with _METRICS_LOCK:
+            totals = _METRICS["totals"][(self.stage, self.name)]
+            totals["count"] += 1
+            for key in ("wall_seconds", "cpu_seconds", *self.counters):
+                totals[key] += record[key]
+            if _METRICS["jsonl"]:
+                _METRICS["jsonl"].parent.mkdir(parents=True, exist_ok=True)
+                with open(_METRICS["jsonl"], "a") as jsonl:
+                    jsonl.write(json.dumps(record) + "\n")
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def add(self, **counters) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(stage: str, name: str = ""):
+    # When metrics are off every call site gets the same no-op object, so instrumentation costs one dict lookup.
+    if not _METRICS["enabled"]:
+        return NULL_SPAN
+    return Span(stage, name)
+
+
+def write_prometheus() -> None:
+    if not _METRICS["prometheus"]:
+        return
+    with _METRICS_LOCK:
+        stage_totals = sorted((key, dict(totals)) for key, totals in _METRICS["totals"].items())
+    samples = defaultdict(list)
+    for (stage, name), totals in stage_totals:
+        labels = f'stage="{stage}",name="{name}"'
+        for key, value in totals.items():
+            samples[key].append(f"{PROMETHEUS_PREFIX}_stage_{key}{{{labels}}} {value}")
+
+    lines = []
+    for key, metric_lines in samples.items():
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_{key} gauge")
+        lines.extend(metric_lines)
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_peak_rss_bytes gauge")
+    lines.append(f"{PROMETHEUS_PREFIX}_peak_rss_bytes {peak_rss_bytes()}")
+    lines.append(f"# TYPE {PROMETHEUS_PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{PROMETHEUS_PREFIX}_last_run_timestamp_seconds {time.time()}")
+
+    # The node exporter textfile collector may read at any time, so the file is swapped in with a rename.
+    path = _METRICS["prometheus"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text("\n".join(lines) + "\n")
+    tmp_path.replace(path)
@@ -0,0 +1,117 @@
+import numpy as np
+
+from src.constants import (
+    CLUB_LIMIT,
+    LINEUP_POSITIONS,
+    LINEUP_SIZE,
+    MAX_FREE_TRANSFERS,
+    SQUAD_POSITIONS,
+    TRANSFER_HIT,
+)
+
+# Greedy fallback for when PuLP or its solver is unavailable, or the solver finds no solution in time. Players are
+# rows of the pool arrays: positions holds the index of the position in SQUAD_POSITIONS, clubs an integer code.
+SQUAD_COUNTS = np.array(list(SQUAD_POSITIONS.values()))
+LINEUP_MINIMUM = np.array([minimum for minimum, _ in LINEUP_POSITIONS.values()])
+LINEUP_MAXIMUM = np.array([maximum for _, maximum in LINEUP_POSITIONS.values()])
+
+
+def best_lineup(squad: np.ndarray, positions: np.ndarray, points: np.ndarray) -> tuple:
+    # Starting XI and captain of the squad rows for one gameweek: the best players of each position up to the
+    # formation minimum, then the best of the rest while their position is under its maximum.
+    order = squad[np.argsort(-points[squad], kind="stable")]
+    counts = np.zeros(len(SQUAD_COUNTS), dtype=np.int64)
+    lineup = []
+    for row in order:
+        if counts[positions[row]] < LINEUP_MINIMUM[positions[row]]:
+            lineup.append(row)
+            counts[positions[row]] += 1
+    for row in order:
+        if len(lineup) == LINEUP_SIZE:
+            break
+        if row not in lineup and counts[positions[row]] < LINEUP_MAXIMUM[positions[row]]:
+            lineup.append(row)
+            counts[positions[row]] += 1
+    lineup = np.array(lineup, dtype=np.int64)
+    return lineup, lineup[np.argmax(points[lineup])]
+
+
+def _swap_candidates(squad, row, positions, clubs, costs, budget) -> np.ndarray:
+    # Players that can replace row: same position, not in the squad, within budget and the club limit without row.
+    club_counts = np.bincount(clubs[squad], minlength=clubs.max() + 1)
+    club_counts[clubs[row]] -= 1
+    candidates = (positions == positions[row]) & (club_counts[clubs] < CLUB_LIMIT)
+    candidates &= costs <= budget - costs[squad].sum() + costs[row]
+    candidates[squad] = False
+    return candidates
+
+
+def greedy_squad(positions: np.ndarray, clubs: np.ndarray, costs: np.ndarray, values: np.ndarray, budget: float):
+    # Best value first while the cheapest players of the positions still needed fit the remaining budget, then single
+    # swaps for a better player of the same position until none improves the squad.
+    cheapest = [np.sort(costs[positions == position]) for position in range(len(SQUAD_COUNTS))]
+    needed = SQUAD_COUNTS.copy()
+    club_counts = np.zeros(clubs.max() + 1, dtype=np.int64)
+    squad, spent = [], 0
+    for row in np.argsort(-values, kind="stable"):
+        position = positions[row]
+        if not needed[position] or club_counts[clubs[row]] >= CLUB_LIMIT:
+            continue
+        needed[position] -= 1
+        reserve = sum(cheapest[other][: needed[other]].sum() for other in range(len(SQUAD_COUNTS)))
+        if spent + costs[row] + reserve > budget:
+            needed[position] += 1
+            continue
+        squad.append(row)
+        spent += costs[row]
+        club_counts[clubs[row]] += 1
+        if not needed.any():
+            break
+    if needed.any():
+        return None
+    squad = np.array(squad, dtype=np.int64)
+
+    improved = True
+    while improved:
+        improved = False
+        for slot, row in enumerate(squad):
+            candidates = np.flatnonzero(_swap_candidates(squad, row, positions, clubs, costs, budget))
+            if len(candidates) and values[candidates].max() > values[row]:
+                squad[slot] = candidates[np.argmax(values[candidates])]
+                improved = True
+    return np.sort(squad)
+
+
+def plan_transfers(
+    positions: np.ndarray,
+    clubs: np.ndarray,
+    costs: np.ndarray,
+    points: np.ndarray,
+    squad: np.ndarray,
+    budget: float,
+    free_transfers: int,
+) -> list:
+    # Squad of each gameweek of the horizon (points has one column per gameweek). Every gameweek the single transfer
+    # gaining the most points over the rest of the horizon is made while it beats TRANSFER_HIT, or 0 with free
+    # transfers left, and unused free transfers roll over.
+    squads = []
+    for gameweek in range(points.shape[1]):
+        remaining = points[:, gameweek:].sum(axis=1)
+        made = 0
+        while True:
+            threshold = 0 if made < free_transfers else TRANSFER_HIT
+            best = (threshold, None, None)
+            for slot, row in enumerate(squad):
+                candidates = np.flatnonzero(_swap_candidates(squad, row, positions, clubs, costs, budget))
+                if len(candidates):
+                    candidate = candidates[np.argmax(remaining[candidates])]
+                    if remaining[candidate] - remaining[row] > best[0]:
+                        best = (remaining[candidate] - remaining[row], slot, candidate)
+            if best[1] is None:
+                break
+            squad = squad.copy()
+            squad[best[1]] = best[2]
+            made += 1
+        squads.append(np.sort(squad))
+        free_transfers = min(MAX_FREE_TRANSFERS, max(free_transfers - made, 0) + 1)
+    return squads
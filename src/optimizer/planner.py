@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.constants import (
+    MAX_FREE_TRANSFERS,
+    OPTIMIZER_POOL_SIZE,
+    SQUAD_BUDGET,
+    SQUAD_POSITIONS,
+)
+from src.metrics import span
+from src.optimizer.heuristic import best_lineup, greedy_squad, plan_transfers
+
+PLAYER_COLUMNS = ["player_id", "position", "team_slug", "now_cost"]
+
+
+def candidate_pool(
+    players: pd.DataFrame, expected_points: pd.DataFrame, current_squad: list = None, size: int = OPTIMIZER_POOL_SIZE
+) -> pd.DataFrame:
+    # The size best players of each position over the horizon plus the current squad. Anyone else would only be picked
+    # over one of them at a loss, and the problem stays small enough to solve in seconds.
+    horizon_points = expected_points.sum(axis=1).reindex(players.player_id).fillna(0).to_numpy()
+    ranks = pd.Series(-horizon_points).groupby(players.position.to_numpy()).rank(method="first").to_numpy()
+    keep = (ranks <= size) | players.player_id.isin(current_squad or []).to_numpy()
+    return players[keep].reset_index(drop=True)
+
+
+def _pool_arrays(players: pd.DataFrame, expected_points: pd.DataFrame) -> tuple:
+    positions = players.position.map({position: code for code, position in enumerate(SQUAD_POSITIONS)})
+    if positions.isna().any():
+        raise ValueError(
+            f"Unknown positions in the player pool: {', '.join(players.position[positions.isna()].unique())}"
+        )
+    clubs = pd.factorize(players.team_slug)[0]
+    points = expected_points.reindex(players.player_id).fillna(0).to_numpy(dtype=np.float64)
+    return positions.to_numpy(dtype=np.int64), clubs.astype(np.int64), players.now_cost.to_numpy(dtype=np.int64), points
+
+
+def _heuristic_plan(positions, clubs, costs, points, current, budget, free_transfers) -> list:
+    with span("solve", "squad_heuristic"):
+        if current is None:
+            squad = greedy_squad(positions, clubs, costs, points.sum(axis=1), budget)
+            if squad is None:
+                raise ValueError(f"No squad fits a budget of {budget}")
+            return [squad] + plan_transfers(positions, clubs, costs, points[:, 1:], squad, budget, 1)
+        return plan_transfers(positions, clubs, costs, points, current, budget, free_transfers)
+
+
+def plan_squad(
+    players: pd.DataFrame,
+    expected_points: pd.DataFrame,
+    current_squad: list = None,
+    bank: int = 0,
+    free_transfers: int = 1,
+    solver: str = "auto",
+) -> tuple:
+    # players holds the pool (player_id, position, team_slug and now_cost as in the fpl_official snapshots) and
+    # expected_points one column of predicted points per gameweek of the horizon, indexed by player_id. Without a
+    # current squad a new one is picked within SQUAD_BUDGET, otherwise the budget is bank plus the squad's current
+    # value (selling prices are not known, now_cost stands in for them). solver is "pulp", "heuristic" or "auto",
+    # which falls back to the heuristic when PuLP is missing or finds no solution. Returns one row per player of each
+    # gameweek's squad and the name of the solver that made the plan.
+    players = players[PLAYER_COLUMNS].drop_duplicates("player_id").reset_index(drop=True)
+    positions, clubs, costs, points = _pool_arrays(players, expected_points)
+    rows = {player_id: row for row, player_id in enumerate(players.player_id.tolist())}
+    missing = [player_id for player_id in current_squad or [] if player_id not in rows]
+    if missing:
+        raise ValueError(f"Current squad players missing from the pool: {missing}")
+    current = np.array([rows[player_id] for player_id in current_squad], dtype=np.int64) if current_squad else None
+    budget = SQUAD_BUDGET if current is None else bank + costs[current].sum()
+    free_transfers = min(free_transfers, MAX_FREE_TRANSFERS)
+
+    squads, used = None, "pulp"
+    if solver != "heuristic":
+        try:
+            from src.optimizer.problem import build_problem, solve_problem
+
+            structure = build_problem(positions, clubs, points.shape[1])
+            # The heuristic plan is cheap and feasible, the solver starts from it instead of from scratch.
+            warm_start = _heuristic_plan(positions, clubs, costs, points, current, budget, free_transfers)
+            squads = solve_problem(structure, costs, points, current, budget, free_transfers, warm_start)
+        except ImportError as err:
+            if solver == "pulp":
+                raise
+            logger.warning(f"[OPTIMIZER] {err}, planning with the heuristic")
+    if squads is None:
+        if solver == "pulp":
+            raise ValueError("The solver found no squad plan")
+        squads = _heuristic_plan(positions, clubs, costs, points, current, budget, free_transfers)
+        used = "heuristic"
+    return _plan_frame(players, positions, points, current, squads, expected_points.columns), used
+
+
+def _plan_frame(players, positions, points, current, squads, gameweeks) -> pd.DataFrame:
+    frames = []
+    previous = set(current.tolist()) if current is not None else set()
+    for position, (gameweek, squad) in enumerate(zip(gameweeks, squads)):
+        lineup, captain = best_lineup(squad, positions, points[:, position])
+        frame = players.iloc[squad].reset_index(drop=True)
+        frame.insert(0, "gameweek", gameweek)
+        frame["expected_points"] = points[squad, position]
+        frame["starting"] = np.isin(squad, lineup)
+        frame["captain"] = squad == captain
+        frame["transferred_in"] = [row not in previous for row in squad.tolist()]
+        frames.append(frame)
+        previous = set(squad.tolist())
+    return pd.concat(frames, ignore_index=True)
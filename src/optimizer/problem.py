@@ -0,0 +1,253 @@
+import numpy as np
+from loguru import logger
+
+from src.constants import (
+    BENCH_WEIGHT,
+    CLUB_LIMIT,
+    LINEUP_POSITIONS,
+    LINEUP_SIZE,
+    MAX_FREE_TRANSFERS,
+    OPTIMIZER_TIME_LIMIT,
+    SQUAD_POSITIONS,
+    TRANSFER_HIT,
+)
+from src.metrics import span
+from src.optimizer.heuristic import best_lineup
+
+# The squad, lineup, captain and transfer constraints only depend on the positions and clubs of the pool and on the
+# horizon, so they are built once per pool and kept in _PROBLEMS. A solve only swaps the parts that change between
+# gameweeks and what-if runs: the objective, the budget rows (prices move), the right-hand side of the first
+# gameweek's squad rows (the current squad) and the bounds of the first gameweek's free transfers.
+_PROBLEMS = {}
+
+
+def _expression(pulp, variables, coefficients=None):
+    coefficients = np.ones(len(variables)) if coefficients is None else coefficients
+    return pulp.LpAffineExpression(zip(variables, coefficients.tolist()))
+
+
+def _add(problem, pulp, name: str, variables, sense, rhs: float, coefficients=None):
+    constraint = pulp.LpConstraint(_expression(pulp, variables, coefficients), sense, name, rhs)
+    problem += constraint
+    return constraint
+
+
+def build_problem(positions: np.ndarray, clubs: np.ndarray, horizon: int) -> dict:
+    import pulp
+
+    key = (positions.tobytes(), clubs.tobytes(), horizon)
+    if key in _PROBLEMS:
+        return _PROBLEMS[key]
+
+    with span("build", "squad_problem") as build_span:
+        players = range(len(positions))
+        gameweeks = range(horizon)
+        problem = pulp.LpProblem("fpl_squad", pulp.LpMaximize)
+        variables = {
+            kind: [
+                [pulp.LpVariable(f"{kind}_{gameweek}_{row}", cat="Binary") for row in players] for gameweek in gameweeks
+            ]
+            for kind in ("squad", "lineup", "captain", "buy", "sell")
+        }
+        free = [pulp.LpVariable(f"free_{gameweek}", 0, MAX_FREE_TRANSFERS, cat="Integer") for gameweek in gameweeks]
+        paid = [pulp.LpVariable(f"paid_{gameweek}", 0, cat="Integer") for gameweek in gameweeks]
+        held = []
+        members = {position: np.flatnonzero(positions == code) for code, position in enumerate(SQUAD_POSITIONS)}
+
+        for gameweek in gameweeks:
+            squad, lineup, captain, buy, sell = (variables[kind][gameweek] for kind in variables)
+            _add(problem, pulp, f"squad_size_{gameweek}", squad, pulp.LpConstraintEQ, sum(SQUAD_POSITIONS.values()))
+            _add(problem, pulp, f"lineup_size_{gameweek}", lineup, pulp.LpConstraintEQ, LINEUP_SIZE)
+            _add(problem, pulp, f"captain_{gameweek}", captain, pulp.LpConstraintEQ, 1)
+            for position, rows in members.items():
+                minimum, maximum = LINEUP_POSITIONS[position]
+                _add(
+                    problem,
+                    pulp,
+                    f"squad_{position}_{gameweek}",
+                    [squad[row] for row in rows],
+                    pulp.LpConstraintEQ,
+                    SQUAD_POSITIONS[position],
+                )
+                _add(
+                    problem,
+                    pulp,
+                    f"lineup_min_{position}_{gameweek}",
+                    [lineup[row] for row in rows],
+                    pulp.LpConstraintGE,
+                    minimum,
+                )
+                _add(
+                    problem,
+                    pulp,
+                    f"lineup_max_{position}_{gameweek}",
+                    [lineup[row] for row in rows],
+                    pulp.LpConstraintLE,
+                    maximum,
+                )
+            for club in np.unique(clubs):
+                rows = np.flatnonzero(clubs == club)
+                _add(
+                    problem,
+                    pulp,
+                    f"club_{club}_{gameweek}",
+                    [squad[row] for row in rows],
+                    pulp.LpConstraintLE,
+                    CLUB_LIMIT,
+                )
+            for row in players:
+                _add(
+                    problem,
+                    pulp,
+                    f"starts_{gameweek}_{row}",
+                    [lineup[row], squad[row]],
+                    pulp.LpConstraintLE,
+                    0,
+                    np.array([1, -1]),
+                )
+                _add(
+                    problem,
+                    pulp,
+                    f"captains_{gameweek}_{row}",
+                    [captain[row], lineup[row]],
+                    pulp.LpConstraintLE,
+                    0,
+                    np.array([1, -1]),
+                )
+                # squad = previous squad + bought - sold, the previous squad of the first gameweek is the current one.
+                if gameweek:
+                    _add(
+                        problem,
+                        pulp,
+                        f"keep_{gameweek}_{row}",
+                        [squad[row], variables["squad"][gameweek - 1][row], buy[row], sell[row]],
+                        pulp.LpConstraintEQ,
+                        0,
+                        np.array([1, -1, -1, 1]),
+                    )
+                else:
+                    held.append(
+                        _add(
+                            problem,
+                            pulp,
+                            f"keep_0_{row}",
+                            [squad[row], buy[row], sell[row]],
+                            pulp.LpConstraintEQ,
+                            0,
+                            np.array([1, -1, 1]),
+                        )
+                    )
+            # Transfers beyond the free ones are paid for, one more free transfer comes with the next gameweek.
+            transfers = np.ones(len(buy) + 2)
+            transfers[-2:] = -1
+            _add(
+                problem,
+                pulp,
+                f"paid_{gameweek}",
+                buy + [free[gameweek], paid[gameweek]],
+                pulp.LpConstraintLE,
+                0,
+                transfers,
+            )
+            if gameweek + 1 < horizon:
+                coefficients = np.concatenate([[1, -1, -1], np.ones(len(buy))])
+                _add(
+                    problem,
+                    pulp,
+                    f"rollover_{gameweek}",
+                    [free[gameweek + 1], free[gameweek], paid[gameweek]] + buy,
+                    pulp.LpConstraintLE,
+                    1,
+                    coefficients,
+                )
+        build_span.add(rows=len(problem.constraints))
+
+    logger.info(f"[OPTIMIZER] Built a {horizon} gameweek problem over {len(positions)} players")
+    _PROBLEMS[key] = {
+        "problem": problem,
+        "variables": variables,
+        "free": free,
+        "paid": paid,
+        "positions": positions,
+        "held": held,
+    }
+    return _PROBLEMS[key]
+
+
+def solve_problem(
+    structure: dict,
+    costs: np.ndarray,
+    points: np.ndarray,
+    current: np.ndarray,
+    budget: float,
+    free_transfers: int,
+    warm_start: list = None,
+    time_limit: int = OPTIMIZER_TIME_LIMIT,
+) -> list:
+    # Returns the squad rows of every gameweek of the horizon, or None when the solver found no solution. current is
+    # the squad rows held now (None picks a new squad, every transfer of the first gameweek being free) and warm_start
+    # a feasible plan of squads the solver starts from.
+    import pulp
+
+    problem, variables, free, paid = (structure[part] for part in ("problem", "variables", "free", "paid"))
+    horizon = len(free)
+    objective = []
+    for gameweek in range(horizon):
+        gameweek_points = points[:, gameweek]
+        objective += zip(variables["squad"][gameweek], (BENCH_WEIGHT * gameweek_points).tolist())
+        objective += zip(variables["lineup"][gameweek], ((1 - BENCH_WEIGHT) * gameweek_points).tolist())
+        objective += zip(variables["captain"][gameweek], gameweek_points.tolist())
+        problem.constraints[f"budget_{gameweek}"] = pulp.LpConstraint(
+            _expression(pulp, variables["squad"][gameweek], costs.astype(float)),
+            pulp.LpConstraintLE,
+            f"budget_{gameweek}",
+            budget,
+        )
+    objective += [(variable, -TRANSFER_HIT) for variable in paid]
+    problem.setObjective(pulp.LpAffineExpression(objective))
+
+    held = np.zeros(len(costs), dtype=bool)
+    if current is not None:
+        held[current] = True
+    for constraint, holds in zip(structure["held"], held.tolist()):
+        constraint.constant = -float(holds)
+    free[0].lowBound = free[0].upBound = free_transfers if current is not None else sum(SQUAD_POSITIONS.values())
+
+    if warm_start is not None:
+        _set_initial_values(structure, points, held, warm_start, free_transfers if current is not None else None)
+
+    with span("solve", "squad_problem"):
+        try:
+            problem.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, warmStart=warm_start is not None))
+        except pulp.PulpSolverError as err:
+            logger.warning(f"[OPTIMIZER] Solver failed: {err}")
+            return None
+    if getattr(problem, "sol_status", problem.status) not in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible):
+        logger.warning(f"[OPTIMIZER] No solution found: {pulp.LpStatus[problem.status]}")
+        return None
+    return [
+        np.flatnonzero(np.array([variable.varValue or 0 for variable in variables["squad"][gameweek]]) > 0.5)
+        for gameweek in range(horizon)
+    ]
+
+
+def _set_initial_values(structure: dict, points: np.ndarray, held: np.ndarray, squads: list, free_transfers) -> None:
+    # Values of every variable under the given plan, each gameweek fielding its best lineup.
+    variables, free, paid = structure["variables"], structure["free"], structure["paid"]
+    available = sum(SQUAD_POSITIONS.values()) if free_transfers is None else free_transfers
+    for gameweek, squad in enumerate(squads):
+        lineup, captain = best_lineup(squad, structure["positions"], points[:, gameweek])
+        values = {kind: np.zeros(len(held), dtype=bool) for kind in variables}
+        values["squad"][squad] = True
+        values["lineup"][lineup] = True
+        values["captain"][captain] = True
+        values["buy"] = values["squad"] & ~held
+        values["sell"] = held & ~values["squad"]
+        for kind, kind_values in values.items():
+            for variable, value in zip(variables[kind][gameweek], kind_values.tolist()):
+                variable.setInitialValue(int(value))
+        bought = int(values["buy"].sum())
+        free[gameweek].setInitialValue(available)
+        paid[gameweek].setInitialValue(max(bought - available, 0))
+        available = min(MAX_FREE_TRANSFERS, available - bought + max(bought - available, 0) + 1)
+        held = values["squad"]
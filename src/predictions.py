@@ -0,0 +1,73 @@
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.constants import MODELS_DIRECTORY, XP_BATCH_SIZE, XP_FEATURES
+from src.metrics import span
+
+_MODELS = {}
+# Player columns copied from the scored frame next to the predictions, whichever of them it has.
+XP_ID_COLUMNS = ["player_id", "element", "name", "name_fpl", "display_slug", "team_slug", "position", "position_fpl"]
+
+
+def load_model(model_path: str):
+    # Unpickled once per process, every gameweek scored in the same run reuses the model.
+    path = Path(model_path) if Path(model_path).is_absolute() else MODELS_DIRECTORY / model_path
+    if path not in _MODELS:
+        with span("load", "xp_model"), path.open("rb") as model_file:
+            model = pickle.load(model_file)
+        if getattr(model, "n_features_in_", len(XP_FEATURES)) != len(XP_FEATURES):
+            raise ValueError(f"{path} expects {model.n_features_in_} features, XP_FEATURES has {len(XP_FEATURES)}")
+        logger.info(f"[XP] Loaded {type(model).__name__} from {path}")
+        _MODELS[path] = model
+    return _MODELS[path]
+
+
+def snapshot_features(snapshot: pd.DataFrame, lag_store=None, features: pd.DataFrame = None) -> pd.DataFrame:
+    # One row per player of a combined_stats snapshot. The FPL price is the model's value, the lag features come from
+    # lag_store, and features (a table keyed by player_id or element) only has to carry the XP_FEATURES still missing:
+    # creativity, influence, was_home and fdr, plus the lags of the variables no snapshot has (see src.features).
+    players = snapshot.drop_duplicates("player_id").reset_index(drop=True)
+    if "value" not in players.columns and "now_cost" in players.columns:
+        players["value"] = players.now_cost
+    if lag_store is not None:
+        lags = lag_store.lag_features(players.player_id).drop(columns="player_id")
+        players = pd.concat(
+            [players, lags[[column for column in lags.columns if column not in players.columns]]], axis=1
+        )
+
+    missing = [feature for feature in XP_FEATURES if feature not in players.columns]
+    if missing and features is not None:
+        if "player_id" not in features.columns:
+            features = features.rename(columns={"element": "player_id"})
+        joined = ["player_id", *[feature for feature in missing if feature in features.columns]]
+        players = players.merge(features[joined].drop_duplicates("player_id"), on="player_id", how="left")
+        missing = [feature for feature in missing if feature not in joined]
+    if missing:
+        raise ValueError(f"{len(missing)} model features missing from the snapshot and features: {', '.join(missing)}")
+    return players
+
+
+def build_feature_matrix(dataframe: pd.DataFrame) -> np.ndarray:
+    # Missing values are scored as 0, as in training. A missing column is an error, zeros would skew every player.
+    missing = [feature for feature in XP_FEATURES if feature not in dataframe.columns]
+    if missing:
+        raise ValueError(f"{len(missing)} model features missing from the snapshot: {', '.join(missing)}")
+    return dataframe[XP_FEATURES].to_numpy(dtype=np.float64, na_value=0.0)
+
+
+def predict_points(model, features: np.ndarray, batch_size: int = XP_BATCH_SIZE) -> np.ndarray:
+    with span("predict", "xp") as predict_span:
+        batches = [model.predict(features[start : start + batch_size]) for start in range(0, len(features), batch_size)]
+        predict_span.add(rows=len(features))
+    predictions = np.concatenate(batches).reshape(len(features)) if batches else np.empty(0)
+    return np.round(predictions, 3)
+
+
+def score_players(dataframe: pd.DataFrame, model) -> pd.DataFrame:
+    scored = dataframe[[column for column in XP_ID_COLUMNS if column in dataframe.columns]].reset_index(drop=True)
+    scored["expected_points"] = predict_points(model, build_feature_matrix(dataframe))
+    return scored
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import json
+import re
+import time
+from datetime import date
+from pathlib import Path
+
+from loguru import logger
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+from src.constants import RESPONSE_CACHE
+
+_CACHE = {"enabled": False, "replay": False, "fetch_date": None, "root": RESPONSE_CACHE}
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def configure_response_cache(
+    enabled: bool = True, replay: bool = False, fetch_date: str = None, root: Path = RESPONSE_CACHE
+) -> None:
+    _CACHE.update(enabled=enabled or replay, replay=replay, fetch_date=fetch_date, root=Path(root))
+    if replay:
+        logger.info(f"Replaying cached responses from {cache_date()}, no network requests will be made")
+
+
+def cache_enabled() -> bool:
+    return _CACHE["enabled"]
+
+
+def replaying() -> bool:
+    return _CACHE["replay"]
+
+
+def cache_date() -> str:
+    return _CACHE["fetch_date"] or re.sub(r"\D", "", str(date.today()))
+
+
+def atomic_write(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_bytes(content)
+    tmp_path.replace(path)
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def _entry_path(url: str, fetch_date: str) -> Path:
+    return _CACHE["root"] / "index" / fetch_date / f"{_url_key(url)}.json"
+
+
+def _blob_path(digest: str) -> Path:
+    return _CACHE["root"] / "blobs" / digest[:2] / f"{digest}.gz"
+
+
+def lookup(url: str, fetch_date: str = None) -> dict:
+    # Without a date the newest entry up to today is returned, which is what conditional revalidation needs.
+    if fetch_date:
+        path = _entry_path(url, fetch_date)
+        return json.loads(path.read_text()) if path.exists() else {}
+    index = _CACHE["root"] / "index"
+    if not index.exists():
+        return {}
+    for day in sorted((p.name for p in index.iterdir() if p.name <= cache_date()), reverse=True):
+        path = _entry_path(url, day)
+        if path.exists():
+            return json.loads(path.read_text())
+    return {}
+
+
+def revalidation_headers(entry: dict) -> dict:
+    headers = {}
+    if entry.get("headers", {}).get("ETag"):
+        headers["If-None-Match"] = entry["headers"]["ETag"]
+    if entry.get("headers", {}).get("Last-Modified"):
+        headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+    return headers
+
+
+def _write_entry(url: str, digest: str, status: int, headers: dict) -> dict:
+    entry = {
+        "url": url,
+        "fetch_date": cache_date(),
+        "fetched_at": time.time(),
+        "status": status,
+        "sha256": digest,
+        "headers": headers,
+    }
+    atomic_write(_entry_path(url, entry["fetch_date"]), json.dumps(entry).encode())
+    return entry
+
+
+def store(url: str, response: Response) -> dict:
+    # Bodies are stored once per content hash, so days where a page did not change share the same blob.
+    digest = hashlib.sha256(response.content).hexdigest()
+    if not _blob_path(digest).exists():
+        atomic_write(_blob_path(digest), gzip.compress(response.content))
+    headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+    return _write_entry(url, digest, response.status_code, headers)
+
+
+def refresh(url: str, entry: dict, response: Response) -> dict:
+    headers = {
+        **entry["headers"],
+        **{name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+    }
+    return _write_entry(url, entry["sha256"], entry["status"], headers)
+
+
+def load_response(entry: dict) -> Response:
+    response = Response()
+    response._content = gzip.decompress(_blob_path(entry["sha256"]).read_bytes())
+    response.status_code = entry["status"]
+    response.url = entry["url"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = "utf-8"
+    return response
+
+
+def replay(url: str) -> Response:
+    entry = lookup(url, fetch_date=cache_date())
+    if not entry:
+        raise Exception(f"[REPLAY] No cached response for {url} on {cache_date()}")
+    return load_response(entry)
@@ -1,131 +1,360 @@
 import re
 from datetime import date
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from fastcore.foundation import L as flist
 from loguru import logger
 
-from src.constants import FPL_URL_STATIC, TEAM_URLS
-from src.fbref.scraper import (
-    extract_defensive_actions,
-    extract_extra_passing_stats,
-    extract_gca_stats,
-    extract_misc_stats,
-    extract_passing_stats,
-    extract_playing_time_stats,
-    extract_possession_stats,
-    extract_shooting_stats,
+from src.constants import (
+    FBREF_DEFAULT_COMPETITION,
+    HTTP_POOL_SIZE,
+    OPTIMIZER_HORIZON,
+    STATS_AVAILABLE,
+    XP_FEATURE_STORE,
+    XP_MODEL,
 )
-from src.fpl.downloader import extract_player_fpl_stats, extract_team_details
+from src.features import (
+    FeatureStore,
+    combined_lag_frame,
+    load_feature_store,
+    save_feature_store,
+)
+from src.fpl.downloader import extract_fpl_elements
+from src.matching import MATCH_COLUMNS, resolve_player_mapping
+from src.metrics import span, write_prometheus
+from src.response_cache import cache_date
+from src.schemas import read_snapshot
+from src.snapshots import (
+    has_delta_snapshot,
+    load_delta_to_do_spaces,
+    read_delta_snapshot,
+)
+from src.storage import wait_for_uploads
 from src.utilities import (
+    build_mapper_index,
     check_live_gw,
+    combine_stats,
+    configure_http_session,
+    fetch_bootstrap,
     fetch_file_url_from_do_spaces,
     fetch_proxies,
     generate_csv,
+    list_objects_in_do_spaces,
     load_file_to_do_spaces,
-    request_obj,
+    put_object_to_do_spaces,
+    serialize_dataframe,
 )
 
 # load_dotenv()
 
 
-def run_stats_combiner() -> None:
+def _latest_snapshot_keys(source: str, gameweeks: list, file_format: str) -> dict:
+    # Snapshot keys start with their date, so the last listed key of a gameweek is its latest snapshot.
+    keys = {}
+    for key in list_objects_in_do_spaces(prefix=f"{source}/"):
+        found = re.fullmatch(rf"{source}/\d{{8}}_GW(\d+)_{source}\.{file_format}", key)
+        if found and int(found.group(1)) in gameweeks:
+            keys[int(found.group(1))] = key
+    return keys
+
+
+def _read_gameweek_snapshot(
+    source: str, gameweek: int, snapshot_keys: dict, file_format: str, columns: list = None
+) -> pd.DataFrame:
+    # A gameweek stored as deltas is rebuilt from its manifest, otherwise its full snapshot is read, None if neither.
+    if has_delta_snapshot(source, gameweek):
+        return read_delta_snapshot(source, gameweek, columns=columns)
+    if gameweek not in snapshot_keys:
+        return None
+    return read_snapshot(
+        fetch_file_url_from_do_spaces(do_filepath=snapshot_keys[gameweek]), file_format=file_format, columns=columns
+    )
+
+
+def _append_lag_features(lag_store, gameweek: int, combined_stats: pd.DataFrame) -> None:
+    # Gameweeks are appended in the order they are combined, a gameweek combined again keeps its first totals.
+    if gameweek in lag_store.gameweeks:
+        logger.info(f"[FEATURES] GW{gameweek} is already in the feature store, keeping it")
+        return
+    lag_store.append_gameweek(gameweek, combined_lag_frame(combined_stats), cumulative=True)
+
+
+def run_stats_combiner(
+    file_format: str = "csv",
+    fbref_columns: list = None,
+    fpl_columns: list = None,
+    auto_match: bool = False,
+    gameweeks: list = None,
+    feature_store: bool = False,
+) -> None:
+    if auto_match:
+        fbref_columns = fbref_columns and list(dict.fromkeys([*MATCH_COLUMNS["fbref"], *fbref_columns]))
+        fpl_columns = fpl_columns and list(dict.fromkeys([*MATCH_COLUMNS["fpl_official"], *fpl_columns]))
     t_now = re.sub(r"\D", "", str(date.today()))
-    gameweek = check_live_gw()
-
-    try:
-        logger.info("Fetching presigned urls!!!")
-        presigned_fbref_url = fetch_file_url_from_do_spaces(do_filepath=f"fbref/{t_now}_GW{gameweek}_fbref.csv")
-        presigned_fpl_url = fetch_file_url_from_do_spaces(
-            do_filepath=f"fpl_official/{t_now}_GW{gameweek}_fpl_official.csv"
-        )
-        presigned_mapper_url = fetch_file_url_from_do_spaces(do_filepath=f"mappers/off_fpl_fbref_player_mapping.csv")
-
-        logger.info("Downloading all the data and mappers from Spaces...")
-        fbref_data = pd.read_csv(presigned_fbref_url)
-        fbref_data["fbref_id"] = fbref_data.profile_url.apply(lambda val: val.split("/")[5])
-        fpl_data = pd.read_csv(presigned_fpl_url)
-        mappers = pd.read_csv(presigned_mapper_url)
-
-        logger.info("Merging all the data...")
-        combined_one_df = pd.merge(fbref_data, mappers, on="fbref_id")
-        combined_two_df = pd.merge(fpl_data, mappers, on="player_id")
-        combined_stats = pd.merge(
-            combined_two_df, combined_one_df, how="left", on="player_id", suffixes=("_fpl", "_fbref")
-        )
-
-        logger.info("Loading the merged data from DO Spaces...")
-        load_file_to_do_spaces(dataframe=combined_stats, source="combined_stats")
+    lag_store = None
+
+    with span("run", "combined_stats"):
+        try:
+            if gameweeks:
+                fbref_keys = _latest_snapshot_keys("fbref", gameweeks, file_format)
+                fpl_keys = _latest_snapshot_keys("fpl_official", gameweeks, file_format)
+            else:
+                gameweek = check_live_gw()
+                gameweeks = [gameweek]
+                fbref_keys = {gameweek: f"fbref/{t_now}_GW{gameweek}_fbref.{file_format}"}
+                fpl_keys = {gameweek: f"fpl_official/{t_now}_GW{gameweek}_fpl_official.{file_format}"}
+
+            logger.info("Downloading the mappers from Spaces...")
+            mappers = pd.read_csv(fetch_file_url_from_do_spaces(do_filepath="mappers/off_fpl_fbref_player_mapping.csv"))
+            # The mapping only changes when players are matched automatically, otherwise its index serves every gameweek.
+            mapper_index = None if auto_match else build_mapper_index(mappers)
+            if feature_store:
+                lag_store = load_feature_store(XP_FEATURE_STORE) or FeatureStore()
+        except Exception as err:
+            logger.exception(err)
+            gameweeks = []
+
+        for gameweek in gameweeks:
+            try:
+                logger.info(f"Downloading the GW{gameweek} data from Spaces...")
+                with span("fetch", "spaces") as fetch_span:
+                    fbref_data = _read_gameweek_snapshot(
+                        "fbref", gameweek, fbref_keys, file_format, fbref_columns and ["profile_url", *fbref_columns]
+                    )
+                    fpl_data = _read_gameweek_snapshot(
+                        "fpl_official", gameweek, fpl_keys, file_format, fpl_columns and ["player_id", *fpl_columns]
+                    )
+                    if fbref_data is None or fpl_data is None:
+                        logger.warning(f"No fbref and FPL snapshots to combine for GW{gameweek}")
+                        continue
+                    fetch_span.add(rows=len(fbref_data) + len(fpl_data))
+
+                if auto_match:
+                    with span("match", "players") as match_span:
+                        mappers, review = resolve_player_mapping(
+                            fpl_data=fpl_data, fbref_data=fbref_data, mappers=mappers
+                        )
+                        match_span.add(rows=len(mappers))
+                    put_object_to_do_spaces(
+                        do_filepath=f"mappers/review/{t_now}_GW{gameweek}_review.csv",
+                        body=serialize_dataframe(review, index=False),
+                        background=True,
+                    )
+                    mapper_index = build_mapper_index(mappers)
+
+                logger.info("Merging all the data...")
+                combined_stats = combine_stats(fbref_data=fbref_data, fpl_data=fpl_data, mapper_index=mapper_index)
+
+                logger.info("Loading the merged data from DO Spaces...")
+                load_file_to_do_spaces(
+                    dataframe=combined_stats,
+                    source="combined_stats",
+                    file_format=file_format,
+                    gameweek=gameweek,
+                    background=True,
+                )
+                if lag_store is not None:
+                    _append_lag_features(lag_store, int(gameweek), combined_stats)
+            except Exception as err:
+                logger.exception(err)
+        if lag_store is not None:
+            save_feature_store(lag_store, XP_FEATURE_STORE)
         logger.info("Finshed! Check DO Spaces for the final output!")
-    except Exception as err:
-        logger.exception(err)
+        wait_for_uploads()
+    write_prometheus()
+
+
+def run_xp_predictions(
+    features_path: str = None, file_format: str = "csv", gameweek: int = None, model_path: str = XP_MODEL
+) -> None:
+    # Players and their features come from the gameweek's combined snapshot and the lag feature store the combiner
+    # fills, a features table supplies the model features neither has. Imported here so the other runs do not
+    # unpickle models or load scikit-learn.
+    from src.predictions import load_model, score_players, snapshot_features
+
+    with span("run", "xp_predictions"):
+        try:
+            model = load_model(model_path)
+            gameweek = int(gameweek or check_live_gw())
+            with span("fetch", "features") as fetch_span:
+                snapshot_keys = _latest_snapshot_keys("combined_stats", [gameweek], file_format)
+                snapshot = _read_gameweek_snapshot("combined_stats", gameweek, snapshot_keys, file_format)
+                if snapshot is None:
+                    raise ValueError(f"No combined_stats snapshot for GW{gameweek}")
+                lag_store = load_feature_store(XP_FEATURE_STORE)
+                if lag_store is None:
+                    logger.warning(f"[XP] No {XP_FEATURE_STORE} feature store, the lag features have to be given")
+                features = None
+                if features_path:
+                    features_path = Path(features_path)
+                    features = read_snapshot(
+                        features_path, file_format="parquet" if features_path.suffix == ".parquet" else "csv"
+                    )
+                players = snapshot_features(snapshot, lag_store, features)
+                fetch_span.add(rows=len(players))
+            logger.info(f"Scoring the GW{gameweek} players with the xP model...")
+            predictions = score_players(players, model)
+            load_file_to_do_spaces(
+                dataframe=predictions,
+                source="xp_predictions",
+                file_format=file_format,
+                gameweek=gameweek,
+                background=True,
+            )
+        except Exception as err:
+            logger.exception(err)
+        wait_for_uploads()
+    write_prometheus()
+
+
+def run_squad_optimizer(
+    file_format: str = "csv",
+    gameweek: int = None,
+    horizon: int = OPTIMIZER_HORIZON,
+    current_squad: list = None,
+    bank: int = 0,
+    free_transfers: int = 1,
+) -> None:
+    # Imported here so the other runs do not load PuLP.
+    from src.fpl.fixtures import load_fixtures, team_rows, window_sums
+    from src.optimizer.planner import candidate_pool, plan_squad
+
+    with span("run", "squad_optimizer"):
+        try:
+            gameweek = gameweek or check_live_gw()
+            fpl_key = _latest_snapshot_keys("fpl_official", [gameweek], file_format).get(gameweek)
+            xp_key = _latest_snapshot_keys("xp_predictions", [gameweek], file_format).get(gameweek)
+            if fpl_key is None or xp_key is None:
+                raise ValueError(f"No FPL and xP prediction snapshots to plan GW{gameweek} from")
+            with span("fetch", "spaces") as fetch_span:
+                players = read_snapshot(fetch_file_url_from_do_spaces(do_filepath=fpl_key), file_format=file_format)
+                predictions = read_snapshot(fetch_file_url_from_do_spaces(do_filepath=xp_key), file_format=file_format)
+                fetch_span.add(rows=len(players) + len(predictions))
+
+            # The xP models predict the points of a single match, which stand in for every match of the horizon: a
+            # blank gameweek scores nothing and a double one twice.
+            fixtures = load_fixtures()
+            players = players.drop_duplicates("player_id").reset_index(drop=True)
+            gameweeks = list(range(gameweek, gameweek + horizon))
+            expected = predictions.drop_duplicates("player_id").set_index("player_id").expected_points
+            rows = team_rows(fixtures, players.team_id)
+            matches = np.where((rows >= 0)[:, None], window_sums(fixtures, gameweeks, 1, "fixtures")[rows], 0)
+            expected_points = pd.DataFrame(
+                expected.reindex(players.player_id).fillna(0).to_numpy()[:, None] * matches,
+                index=players.player_id,
+                columns=gameweeks,
+            )
+            pool = candidate_pool(players, expected_points, current_squad)
+            plan, solver = plan_squad(pool, expected_points, current_squad, bank=bank, free_transfers=free_transfers)
+            logger.info(f"Planned GW{gameweek} to GW{gameweek + horizon - 1} with the {solver} solver")
+            load_file_to_do_spaces(
+                dataframe=plan, source="squad_plans", file_format=file_format, gameweek=gameweek, background=True
+            )
+        except Exception as err:
+            logger.exception(err)
+        wait_for_uploads()
+    write_prometheus()
 
 
-def run_fpl_official(via_proxy: bool = False, debug: bool = False) -> None:
-    fpl_team_mapper = {}
+def upload_snapshot(
+    dataframe: pd.DataFrame, source: str, file_format: str = "csv", delta: bool = False, store: bool = False
+) -> None:
+    if delta:
+        load_delta_to_do_spaces(dataframe=dataframe, source=source, file_format=file_format)
+    else:
+        load_file_to_do_spaces(dataframe=dataframe, source=source, file_format=file_format, background=True)
+    if store:
+        # SQLAlchemy is only imported by runs that write to the local store.
+        from src.store import store_snapshot
+
+        with span("store", source) as store_span:
+            rows = store_snapshot(dataframe, source=source, gameweek=check_live_gw(), snapshot_date=cache_date())
+            store_span.add(rows=rows)
+
+
+def run_fpl_official(
+    via_proxy: bool = False, debug: bool = False, file_format: str = "csv", delta: bool = False, store: bool = False
+) -> None:
     proxies = fetch_proxies(debug=debug)
-    try:
-        fpl_request = request_obj(url=FPL_URL_STATIC, proxies=proxies, via_proxy=via_proxy)
-        all_fpl_data = fpl_request.json()
-        fpl_players = flist(all_fpl_data["elements"])
-        fpl_teams = flist(all_fpl_data["teams"])
-        [fpl_team_mapper.update(extract_team_details(team)) for team in fpl_teams]
-        fpl_player_stats = flist(
-            [extract_player_fpl_stats(player=player, fpl_team_mapper=fpl_team_mapper) for player in fpl_players]
-        )
-        fpl_player_stats_df = pd.DataFrame.from_dict(fpl_player_stats)
-        load_file_to_do_spaces(dataframe=fpl_player_stats_df, source="fpl_official")
-    except Exception as err:
-        logger.exception(err)
-
-
-def run_fbref(via_proxy: bool = False, debug: bool = False) -> None:
+    with span("run", "fpl_official"):
+        try:
+            all_fpl_data = fetch_bootstrap(proxies=proxies, via_proxy=via_proxy, sections=("elements", "teams"))
+            with span("transform", "fpl_official") as transform_span:
+                fpl_player_stats_df = extract_fpl_elements(
+                    elements=all_fpl_data["elements"], teams=all_fpl_data["teams"]
+                )
+                transform_span.add(rows=len(fpl_player_stats_df))
+            upload_snapshot(
+                dataframe=fpl_player_stats_df, source="fpl_official", file_format=file_format, delta=delta, store=store
+            )
+        except Exception as err:
+            logger.exception(err)
+        wait_for_uploads()
+    write_prometheus()
+
+
+def run_fbref(
+    via_proxy: bool = False,
+    debug: bool = False,
+    fetch_workers: int = 1,
+    parse_workers: int = 1,
+    file_format: str = "csv",
+    delta: bool = False,
+    store: bool = False,
+    competitions: list = None,
+    seasons: list = None,
+    resume: bool = True,
+) -> None:
+    # Imported here so the FPL and combiner runs do not load BeautifulSoup and lxml.
+    from src.fbref.checkpoints import clear_shard
+    from src.fbref.competitions import discover_squads
+    from src.fbref.pipeline import scrape_shards
+
+    configure_http_session(pool_size=max(fetch_workers, HTTP_POOL_SIZE))
     proxies = fetch_proxies(debug=debug)
-    team_details = []
-    try:
-        for team in TEAM_URLS.items():
-            logger.info(f"[TEAM:{team[0].upper()}] Fetching data from Fbref")
-            response = request_obj(url=team[1], proxies=proxies, via_proxy=via_proxy)
-
-            shooting_stats = extract_shooting_stats(response=response, debug=debug)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Shooting stats: {shooting_stats[0]}")
-
-            passing_stats = extract_passing_stats(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Passing stats: {passing_stats[0]}")
-
-            extra_passing_stats = extract_extra_passing_stats(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Extra Passing stats: {extra_passing_stats[0]}")
-
-            gca_stats = extract_gca_stats(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example GCA stats: {gca_stats[0]}")
-
-            defensive_action_stats = extract_defensive_actions(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Def Action stats: {defensive_action_stats[0]}")
-
-            posession_stats = extract_possession_stats(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Possession stats: {posession_stats[0]}")
-
-            playing_time_stats = extract_playing_time_stats(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Playing time stats: {playing_time_stats[0]}")
-
-            misc_stats = extract_misc_stats(response=response)
-            logger.info(f"[TEAM:{team[0].upper()}] Example Misc stats: {misc_stats[0]}")
-
-            team_details.append(
-                {
-                    "team": team[0].upper(),
-                    "fbref_url": team[1],
-                    "shooting_stats": shooting_stats,
-                    "passing_stats": passing_stats,
-                    "extra_passing_stats": extra_passing_stats,
-                    "gca_stats": gca_stats,
-                    "defensive_action_stats": defensive_action_stats,
-                    "possession_stats": posession_stats,
-                    "playing_time_stats": playing_time_stats,
-                    "misc_stats": misc_stats,
-                }
+    # One shard per competition and season, None being the season in progress.
+    shards = [
+        (competition, season)
+        for competition in competitions or [FBREF_DEFAULT_COMPETITION]
+        for season in seasons or [None]
+    ]
+    with span("run", "fbref"):
+        try:
+            if not resume:
+                for shard in shards:
+                    clear_shard(shard)
+            shard_urls = discover_squads(shards, proxies=proxies, via_proxy=via_proxy, fetch_workers=fetch_workers)
+            shard_details = scrape_shards(
+                shard_urls=shard_urls,
+                proxies=proxies,
+                via_proxy=via_proxy,
+                debug=debug,
+                fetch_workers=fetch_workers,
+                parse_workers=parse_workers,
             )
-        formatted_dataframe = generate_csv(stats=team_details)
-        load_file_to_do_spaces(dataframe=formatted_dataframe, source="fbref")
-    except Exception as err:
-        logger.exception(err)
+        except Exception as err:
+            logger.exception(err)
+            shard_details = {}
+
+        for (competition, season), team_details in shard_details.items():
+            try:
+                for team_stat in team_details:
+                    for stats in STATS_AVAILABLE:
+                        logger.info(f"[TEAM:{team_stat['team']}] Example {stats}: {team_stat[stats][0]}")
+                formatted_dataframe = generate_csv(stats=team_details)
+                if (competition, season) == (FBREF_DEFAULT_COMPETITION, None):
+                    upload_snapshot(
+                        dataframe=formatted_dataframe, source="fbref", file_format=file_format, delta=delta, store=store
+                    )
+                else:
+                    # Other leagues and past seasons have no FPL gameweek, they are kept under their own prefix.
+                    put_object_to_do_spaces(
+                        do_filepath=f"fbref/{competition}/{season or 'current'}/{cache_date()}_fbref.{file_format}",
+                        body=serialize_dataframe(formatted_dataframe, file_format=file_format),
+                        background=True,
+                    )
+            except Exception as err:
+                logger.exception(err)
+        wait_for_uploads()
+    write_prometheus()
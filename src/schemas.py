@@ -0,0 +1,157 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.fbref.collections import COLLECTIONS, FIELD_TYPES
+from src.fpl.collections import FPL_FIELD_TYPES
+
+FBREF_KINDS = {
+    field: types.get(field, "int") for collection, types in FIELD_TYPES.items() for field in collection._fields
+}
+COLUMN_KINDS = {**FBREF_KINDS, "squad": "text", **FPL_FIELD_TYPES}
+MERGE_SUFFIX = re.compile(r"_(x|y|fpl|fbref)$")
+
+# Narrowest in-memory type of each column kind. Counts fit int16 apart from the ids, transfer counts and distances of
+# WIDE_INTEGERS, and the text fields of CATEGORICAL_FIELDS repeat a few values over every row. A column whose values
+# do not fit its integer type is widened instead of wrapped around.
+COMPACT_TYPES = {"int": "Int16", "float": "float32", "to_float": "float32", "thousands": "float32", "signed": "float32"}
+WIDE_INTEGERS = {
+    "player_id",
+    "transfers_in",
+    "transfers_out",
+    "transfers_in_event",
+    "transfers_out_event",
+    "carry_distance",
+    "carry_progressive_distance",
+}
+CATEGORICAL_FIELDS = {
+    "team",
+    "team_slug",
+    "position",
+    "status",
+    "squad",
+    "nationality",
+    "news",
+    "news_added_at",
+    "corners_and_indirect_freekicks_text",
+    "direct_freekicks_text",
+    "penalties_text",
+}
+INTEGER_WIDTHS = ["Int16", "Int32", "Int64"]
+
+
+def field_name(column: str) -> str:
+    # Joined frames carry merge suffixes (minutes_90s_x, name_fpl, ...), which are stripped until a field matches.
+    while column not in COLUMN_KINDS and MERGE_SUFFIX.search(column):
+        column = MERGE_SUFFIX.sub("", column)
+    return column
+
+
+def column_kind(column: str) -> str:
+    return COLUMN_KINDS.get(field_name(column))
+
+
+def compact_dtype(column: str) -> str:
+    field = field_name(column)
+    if field in CATEGORICAL_FIELDS:
+        return "category"
+    if field in WIDE_INTEGERS and COLUMN_KINDS.get(field) == "int":
+        return "Int32"
+    return COMPACT_TYPES.get(COLUMN_KINDS.get(field))
+
+
+def _compact_column(values: pd.Series, dtype: str) -> pd.Series:
+    if dtype == "category":
+        # Nationalities fresh from the scraper or read from parquet are lists, which have no categorical form.
+        first = values.dropna()[:1].tolist()
+        return values if first and isinstance(first[0], (list, np.ndarray)) else values.astype("category")
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values.astype("string").str.replace(",", ""), errors="coerce")
+    if dtype == "float32":
+        return values.astype("float32")
+    present = values.dropna()
+    if (present % 1 != 0).any():
+        return values.astype("float32")
+    for width in INTEGER_WIDTHS[INTEGER_WIDTHS.index(dtype) :]:
+        limits = np.iinfo(width.lower())
+        if present.empty or (limits.min <= present.min() and present.max() <= limits.max):
+            return values.astype(width)
+    return values
+
+
+def compact_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
+    # Columns without a declared field (index leftovers, derived columns) keep their type.
+    columns = {}
+    for column in dataframe.columns:
+        dtype = compact_dtype(column)
+        columns[column] = dataframe[column] if dtype is None else _compact_column(dataframe[column], dtype)
+    return pd.DataFrame(columns, index=dataframe.index)
+
+
+def merge_renames(column_lists: list) -> list:
+    # Same column names as chaining pd.merge over frames with these columns: a clash renames both sides to _x/_y.
+    owners = {}
+    renames = [{} for _ in column_lists]
+    for position, columns in enumerate(column_lists):
+        for column in columns:
+            if column in owners:
+                owner = owners.pop(column)
+                renames[owner][column] = f"{column}_x"
+                renames[position][column] = f"{column}_y"
+            else:
+                owners[column] = position
+    return renames
+
+
+def fbref_columns() -> list:
+    # Columns of the frame generate_csv builds: every category keyed on fbref_id, name only kept from the first one,
+    # and the squad a row was scraped from.
+    column_lists = [
+        [field for field in collection._fields if field != "fbref_id" and (position == 0 or field != "name")]
+        for position, collection in enumerate(COLLECTIONS.values())
+    ]
+    renames = merge_renames(column_lists)
+    columns = [rename.get(column, column) for columns, rename in zip(column_lists, renames) for column in columns]
+    columns.insert(1, "fbref_id")
+    columns.insert(2, "squad")
+    return columns
+
+
+def arrow_schema(dataframe: pd.DataFrame):
+    # Takes a compacted frame: numbers keep their compact type, categories become string dictionaries and the other
+    # text columns strings, whatever pandas inferred for them (all-empty columns would otherwise be null typed).
+    import pyarrow as pa
+
+    arrow_types = {"text": pa.string(), "age": pa.string(), "nationality": pa.list_(pa.string())}
+    inferred = pa.Schema.from_pandas(dataframe, preserve_index=False)
+    fields = []
+    for field in inferred:
+        if isinstance(dataframe[field.name].dtype, pd.CategoricalDtype):
+            field = pa.field(field.name, pa.dictionary(pa.int32(), pa.string()))
+        elif column_kind(field.name) in arrow_types:
+            field = pa.field(field.name, arrow_types[column_kind(field.name)])
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def dataframe_to_parquet(dataframe: pd.DataFrame, compression: str = "zstd") -> bytes:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dataframe = compact_dataframe(dataframe)
+    table = pa.Table.from_pandas(dataframe, schema=arrow_schema(dataframe), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression=compression)
+    return sink.getvalue().to_pybytes()
+
+
+def read_snapshot(
+    path: str, file_format: str = "csv", columns: list = None, compact: bool = True, dtype: dict = None
+) -> pd.DataFrame:
+    # dtype only applies to CSV, Parquet snapshots carry their own types.
+    if file_format == "parquet":
+        dataframe = pd.read_parquet(path, columns=columns)
+    else:
+        dataframe = pd.read_csv(path, usecols=columns, dtype=dtype)
+    return compact_dataframe(dataframe) if compact else dataframe
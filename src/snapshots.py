@@ -0,0 +1,136 @@
+import json
+from functools import partial
+from io import BytesIO
+
+import pandas as pd
+from loguru import logger
+
+from src.response_cache import cache_date
+from src.schemas import compact_dataframe, read_snapshot
+from src.utilities import (
+    check_live_gw,
+    get_object_from_do_spaces,
+    put_object_to_do_spaces,
+    serialize_dataframe,
+)
+
+SNAPSHOT_KEYS = {"fpl_official": ["player_id"], "fbref": ["fbref_id"]}
+OCCURRENCE = "key_occurrence"
+KEY_DTYPES = {"fbref_id": str}
+
+
+def _keyed(dataframe: pd.DataFrame, key: list) -> pd.DataFrame:
+    # A player can appear once per squad, so repeated keys are told apart by their order of appearance.
+    keyed = dataframe.reset_index(drop=True)
+    keyed[OCCURRENCE] = keyed.groupby(key).cumcount()
+    return keyed.set_index([*key, OCCURRENCE])
+
+
+def row_hashes(keyed: pd.DataFrame) -> dict:
+    hashes = pd.util.hash_pandas_object(keyed.astype(str), index=False)
+    return {json.dumps(list(index), default=int): str(value) for index, value in hashes.items()}
+
+
+def compute_delta(previous_hashes: dict, dataframe: pd.DataFrame, key: list) -> tuple:
+    keyed = _keyed(dataframe, key)
+    hashes = row_hashes(keyed)
+    changed = [previous_hashes.get(index) != value for index, value in hashes.items()]
+    added = sum(index not in previous_hashes for index in hashes)
+    removed = [json.loads(index) for index in previous_hashes if index not in hashes]
+    return keyed[changed].reset_index(), added, removed, hashes
+
+
+def apply_delta(view: pd.DataFrame, delta: pd.DataFrame, removed: list, key: list) -> pd.DataFrame:
+    index = [*key, OCCURRENCE]
+    view = view.set_index(index)
+    delta = delta.set_index(index)
+    view = view[~view.index.isin([tuple(row) for row in removed])]
+    order = view.index.append(delta.index[~delta.index.isin(view.index)])
+    return pd.concat([view[~view.index.isin(delta.index)], delta]).reindex(order).reset_index()
+
+
+def _manifest_path(source: str, gameweek: str) -> str:
+    return f"{source}/deltas/GW{gameweek}/manifest.json"
+
+
+def _hashes_path(source: str, gameweek: str) -> str:
+    return f"{source}/deltas/GW{gameweek}/row_hashes.json"
+
+
+def _read_manifest(source: str, gameweek: str) -> dict:
+    manifest = get_object_from_do_spaces(_manifest_path(source, gameweek))
+    return json.loads(manifest) if manifest else {}
+
+
+def _read_row_hashes(source: str, gameweek: str) -> dict:
+    hashes = get_object_from_do_spaces(_hashes_path(source, gameweek))
+    return json.loads(hashes) if hashes else {}
+
+
+def load_delta_to_do_spaces(dataframe: pd.DataFrame, source: str = "fbref", file_format: str = "csv") -> dict:
+    # The first snapshot of a gameweek is stored in full, every later run only stores the rows whose hash changed
+    # since the previous run, plus the keys that disappeared. The manifest lists them in order with their counts, the
+    # hash of every row is kept next to it in its own object. Deltas are numbered, several runs on a day each keep
+    # their own.
+    t_now = cache_date()
+    gameweek = check_live_gw()
+    key = SNAPSHOT_KEYS[source]
+    manifest = _read_manifest(source, gameweek)
+
+    if not manifest:
+        path = f"{source}/deltas/GW{gameweek}/{t_now}_base_{source}.{file_format}"
+        keyed = _keyed(dataframe, key)
+        hashes = row_hashes(keyed)
+        put_object_to_do_spaces(path, serialize_dataframe(keyed.reset_index(), file_format, index=False))
+        manifest = {
+            "source": source,
+            "gameweek": gameweek,
+            "key": key,
+            "file_format": file_format,
+            "base": {"date": t_now, "path": path, "rows": len(dataframe)},
+            "deltas": [],
+        }
+        logger.info(f"[DELTA] Stored base snapshot for {source} GW{gameweek} with {len(dataframe)} rows")
+    else:
+        delta, added, removed, hashes = compute_delta(_read_row_hashes(source, gameweek), dataframe, key)
+        sequence = len(manifest["deltas"]) + 1
+        path = f"{source}/deltas/GW{gameweek}/{t_now}_delta{sequence:03d}_{source}.{manifest['file_format']}"
+        put_object_to_do_spaces(path, serialize_dataframe(delta, manifest["file_format"], index=False))
+        manifest["deltas"].append(
+            {
+                "date": t_now,
+                "path": path,
+                "changed": len(delta) - added,
+                "added": added,
+                "removed": removed,
+            }
+        )
+        logger.info(
+            f"[DELTA] {source} GW{gameweek}: {len(delta) - added} changed, {added} added, {len(removed)} removed"
+        )
+
+    put_object_to_do_spaces(_hashes_path(source, gameweek), json.dumps(hashes).encode())
+    put_object_to_do_spaces(_manifest_path(source, gameweek), json.dumps(manifest).encode())
+    return manifest
+
+
+def has_delta_snapshot(source: str, gameweek: str) -> bool:
+    return bool(_read_manifest(source, gameweek))
+
+
+def read_delta_snapshot(source: str, gameweek: str, snapshot_date: str = None, columns: list = None) -> pd.DataFrame:
+    manifest = _read_manifest(source, gameweek)
+    if not manifest:
+        raise Exception(f"No delta manifest for {source} GW{gameweek}")
+    file_format = manifest["file_format"]
+    # Keys are read as text from CSV, so fbref ids that look like numbers keep their leading zeros.
+    columns = columns and list(dict.fromkeys([*manifest["key"], OCCURRENCE, *columns]))
+    read = partial(read_snapshot, file_format=file_format, columns=columns, dtype=KEY_DTYPES)
+    view = read(BytesIO(get_object_from_do_spaces(manifest["base"]["path"])))
+    for entry in manifest["deltas"]:
+        if snapshot_date and entry["date"] > snapshot_date:
+            break
+        delta = read(BytesIO(get_object_from_do_spaces(entry["path"])))
+        view = apply_delta(view, delta, entry["removed"], manifest["key"])
+    # Categories of the base and the deltas differ, the columns concatenated from them fall back to object.
+    return compact_dataframe(view.drop(columns=OCCURRENCE))
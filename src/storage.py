@@ -0,0 +1,87 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from loguru import logger
+
+from src.constants import (
+    HTTP_POOL_SIZE,
+    UPLOAD_MULTIPART_THRESHOLD,
+    UPLOAD_PART_SIZE,
+    UPLOAD_PART_WORKERS,
+    UPLOAD_WORKERS,
+)
+
+_STORAGE = {"client": None, "uploads": None, "pending": []}
+_LOCK = threading.Lock()
+
+
+def build_client():
+    # boto3 takes a noticeable share of the CLI start-up and is only needed once something talks to Spaces.
+    # DO_ENDPOINT can point at any S3-compatible server (MinIO, moto) for local runs and tests.
+    import boto3
+    from botocore.config import Config
+
+    session = boto3.session.Session()
+    return session.client(
+        "s3",
+        region_name=os.getenv("DO_REGION", "fra1"),
+        endpoint_url=os.getenv("DO_ENDPOINT"),
+        aws_access_key_id=os.getenv("DO_SPACES_KEY"),
+        aws_secret_access_key=os.getenv("DO_SPACES_SECRET"),
+        config=Config(max_pool_connections=max(HTTP_POOL_SIZE, UPLOAD_WORKERS * UPLOAD_PART_WORKERS)),
+    )
+
+
+def storage_client():
+    # boto3 clients are thread-safe, so one client and its connection pool serve the whole process.
+    with _LOCK:
+        if _STORAGE["client"] is None:
+            _STORAGE["client"] = build_client()
+        return _STORAGE["client"]
+
+
+def reset_storage_client() -> None:
+    with _LOCK:
+        _STORAGE["client"] = None
+
+
+def upload_bytes(bucket: str, key: str, body: bytes, **extra_args) -> None:
+    client = storage_client()
+    if len(body) < UPLOAD_MULTIPART_THRESHOLD:
+        client.put_object(Bucket=bucket, Key=key, Body=body, **extra_args)
+        return
+    from boto3.s3.transfer import TransferConfig
+
+    config = TransferConfig(
+        multipart_threshold=UPLOAD_MULTIPART_THRESHOLD,
+        multipart_chunksize=UPLOAD_PART_SIZE,
+        max_concurrency=UPLOAD_PART_WORKERS,
+    )
+    client.upload_fileobj(BytesIO(body), bucket, key, ExtraArgs=extra_args, Config=config)
+
+
+def submit_upload(function, *args, **kwargs) -> Future:
+    with _LOCK:
+        if _STORAGE["uploads"] is None:
+            _STORAGE["uploads"] = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+        future = _STORAGE["uploads"].submit(function, *args, **kwargs)
+        _STORAGE["pending"].append(future)
+        return future
+
+
+def wait_for_uploads() -> int:
+    # Blocks until every queued upload is done and returns how many failed, each failure being logged.
+    with _LOCK:
+        pending, _STORAGE["pending"] = _STORAGE["pending"], []
+    failed = 0
+    for future in pending:
+        try:
+            future.result()
+        except Exception as err:
+            logger.exception(err)
+            failed += 1
+    if pending:
+        logger.info(f"[UPLOAD] {len(pending) - failed} of {len(pending)} background uploads finished")
+    return failed
@@ -0,0 +1,157 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from loguru import logger
+from sqlalchemy import (
+    Column,
+    Date,
+    Float,
+    Index,
+    Integer,
+    MetaData,
+    PrimaryKeyConstraint,
+    Table,
+    Text,
+    and_,
+    create_engine,
+    func,
+    select,
+)
+
+from src.constants import MIGRATIONS_DIRECTORY, SNAPSHOT_STORE
+from src.fpl.collections import FPL_FIELD_TYPES
+from src.schemas import column_kind, fbref_columns
+from src.snapshots import OCCURRENCE
+
+# Every snapshot row is stored under its player key, the gameweek it was taken in and the fetch date, so the history
+# of a player is a primary-key range scan. The fbref side is keyed by fbref_id, repeated once per squad a player
+# appears in (see src.snapshots).
+STORE_KEYS = {"fpl_official": ["player_id"], "fbref": ["fbref_id", OCCURRENCE]}
+STORE_TABLES = {"fpl_official": "fpl_snapshots", "fbref": "fbref_snapshots"}
+SQL_TYPES = {"int": Integer, "float": Float, "to_float": Float, "thousands": Float}
+
+_ENGINES = {}
+metadata = MetaData()
+
+
+def snapshot_columns(source: str) -> list:
+    names = list(FPL_FIELD_TYPES) if source == "fpl_official" else fbref_columns()
+    keys = STORE_KEYS[source]
+    columns = [Column(key, Text if key == "fbref_id" else Integer, nullable=False) for key in keys]
+    columns += [Column("gameweek", Integer, nullable=False), Column("snapshot_date", Date, nullable=False)]
+    columns += [Column(name, SQL_TYPES.get(column_kind(name), Text)) for name in names if name not in keys]
+    return columns
+
+
+def snapshot_table(source: str, target: MetaData = metadata) -> Table:
+    name = STORE_TABLES[source]
+    return Table(
+        name,
+        target,
+        *snapshot_columns(source),
+        PrimaryKeyConstraint(*STORE_KEYS[source], "gameweek", "snapshot_date", name=f"pk_{name}"),
+        Index(f"ix_{name}_gameweek_snapshot_date", "gameweek", "snapshot_date"),
+    )
+
+
+FPL_SNAPSHOTS = snapshot_table("fpl_official")
+FBREF_SNAPSHOTS = snapshot_table("fbref")
+TABLES = {"fpl_official": FPL_SNAPSHOTS, "fbref": FBREF_SNAPSHOTS}
+
+
+def store_url() -> str:
+    return os.getenv("FPL_STATS_DB_URL") or f"sqlite:///{SNAPSHOT_STORE}"
+
+
+def upgrade_store(engine) -> None:
+    # The same upgrade as `poetry run migrations`, run on the engine's own connection so an in-memory or freshly
+    # created database is migrated where it is used. Imported here, only runs that open the store need alembic.
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIRECTORY))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+def store_engine(url: str = None):
+    # One engine per URL for the process, brought to the latest revision of db/migrations the first time it is opened.
+    url = url or store_url()
+    if url not in _ENGINES:
+        if url.startswith("sqlite:///"):
+            Path(url[len("sqlite:///") :]).parent.mkdir(parents=True, exist_ok=True)
+        engine = create_engine(url)
+        upgrade_store(engine)
+        _ENGINES[url] = engine
+    return _ENGINES[url]
+
+
+def _parse_date(snapshot_date: str):
+    return datetime.strptime(snapshot_date, "%Y%m%d").date()
+
+
+def _records(dataframe: pd.DataFrame, table: Table) -> list:
+    # Column-wise conversion to plain Python values, which every DB-API driver binds. Missing values become None
+    # and lists (nationality) are stored as text the way the CSV snapshots render them.
+    names = [column.name for column in table.columns if column.name in dataframe.columns]
+    values = []
+    for name in names:
+        column = dataframe[name]
+        if isinstance(table.c[name].type, Text):
+            column = column.map(lambda value: None if value is None or value != value else str(value))
+        values.append(column.astype(object).where(column.notna(), None).tolist())
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def store_snapshot(dataframe: pd.DataFrame, source: str, gameweek: str, snapshot_date: str, url: str = None) -> int:
+    # Re-running on the same date replaces that date's rows, inside one transaction with a single executemany.
+    table = TABLES[source]
+    keyed = dataframe.reset_index(drop=True)
+    if OCCURRENCE in STORE_KEYS[source]:
+        keyed[OCCURRENCE] = keyed.groupby(STORE_KEYS[source][0]).cumcount()
+    keyed["gameweek"] = int(gameweek)
+    keyed["snapshot_date"] = _parse_date(snapshot_date)
+    records = _records(keyed, table)
+    with store_engine(url).begin() as connection:
+        connection.execute(
+            table.delete().where(
+                and_(table.c.gameweek == int(gameweek), table.c.snapshot_date == _parse_date(snapshot_date))
+            )
+        )
+        connection.execute(table.insert(), records)
+    logger.info(f"[STORE] Stored {len(records)} {source} rows for GW{gameweek} on {snapshot_date}")
+    return len(records)
+
+
+def player_history(
+    source: str, player_ids: list, columns: list = None, last_gameweeks: int = None, url: str = None
+) -> pd.DataFrame:
+    # One row per player and gameweek, taken from the last snapshot of that gameweek. Questions such as form over
+    # the last 6 gameweeks are player_history("fpl_official", [player_id], ["form"], last_gameweeks=6).
+    table = TABLES[source]
+    key = table.c[STORE_KEYS[source][0]]
+    engine = store_engine(url)
+    with engine.connect() as connection:
+        gameweeks = key.in_(player_ids)
+        if last_gameweeks:
+            newest = connection.execute(select(func.max(table.c.gameweek))).scalar() or 0
+            gameweeks = and_(gameweeks, table.c.gameweek > newest - last_gameweeks)
+        latest = (
+            select(key.label("key"), table.c.gameweek.label("gameweek"), func.max(table.c.snapshot_date).label("date"))
+            .where(gameweeks)
+            .group_by(key, table.c.gameweek)
+            .subquery()
+        )
+        if columns:
+            selected = [table.c[name] for name in [*STORE_KEYS[source], "gameweek", "snapshot_date", *columns]]
+        else:
+            selected = list(table.columns)
+        matches = and_(
+            key == latest.c.key, table.c.gameweek == latest.c.gameweek, table.c.snapshot_date == latest.c.date
+        )
+        query = select(*selected).select_from(table.join(latest, matches)).order_by(key, table.c.gameweek)
+        return pd.read_sql(query, connection)
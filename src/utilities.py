@@ -1,29 +1,56 @@
+import json
 import os
-import re
-from datetime import date
+import random
+import time
+from collections import deque
 from io import StringIO
+from pathlib import Path
+from urllib.parse import urlparse
 
-import boto3
+import numpy as np
 import pandas as pd
 import requests
 from fastcore.basics import typed
-from fastcore.foundation import L as flist
 from loguru import logger
 from pipetools import pipe
+from requests.adapters import HTTPAdapter
 from requests.models import Response
+from urllib3.util.retry import Retry
 
-from src.constants import FPL_URL_STATIC, STATS_AVAILABLE
+from src.constants import (
+    FPL_BOOTSTRAP_CACHE,
+    FPL_BOOTSTRAP_TTL,
+    FPL_URL_STATIC,
+    HTTP_BACKOFF_FACTOR,
+    HTTP_POOL_SIZE,
+    HTTP_RETRIES,
+    HTTP_RETRY_STATUSES,
+    HTTP_TIMEOUT,
+    HTTP_TIMINGS_KEPT,
+    REPLAY_OUTPUT,
+    STATS_AVAILABLE,
+)
+from src.fpl.bootstrap import read_sections
+from src.metrics import span
+from src.response_cache import (
+    atomic_write,
+    cache_date,
+    cache_enabled,
+    load_response,
+    lookup,
+    refresh,
+    replay,
+    replaying,
+    revalidation_headers,
+    store,
+)
+from src.schemas import dataframe_to_parquet, merge_renames
+from src.storage import storage_client, submit_upload, upload_bytes
 
-
-def build_client():
-    session = boto3.session.Session()
-    return session.client(
-        "s3",
-        region_name="fra1",
-        endpoint_url=os.getenv("DO_ENDPOINT"),
-        aws_access_key_id=os.getenv("DO_SPACES_KEY"),
-        aws_secret_access_key=os.getenv("DO_SPACES_SECRET"),
-    )
+_HTTP_SESSION = None
+_PROXIES = []
+_BOOTSTRAP = {"source": None, "fetched_at": 0.0, "sections": {}, "gameweek": None}
+REQUEST_TIMINGS = deque(maxlen=HTTP_TIMINGS_KEPT)
 
 
 def format_age(age: str) -> str:
@@ -41,12 +68,54 @@ def to_float(text: str) -> float:
         return text > pipe | str | float
 
 
-def get_proxy_format(proxy_element: str):
-    return f"http://{proxy_element['proxy_address']}:{proxy_element['ports']['http']}:{proxy_element['username']}:{proxy_element['password']}"
+def get_proxy_format(proxy_element: dict) -> str:
+    return f"http://{proxy_element['username']}:{proxy_element['password']}@{proxy_element['proxy_address']}:{proxy_element['ports']['http']}"
+
+
+def get_proxy_mapping(proxies: list) -> dict:
+    if not proxies:
+        logger.warning("No proxies available, requesting directly")
+        return {}
+    proxy = random.choice(proxies)
+    return {"http": proxy, "https": proxy}
+
+
+def build_http_session(
+    pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES, backoff_factor: float = HTTP_BACKOFF_FACTOR
+) -> requests.Session:
+    # Retries back off exponentially on connection errors and HTTP_RETRY_STATUSES, waiting for Retry-After when sent.
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=HTTP_RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def configure_http_session(
+    pool_size: int = HTTP_POOL_SIZE, retries: int = HTTP_RETRIES, backoff_factor: float = HTTP_BACKOFF_FACTOR
+) -> requests.Session:
+    global _HTTP_SESSION
+    if _HTTP_SESSION is not None:
+        _HTTP_SESSION.close()
+    _HTTP_SESSION = build_http_session(pool_size=pool_size, retries=retries, backoff_factor=backoff_factor)
+    return _HTTP_SESSION
+
+
+def http_session() -> requests.Session:
+    if _HTTP_SESSION is None:
+        return configure_http_session()
+    return _HTTP_SESSION
 
 
 def fetch_file_url_from_do_spaces(do_filepath: str):
-    return build_client().generate_presigned_url(
+    return storage_client().generate_presigned_url(
         ClientMethod="get_object",
         Params={
             "Bucket": os.getenv("DO_BUCKET"),
@@ -56,66 +125,327 @@ def fetch_file_url_from_do_spaces(do_filepath: str):
     )
 
 
-def load_file_to_do_spaces(dataframe: pd.DataFrame, source: str = "fbref"):
-    t_now = re.sub(r"\D", "", str(date.today()))
-    gameweek = check_live_gw()
+def serialize_dataframe(dataframe: pd.DataFrame, file_format: str = "csv", index: bool = True) -> bytes:
+    if file_format == "parquet":
+        return dataframe_to_parquet(dataframe)
     csv_buffer = StringIO()
-    dataframe.to_csv(csv_buffer)
-    build_client().put_object(
-        Bucket=os.getenv("DO_BUCKET"),
-        Key=f"{source}/{t_now}_GW{gameweek}_{source}.csv",
-        Body=csv_buffer.getvalue(),
-        ACL="public-read",
+    dataframe.to_csv(csv_buffer, index=index)
+    return csv_buffer.getvalue().encode()
+
+
+def put_object_to_do_spaces(do_filepath: str, body: bytes, background: bool = False):
+    # In the background the upload is queued and its future returned, runs wait for the queue with wait_for_uploads.
+    if background:
+        return submit_upload(put_object_to_do_spaces, do_filepath, body)
+    if replaying():
+        output_path = REPLAY_OUTPUT / do_filepath
+        atomic_write(output_path, body)
+        logger.info(f"[REPLAY] Wrote {output_path} instead of uploading to Spaces")
+        return
+    with span("upload", do_filepath.split("/")[0]) as upload_span:
+        upload_bytes(os.getenv("DO_BUCKET"), do_filepath, body, ACL="public-read")
+        upload_span.add(bytes=len(body))
+
+
+def get_object_from_do_spaces(do_filepath: str) -> bytes:
+    if replaying():
+        output_path = REPLAY_OUTPUT / do_filepath
+        return output_path.read_bytes() if output_path.exists() else None
+    client = storage_client()
+    try:
+        return client.get_object(Bucket=os.getenv("DO_BUCKET"), Key=do_filepath)["Body"].read()
+    except client.exceptions.NoSuchKey:
+        return None
+
+
+def list_objects_in_do_spaces(prefix: str) -> list:
+    if replaying():
+        return sorted(path.relative_to(REPLAY_OUTPUT).as_posix() for path in REPLAY_OUTPUT.glob(f"{prefix}*"))
+    pages = storage_client().get_paginator("list_objects_v2").paginate(Bucket=os.getenv("DO_BUCKET"), Prefix=prefix)
+    return sorted(item["Key"] for page in pages for item in page.get("Contents", []))
+
+
+def load_file_to_do_spaces(
+    dataframe: pd.DataFrame,
+    source: str = "fbref",
+    file_format: str = "csv",
+    gameweek: int = None,
+    background: bool = False,
+):
+    t_now = cache_date()
+    gameweek = check_live_gw() if gameweek is None else gameweek
+    body = serialize_dataframe(dataframe, file_format=file_format)
+    return put_object_to_do_spaces(
+        do_filepath=f"{source}/{t_now}_GW{gameweek}_{source}.{file_format}", body=body, background=background
     )
 
 
+def _read_bootstrap_cache() -> dict:
+    meta_path = FPL_BOOTSTRAP_CACHE.with_suffix(".meta.json")
+    if not (FPL_BOOTSTRAP_CACHE.exists() and meta_path.exists()):
+        return {}
+    return json.loads(meta_path.read_text())
+
+
+def _write_bootstrap_cache(meta: dict) -> None:
+    atomic_write(FPL_BOOTSTRAP_CACHE.with_suffix(".meta.json"), json.dumps(meta).encode())
+
+
+def _set_bootstrap(source, fetched_at: float) -> None:
+    _BOOTSTRAP.update(source=source, fetched_at=fetched_at, sections={}, gameweek=None)
+
+
+def _bootstrap_sections(sections: tuple = None) -> dict:
+    # Sections are decoded from the payload the first time they are asked for and kept for the rest of the run.
+    if sections is None:
+        _BOOTSTRAP["sections"].update(read_sections(_BOOTSTRAP["source"]))
+        return dict(_BOOTSTRAP["sections"])
+    missing = tuple(section for section in sections if section not in _BOOTSTRAP["sections"])
+    if missing:
+        _BOOTSTRAP["sections"].update(read_sections(_BOOTSTRAP["source"], missing))
+    return {section: _BOOTSTRAP["sections"][section] for section in sections}
+
+
+def fetch_bootstrap(
+    proxies: list = None,
+    via_proxy: bool = False,
+    ttl: int = FPL_BOOTSTRAP_TTL,
+    refresh: bool = False,
+    sections: tuple = None,
+) -> dict:
+    # The payload is shared by every stage of a run: memory first, then the on-disk copy while it is younger than
+    # ttl, and past that a conditional GET so an unchanged payload costs a 304 instead of a full download.
+    # Only the requested top-level sections are decoded (all of them when sections is None), see src.fpl.bootstrap.
+    if replaying():
+        if _BOOTSTRAP["source"] is None:
+            _set_bootstrap(request_obj(url=FPL_URL_STATIC, proxies=[], via_proxy=False).content, time.time())
+        return _bootstrap_sections(sections)
+
+    now = time.time()
+    if not refresh and _BOOTSTRAP["source"] is not None and now - _BOOTSTRAP["fetched_at"] < ttl:
+        return _bootstrap_sections(sections)
+
+    meta = _read_bootstrap_cache()
+    if not refresh and meta and now - meta["fetched_at"] < ttl:
+        logger.info("Using cached FPL bootstrap-static payload")
+        _set_bootstrap(FPL_BOOTSTRAP_CACHE, meta["fetched_at"])
+        return _bootstrap_sections(sections)
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    response = request_obj(url=FPL_URL_STATIC, proxies=proxies or [], via_proxy=via_proxy, headers=headers)
+
+    if response.status_code == 304:
+        logger.info("FPL bootstrap-static not modified, revalidated cached payload")
+    elif response.status_code == 200:
+        atomic_write(FPL_BOOTSTRAP_CACHE, response.content)
+    else:
+        raise Exception(f"FPL bootstrap-static request failed with status {response.status_code}")
+
+    meta = {
+        "fetched_at": now,
+        "etag": response.headers.get("ETag", meta.get("etag")),
+        "last_modified": response.headers.get("Last-Modified", meta.get("last_modified")),
+    }
+    _write_bootstrap_cache(meta)
+    # Sections are read back from the cached file, memory-mapped, rather than from the response body.
+    _set_bootstrap(FPL_BOOTSTRAP_CACHE, now)
+    return _bootstrap_sections(sections)
+
+
+def live_gameweek(all_fpl_data: dict) -> str:
+    return next(event["name"] for event in all_fpl_data["events"] if not event["finished"]).split(" ")[1]
+
+
 @typed
 def check_live_gw() -> str:
-    proxies = fetch_proxies(debug=False)
+    # The gameweek names every uploaded object, so a failure is raised rather than written out as "GWNone".
     try:
-        all_fpl_data_raw = request_obj(url=FPL_URL_STATIC, proxies=proxies, via_proxy=True)
-        if all_fpl_data_raw.status_code != 200:
-            raise Exception
-        all_fpl_data = all_fpl_data_raw.json()
-        gameweek_list = flist(
-            [{"gw": event["name"], "finished": event["finished"]} for event in all_fpl_data["events"]]
-        )
-        return gameweek_list.filter(lambda x: not x["finished"])[0]["gw"].split(" ")[1]
+        all_fpl_data = fetch_bootstrap(proxies=fetch_proxies(debug=False), via_proxy=True, sections=("events",))
     except Exception as err:
-        logger.exception(err)
+        logger.warning(f"FPL bootstrap-static via proxy failed ({err}), requesting it directly")
+        try:
+            all_fpl_data = fetch_bootstrap(proxies=[], via_proxy=False, sections=("events",))
+        except Exception as err:
+            logger.exception(err)
+            raise
+    if _BOOTSTRAP["gameweek"] is None:
+        _BOOTSTRAP["gameweek"] = live_gameweek(all_fpl_data)
+    return _BOOTSTRAP["gameweek"]
+
+
+def _suffix_overlapping_columns(frames: list) -> list:
+    renames = merge_renames([frame.columns for frame in frames])
+    return [frame.rename(columns=rename) for frame, rename in zip(frames, renames)]
 
 
 def generate_csv(stats) -> pd.DataFrame:
-    fbref_all = pd.DataFrame({})
-    for team_stat in stats:
-        team_lvl = pd.DataFrame({})
-        logger.info(f"Formatting data for {team_stat['team'].title()}")
-        for stats in STATS_AVAILABLE:
-            if team_lvl.size == 0:
-                team_lvl = pd.DataFrame(team_stat[stats])
-            else:
-                team_lvl = pd.merge(team_lvl, pd.DataFrame(team_stat[stats]), on=["name"])
-        fbref_all = pd.concat([fbref_all, team_lvl])
-    return fbref_all
-
-
-def fetch_proxies(debug: bool = False):
+    # Rows of every team are gathered per stat category into plain column lists, so each category becomes one frame.
+    # Categories are then aligned on (team, fbref_id) in a single join, players sharing a display name stay apart.
+    with span("merge", "fbref") as merge_span:
+        key = ["team_order", "fbref_id"]
+        frames = []
+        for category in STATS_AVAILABLE:
+            columns = {"team_order": []}
+            for team_order, team_stat in enumerate(stats):
+                rows = team_stat[category]
+                columns["team_order"].extend([team_order] * len(rows))
+                for field, values in zip(rows[0]._fields if rows else (), zip(*rows)):
+                    columns.setdefault(field, []).extend(values)
+            frame = pd.DataFrame(columns).set_index(key)
+            frames.append(frame if not frames else frame.drop(columns="name"))
+
+        logger.info(f"Formatting data for {len(stats)} teams")
+        frames = _suffix_overlapping_columns(frames)
+        common = frames[0].index
+        for frame in frames[1:]:
+            common = common[common.isin(frame.index)]
+        fbref_all = pd.concat([frame.reindex(common) for frame in frames], axis=1)
+        fbref_all.insert(1, "fbref_id", common.get_level_values("fbref_id"))
+        squads = pd.Index([team_stat["team"].lower() for team_stat in stats])
+        fbref_all.insert(2, "squad", squads.take(common.get_level_values("team_order")))
+        merge_span.add(rows=len(fbref_all))
+        return fbref_all.reset_index(drop=True)
+
+
+def drop_unnamed_columns(dataframe: pd.DataFrame) -> pd.DataFrame:
+    # "Unnamed: 0" is the index of a CSV snapshot written with index=True and read back without index_col.
+    return dataframe.loc[:, ~dataframe.columns.astype(str).str.match(r"Unnamed: \d+")]
+
+
+def _projected_columns(columns: pd.Index, requested: list = None, required: set = frozenset()) -> set:
+    kept = set(requested) | required if requested else set(columns)
+    return {column for column in columns if column in kept and not str(column).startswith("Unnamed: ")}
+
+
+def fbref_ids_from_urls(profile_urls: pd.Series) -> pd.Series:
+    # https://fbref.com/en/players/<fbref_id>/<Name>
+    return profile_urls.str.split("/", n=6).str.get(5)
+
+
+def build_mapper_index(mappers: pd.DataFrame) -> pd.DataFrame:
+    # Built once per invocation and shared by every gameweek combined with the same mapping. Rows with an fbref id
+    # come first and in category order, so the categorical code of a snapshot fbref id is its mapping row.
+    mappers = drop_unnamed_columns(mappers).drop_duplicates("player_id")
+    duplicated = mappers.fbref_id.notna() & mappers.fbref_id.duplicated()
+    if duplicated.any():
+        logger.warning(f"[COMBINE] {duplicated.sum()} fbref ids mapped to several players, keeping the first")
+        mappers = mappers.assign(fbref_id=mappers.fbref_id.mask(duplicated))
+    mappers = pd.concat([mappers[mappers.fbref_id.notna()], mappers[mappers.fbref_id.isna()]])
+    return pd.DataFrame(
+        {
+            "player_id": mappers.player_id.to_numpy(),
+            "fbref_id": pd.Categorical(mappers.fbref_id, categories=pd.Index(mappers.fbref_id.dropna())),
+        }
+    )
+
+
+def _join_rows(fpl_mapper_rows: np.ndarray, fbref_codes: np.ndarray) -> tuple:
+    # Left join of the mapped FPL rows to the fbref rows sharing their mapping row, -1 where fbref has no row. An
+    # fbref id listed twice (a mid-season transfer) repeats the FPL row, like a merge would.
+    fpl_rows = np.flatnonzero(fpl_mapper_rows >= 0)
+    fpl_mapper_rows = fpl_mapper_rows[fpl_rows]
+    fbref_rows = np.flatnonzero(fbref_codes >= 0)
+    fbref_rows = fbref_rows[np.argsort(fbref_codes[fbref_rows], kind="stable")]
+    sorted_codes = fbref_codes[fbref_rows]
+    starts = np.searchsorted(sorted_codes, fpl_mapper_rows, side="left")
+    counts = np.searchsorted(sorted_codes, fpl_mapper_rows, side="right") - starts
+    repeats = np.maximum(counts, 1)
+    offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    positions = np.minimum(np.repeat(starts, repeats) + offsets, max(len(fbref_rows) - 1, 0))
+    fbref_take = np.where(np.repeat(counts, repeats) > 0, fbref_rows[positions] if len(fbref_rows) else -1, -1)
+    return np.repeat(fpl_rows, repeats), np.repeat(fpl_mapper_rows, repeats), fbref_take
+
+
+def combine_stats(
+    fbref_data: pd.DataFrame,
+    fpl_data: pd.DataFrame,
+    mappers: pd.DataFrame = None,
+    mapper_index: pd.DataFrame = None,
+    fbref_columns: list = None,
+    fpl_columns: list = None,
+) -> pd.DataFrame:
+    # Same rows and columns as merging fbref with the mapping, FPL with the mapping, and left-joining the two on
+    # player_id with _fpl/_fbref suffixes, minus the Unnamed index columns. The join runs over integer codes, each
+    # wide (and optionally projected) side is then gathered once by row position.
+    with span("merge", "combined_stats") as merge_span:
+        index = build_mapper_index(mappers) if mapper_index is None else mapper_index
+        if "player_id" not in fpl_data.columns:
+            fpl_data = fpl_data.reset_index()
+        fbref_ids = fbref_ids_from_urls(fbref_data.profile_url)
+        fbref_codes = index.fbref_id.cat.categories.get_indexer(fbref_ids)
+        fpl_mapper_rows = pd.Index(index.player_id).get_indexer(fpl_data.player_id)
+        fpl_take, mapper_take, fbref_take = _join_rows(fpl_mapper_rows, fbref_codes)
+
+        fpl_columns = _projected_columns(fpl_data.columns, fpl_columns, {"player_id"}) - {"fbref_id"}
+        fbref_columns = _projected_columns(fbref_data.columns, fbref_columns, {"fbref_id"}) - {"player_id"}
+        fpl_side = fpl_data.iloc[fpl_take, [column in fpl_columns for column in fpl_data.columns]]
+        fpl_side = fpl_side.set_axis(pd.RangeIndex(len(fpl_take)))
+        mapped_codes = index.fbref_id.cat.codes.to_numpy()[mapper_take]
+        fpl_side["fbref_id"] = index.fbref_id.cat.categories.take(mapped_codes, allow_fill=True, fill_value=np.nan)
+        fbref_side = fbref_data.set_axis(pd.RangeIndex(len(fbref_data))).reindex(
+            index=fbref_take, columns=[column for column in fbref_data.columns if column in fbref_columns]
+        )
+        fbref_side = fbref_side.set_axis(fpl_side.index)
+        # Ids parsed from the profile urls replace a scraped fbref_id column in place, as the merges did.
+        fbref_ids = np.append(fbref_ids.to_numpy(dtype=object), np.nan)[fbref_take]
+        fbref_side["fbref_id"] = pd.Series(fbref_ids, index=fbref_side.index, dtype=object)
+
+        overlap = set(fpl_side.columns) & set(fbref_side.columns)
+        fpl_side.columns = [f"{column}_fpl" if column in overlap else column for column in fpl_side.columns]
+        fbref_side.columns = [f"{column}_fbref" if column in overlap else column for column in fbref_side.columns]
+        combined_stats = pd.concat([fpl_side, fbref_side], axis=1)
+        merge_span.add(rows=len(combined_stats))
+        return combined_stats
+
+
+def fetch_proxies(debug: bool = False, refresh: bool = False):
+    global _PROXIES
+    if replaying():
+        return []
+    if _PROXIES and not refresh:
+        return _PROXIES
     logger.info("Fetching proxies...")
 
-    proxy_response = requests.get(
+    proxy_response = http_session().get(
         os.getenv("PROXY_API_URL"),
         headers={"Authorization": f"Token {os.getenv('PROXY_API_KEY')}"},
-        timeout=120,
+        timeout=HTTP_TIMEOUT,
     )
     proxies = []
     if proxy_response.status_code == 200:
         proxies = [get_proxy_format(proxy_element=elem) for elem in proxy_response.json()["results"]]
     else:
         logger.error("[ERROR] Proxies couldn't be fetched")
+    _PROXIES = proxies
     return proxies
 
 
-def request_obj(url: str, proxies: list, via_proxy: bool) -> Response:
-    if via_proxy:
-        return requests.get(url, proxies={"http": proxies}, timeout=120)
-    return requests.get(url, timeout=120)
+def request_obj(url: str, proxies: list, via_proxy: bool, headers: dict = None) -> Response:
+    if replaying():
+        return replay(url)
+
+    cached = lookup(url) if cache_enabled() else {}
+    if cached:
+        headers = {**revalidation_headers(cached), **(headers or {})}
+
+    started = time.perf_counter()
+    with span("fetch", urlparse(url).netloc) as fetch_span:
+        response = http_session().get(
+            url, headers=headers, proxies=get_proxy_mapping(proxies) if via_proxy else None, timeout=HTTP_TIMEOUT
+        )
+        fetch_span.add(bytes=len(response.content))
+    elapsed = time.perf_counter() - started
+    REQUEST_TIMINGS.append(
+        {"url": url, "status": response.status_code, "bytes": len(response.content), "seconds": round(elapsed, 4)}
+    )
+    logger.debug(f"[HTTP] {response.status_code} {url} {len(response.content)} bytes in {elapsed:.2f}s")
+
+    if cached and response.status_code == 304:
+        return load_response(refresh(url, cached, response))
+    if cache_enabled() and response.status_code == 200:
+        store(url, response)
+    return response
@@ -0,0 +1,33 @@
+import pytest
+from loguru import logger
+
+from tests.benchmarks.harness import load_baseline, measure, regression, write_report
+
+RESULTS = {}
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    return load_baseline()
+
+
+@pytest.fixture
+def bench(baseline):
+    def run(name, function, *args, **kwargs):
+        logger.disable("src")
+        try:
+            result = measure(function, *args, **kwargs)
+        finally:
+            logger.enable("src")
+        RESULTS[name] = result
+        print(f"\n[BENCH] {name}: {result}")
+        failure = regression(name, result, baseline)
+        assert not failure, failure
+        return result
+
+    return run
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if RESULTS:
+        print(f"\n[BENCH] Results written to {write_report(RESULTS)}")
@@ -0,0 +1,62 @@
+import json
+import os
+import statistics
+import subprocess
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCHMARK_DIRECTORY = Path(os.getenv("BENCH_OUTPUT_DIR", Path(__file__).parents[2] / ".benchmarks"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+MAX_REGRESSION = float(os.getenv("BENCH_MAX_REGRESSION", "0.25"))
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def measure(function, *args, repeat: int = REPEAT, **kwargs) -> dict:
+    # Timing runs without tracemalloc, which slows allocations down; peak memory is taken from one extra run.
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args, **kwargs)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    function(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds_min": round(min(timings), 6),
+        "seconds_median": round(statistics.median(timings), 6),
+        "peak_kib": round(peak / 1024, 1),
+        "repeat": repeat,
+    }
+
+
+def load_baseline() -> dict:
+    path = Path(os.getenv("BENCH_BASELINE", BENCHMARK_DIRECTORY / "baseline.json"))
+    return json.loads(path.read_text())["results"] if path.exists() else {}
+
+
+def regression(name: str, result: dict, baseline: dict) -> str:
+    # Compares the fastest run, which is the least noisy figure, against the baseline for the same benchmark.
+    previous = baseline.get(name)
+    if not previous:
+        return ""
+    ratio = result["seconds_min"] / previous["seconds_min"] - 1
+    if ratio > MAX_REGRESSION:
+        return f"{name} is {ratio:.0%} slower than baseline ({previous['seconds_min']}s -> {result['seconds_min']}s)"
+    return ""
+
+
+def write_report(results: dict) -> Path:
+    BENCHMARK_DIRECTORY.mkdir(parents=True, exist_ok=True)
+    commit = current_commit()
+    report = {"commit": commit, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    path = BENCHMARK_DIRECTORY / f"{commit}.json"
+    path.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return path
@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import features, predictions
+from src.constants import STATS_AVAILABLE, XP_MODEL
+from src.fbref import checkpoints, scraper
+from src.fbref.competitions import parse_competition_html
+from src.fpl import fixtures as fpl_fixtures
+from src.fpl.bootstrap import read_sections
+from src.fpl.downloader import extract_fpl_elements, extract_player_fpl_stats
+from src.matching import match_players
+from src.optimizer import planner
+from src.schemas import read_snapshot
+from src.store import player_history, store_snapshot
+from src.utilities import (
+    build_mapper_index,
+    combine_stats,
+    generate_csv,
+    put_object_to_do_spaces,
+)
+from tests import fixtures
+
+# Timings only, the behaviour of the same functions is tested in the modules of tests/.
+EXTRACTORS = {
+    "shooting_stats": scraper.extract_shooting_stats,
+    "passing_stats": scraper.extract_passing_stats,
+    "extra_passing_stats": scraper.extract_extra_passing_stats,
+    "gca_stats": scraper.extract_gca_stats,
+    "defensive_action_stats": scraper.extract_defensive_actions,
+    "possession_stats": scraper.extract_possession_stats,
+    "playing_time_stats": scraper.extract_playing_time_stats,
+    "misc_stats": scraper.extract_misc_stats,
+}
+
+
+@pytest.mark.parametrize("category", STATS_AVAILABLE)
+def test_extractor(bench, first_page, category):
+    bench(f"extract.{category}", EXTRACTORS[category], first_page)
+
+
+def test_extract_all_tables(bench, first_page):
+    bench("extract.all_tables", scraper.extract_all_tables, first_page)
+
+
+def test_parse_competition_page(bench):
+    bench("fbref.parse_competition_html", parse_competition_html, fixtures.synthetic_competition_page())
+
+
+@pytest.mark.parametrize("sections", [("events",), ("elements", "teams"), None])
+def test_read_bootstrap_sections(bench, sections):
+    body = fixtures.BOOTSTRAP_FIXTURE.read_bytes()
+    bench(f"fpl.read_sections.{'_'.join(sections or ('all',))}", read_sections, body, sections)
+
+
+def test_extract_player_fpl_stats(bench, bootstrap_payload, fpl_team_mapper):
+    def transform():
+        return [
+            extract_player_fpl_stats(player=player, fpl_team_mapper=fpl_team_mapper)
+            for player in bootstrap_payload["elements"]
+        ]
+
+    bench("fpl.extract_player_fpl_stats", transform)
+
+
+def test_extract_fpl_elements(bench, bootstrap_payload):
+    bench("fpl.extract_fpl_elements", extract_fpl_elements, bootstrap_payload["elements"], bootstrap_payload["teams"])
+
+
+def test_snapshot_store(bench, bootstrap_payload, tmp_path):
+    url = f"sqlite:///{tmp_path / 'snapshots.sqlite'}"
+    frame = extract_fpl_elements(bootstrap_payload["elements"], bootstrap_payload["teams"])
+    for gameweek in range(1, 7):
+        store_snapshot(frame, "fpl_official", gameweek=str(gameweek), snapshot_date=f"202108{gameweek:02d}", url=url)
+    bench("store.store_snapshot", store_snapshot, frame, "fpl_official", "7", "20210807", url=url)
+    player_ids = frame.player_id.head(20).tolist()
+    bench("store.player_history", player_history, "fpl_official", player_ids, ["form"], last_gameweeks=6, url=url)
+
+
+def test_spaces_uploads(bench, spaces):
+    bench("storage.put_object", put_object_to_do_spaces, "fbref/small.csv", b"player_id,form\n1,2.5\n")
+
+
+def test_xp_predictions(bench):
+    pytest.importorskip("sklearn")
+    model = predictions.load_model(XP_MODEL)
+    bench("xp.score_players", predictions.score_players, pd.read_csv(fixtures.XP_FEATURES_FIXTURE), model)
+
+
+def _feature_store(history):
+    store = features.FeatureStore()
+    for gameweek, frame in history.groupby("gw"):
+        store.append_gameweek(gameweek, frame)
+    return store
+
+
+def test_feature_store(bench):
+    bench("features.build_season", _feature_store, fixtures.gameweek_history())
+
+
+def test_fixture_matrix(bench):
+    gw_data = pd.read_csv(fixtures.GW_DATA_FIXTURE)
+    bench("fixtures.fixture_matrix", fpl_fixtures.fixtures_from_gw_data, gw_data)
+    matrix = fpl_fixtures.fixtures_from_gw_data(gw_data)
+    starts = np.arange(1, 39)
+    bench("fixtures.window_sums", lambda: [fpl_fixtures.window_sums(matrix, starts, window) for window in range(1, 11)])
+
+
+def test_squad_optimizer(bench):
+    pytest.importorskip("pulp")
+    snapshot = fixtures.fpl_snapshot().reset_index()
+    single = fixtures.expected_points(snapshot, [20])
+    pool = planner.candidate_pool(snapshot, single)
+    points = single.reindex(pool.player_id)[20].to_numpy()
+    bench("optimizer.plain_pulp_squad", fixtures.plain_pulp_squad, pool, points)
+    bench("optimizer.plan_squad", planner.plan_squad, pool, single, solver="pulp")
+    bench("optimizer.plan_squad_heuristic", planner.plan_squad, pool, single, solver="heuristic")
+
+    plan, _ = planner.plan_squad(pool, single, solver="pulp")
+    what_if = fixtures.expected_points(snapshot, [20, 21, 22], seed=1)
+    pool = planner.candidate_pool(snapshot, what_if, plan.player_id.tolist())
+    current = plan.player_id.tolist()
+    bench("optimizer.plan_transfers", planner.plan_squad, pool, what_if, current, bank=5, free_transfers=1)
+
+
+def test_generate_csv(bench, team_details):
+    bench("fbref.generate_csv", generate_csv, team_details)
+
+
+def test_assemble_checkpointed_shard(bench, team_details, tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS", tmp_path)
+    shard = ("premier_league", None)
+    team_urls = {team["team"].lower(): team["fbref_url"] for team in team_details}
+    for team in team_details:
+        for category in STATS_AVAILABLE:
+            checkpoints.write_unit(shard, team["team"].lower(), category, team[category])
+    bench("fbref.assemble_shard", checkpoints.assemble_shard, shard, team_urls)
+
+
+def test_combine_stats(bench, team_details):
+    fbref_data = generate_csv(team_details)
+    mappers = fixtures.mappers()
+    fbref_ids = mappers.fbref_id.tolist()
+    fbref_data["profile_url"] = [
+        f"https://fbref.com/en/players/{fbref_ids[row % len(fbref_ids)]}/Player" for row in range(len(fbref_data))
+    ]
+    mapper_index = build_mapper_index(mappers)
+    bench("combiner.combine_stats", combine_stats, fbref_data, fixtures.fpl_snapshot(), mapper_index=mapper_index)
+
+
+def test_compact_snapshot(bench):
+    plain = read_snapshot(fixtures.COMBINED_FIXTURE, compact=False)
+    result = bench("schemas.read_snapshot_compact", read_snapshot, fixtures.COMBINED_FIXTURE)
+    compact = read_snapshot(fixtures.COMBINED_FIXTURE)
+    plain_bytes = plain.memory_usage(deep=True).sum()
+    compact_bytes = compact.memory_usage(deep=True).sum()
+    result["memory_saved_kib"] = round((plain_bytes - compact_bytes) / 1024, 1)
+    print(f"[BENCH] schemas.read_snapshot_compact: {plain_bytes} -> {compact_bytes} bytes in memory")
+
+
+def test_match_players(bench):
+    bench("matching.match_players", match_players, fixtures.fpl_snapshot().reset_index(), fixtures.fbref_players())
@@ -0,0 +1,8 @@
+import pytest
+
+from tests.startup import STARTUP, python
+
+
+@pytest.mark.parametrize("entry_point", STARTUP)
+def test_startup(bench, entry_point):
+    bench(f"startup.{entry_point}", python, STARTUP[entry_point][0])
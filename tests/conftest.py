@@ -0,0 +1,52 @@
+import pytest
+
+from src import storage
+from src.fbref import scraper
+from src.fpl.downloader import extract_team_details
+from tests import fixtures
+
+
+@pytest.fixture(scope="session")
+def squad_pages():
+    return fixtures.squad_pages()
+
+
+@pytest.fixture(scope="session")
+def bootstrap_payload():
+    return fixtures.bootstrap_payload()
+
+
+@pytest.fixture(scope="session")
+def first_page(squad_pages):
+    return fixtures.as_response(next(iter(squad_pages.values())))
+
+
+@pytest.fixture(scope="session")
+def team_details(squad_pages):
+    return [
+        {"team": team.upper(), "fbref_url": "", **scraper.extract_tables_from_html(content)}
+        for team, content in squad_pages.items()
+    ]
+
+
+@pytest.fixture(scope="session")
+def fpl_team_mapper(bootstrap_payload):
+    mapper = {}
+    [mapper.update(extract_team_details(team)) for team in bootstrap_payload["teams"]]
+    return mapper
+
+
+@pytest.fixture
+def spaces(monkeypatch):
+    # moto's in-process S3, any S3-compatible server works the same through DO_ENDPOINT.
+    moto = pytest.importorskip("moto")
+    monkeypatch.delenv("DO_ENDPOINT", raising=False)
+    for name in ("DO_SPACES_KEY", "DO_SPACES_SECRET"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("DO_BUCKET", "fpl-stats")
+    monkeypatch.setenv("DO_REGION", "us-east-1")
+    with moto.mock_aws():
+        storage.reset_storage_client()
+        storage.storage_client().create_bucket(Bucket="fpl-stats")
+        yield storage.storage_client()
+    storage.reset_storage_client()
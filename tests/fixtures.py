@@ -0,0 +1,191 @@
+import gzip
+import json
+import os
+import random
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from requests.models import Response
+
+from src.constants import (
+    BENCH_WEIGHT,
+    CLUB_LIMIT,
+    FBREF_TABLES,
+    FBREF_TEAM_SLUGS,
+    LINEUP_POSITIONS,
+    LINEUP_SIZE,
+    SQUAD_BUDGET,
+    SQUAD_POSITIONS,
+    TEAM_URLS,
+    XP_LAG_VARIABLES,
+)
+from src.fbref.collections import COLLECTIONS, FIELD_TYPES
+
+REPO_DIRECTORY = Path(__file__).parents[1]
+BOOTSTRAP_FIXTURE = REPO_DIRECTORY / "notebooks/season_2021_22_gw_1.json"
+FPL_SNAPSHOT_FIXTURE = REPO_DIRECTORY / "data/fpl-data/20210125_GW19_player_stats.csv"
+MAPPER_FIXTURE = REPO_DIRECTORY / "data/off_fpl_fbref_player_mapping.csv"
+COMBINED_FIXTURE = REPO_DIRECTORY / "data/combined_stats.csv"
+XP_FEATURES_FIXTURE = REPO_DIRECTORY / "models/2020-21/unseen.csv"
+XP_PREDICTIONS_FIXTURE = REPO_DIRECTORY / "models/2020-21/gw38_predictions_2021.csv"
+GW_DATA_FIXTURE = REPO_DIRECTORY / "models/2020-21/gw_data_2021.csv"
+
+
+def as_response(content: bytes) -> Response:
+    response = Response()
+    response._content = content
+    response.status_code = 200
+    return response
+
+
+def _cell_text(field: str, kind: str, rnd: random.Random) -> str:
+    if kind == "nationality":
+        return "eng ENG"
+    if kind == "age":
+        return f"{rnd.randint(18, 35)}-{rnd.randint(0, 364):03d}"
+    if kind == "thousands":
+        return f"{rnd.randint(0, 3420):,}"
+    if kind == "text":
+        return rnd.choice(["FW", "MF", "DF", "GK"])
+    if kind == "signed":
+        return f"{rnd.uniform(-5, 5):+.1f}"
+    if kind in ("float", "to_float"):
+        return "" if kind == "to_float" and rnd.random() < 0.05 else f"{rnd.uniform(0, 100):.1f}"
+    return str(rnd.randint(0, 500))
+
+
+def synthetic_squad_page(seed: int = 0, players: int = 30) -> bytes:
+    # Same markup shape as an fbref squad page: two header rows, one row per player and two total rows per table,
+    # surrounded by unrelated markup the parser has to skip.
+    rnd = random.Random(seed)
+    roster = [(f"Player {seed}-{number}", f"{seed:02x}{number:06x}") for number in range(players)]
+    # The last player shares the first one's display name, as namesakes in one squad do on fbref.
+    roster[-1] = (roster[0][0], roster[-1][1])
+    html = ["<html><body>", "<div><p>filler</p></div>" * 500]
+    for category, table_id in FBREF_TABLES.items():
+        collection = COLLECTIONS[category]
+        field_types = FIELD_TYPES[collection]
+        fields = [field for field in collection._fields if field not in ("name", "fbref_id", "profile_url")]
+        html.append(f'<table id="{table_id}_10728"><thead><tr><th></th></tr><tr><th data-stat="player">Player</th>')
+        html.append("".join(f'<th data-stat="{field}">{field}</th>' for field in fields) + "</tr></thead><tbody>")
+        for name, fbref_id in roster + [("Squad Total", ""), ("Opponent Total", "")]:
+            link = f'<a href="/en/players/{fbref_id}/{name.replace(" ", "-")}">{name}</a>' if fbref_id else name
+            cells = "".join(
+                f'<td data-stat="{field}">{_cell_text(field, field_types.get(field, "int"), rnd)}</td>'
+                for field in fields
+            )
+            html.append(f'<tr><th data-stat="player">{link}</th>{cells}</tr>')
+        html.append("</tbody></table>")
+    html.append("</body></html>")
+    return "".join(html).encode()
+
+
+def synthetic_competition_page(team_urls: dict = TEAM_URLS, season: str = "2020-2021") -> bytes:
+    # League table of a competition page, a few unrelated squad links before it and the table linking every squad.
+    html = ["<html><body>", '<div><a href="/en/squads/00000000/Elsewhere-Stats">Elsewhere</a></div>' * 50]
+    html.append(f'<table id="results{season}91_overall"><tbody>')
+    for rank, url in enumerate(team_urls.values(), start=1):
+        squad_id, name = url.split("/")[5], url.split("/")[6]
+        href = f"/en/squads/{squad_id}/{season}/{name}"
+        html.append(f'<tr><th>{rank}</th><td data-stat="team"><a href="{href}">{name[:-6]}</a></td><td>38</td></tr>')
+    html.append("</tbody></table></body></html>")
+    return "".join(html).encode()
+
+
+def squad_pages() -> dict:
+    # Recorded pages (for example exported from the response cache) are used when BENCH_FBREF_PAGES points at a
+    # directory of *.html or *.html.gz files, otherwise a deterministic synthetic page per team is generated.
+    recorded = os.getenv("BENCH_FBREF_PAGES")
+    if recorded:
+        pages = {}
+        for path in sorted(Path(recorded).glob("*.html*")):
+            content = path.read_bytes()
+            pages[path.name.split(".")[0]] = gzip.decompress(content) if path.suffix == ".gz" else content
+        return pages
+    return {team: synthetic_squad_page(seed=seed) for seed, team in enumerate(TEAM_URLS)}
+
+
+def bootstrap_payload() -> dict:
+    return json.loads(BOOTSTRAP_FIXTURE.read_text())
+
+
+def fpl_snapshot() -> pd.DataFrame:
+    return pd.read_csv(FPL_SNAPSHOT_FIXTURE, index_col=0)
+
+
+def mappers() -> pd.DataFrame:
+    return pd.read_csv(MAPPER_FIXTURE)
+
+
+def fbref_players() -> pd.DataFrame:
+    # fbref side of a recorded combined run, with the club each row was scraped from put back as its squad.
+    combined = pd.read_csv(COMBINED_FIXTURE, low_memory=False).dropna(subset=["profile_url"])
+    squads = {slug: squad for squad, slug in FBREF_TEAM_SLUGS.items()}
+    return pd.DataFrame(
+        {
+            "fbref_id": combined.profile_url.str.split("/").str[5].values,
+            "name": combined.name_fbref.values,
+            "position": combined.position_fbref.values,
+            "squad": combined.team_slug.map(squads).values,
+        }
+    )
+
+
+def gameweek_history(players: int = 600, gameweeks: int = 38, seed: int = 0) -> pd.DataFrame:
+    # Per-gameweek stats of a season, players joining late and skipping gameweeks as in the FPL gameweek data.
+    generator = np.random.default_rng(seed)
+    player_ids = generator.choice(np.arange(1, 10 * players), size=players, replace=False)
+    joined = generator.integers(1, gameweeks + 1, size=players)
+    frames = []
+    for gameweek in range(1, gameweeks + 1):
+        playing = player_ids[(joined <= gameweek) & (generator.random(players) < 0.9)]
+        frame = pd.DataFrame(
+            generator.integers(0, 5, size=(len(playing), len(XP_LAG_VARIABLES))).astype(float),
+            columns=XP_LAG_VARIABLES,
+        )
+        frame.insert(0, "gw", gameweek)
+        frame.insert(0, "player_id", playing)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def expected_points(players: pd.DataFrame, gameweeks: list, seed: int = 0) -> pd.DataFrame:
+    generator = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            gameweek: players.points_per_game.to_numpy() * generator.uniform(0.5, 1.5, len(players))
+            for gameweek in gameweeks
+        },
+        index=players.player_id,
+    )
+
+
+def plain_pulp_squad(players: pd.DataFrame, points: np.ndarray) -> float:
+    # The notebook formulation: a new LpProblem built from pandas rows on every run.
+    import pulp
+
+    model = pulp.LpProblem("fpl_roaster", pulp.LpMaximize)
+    rows = range(players.shape[0])
+    squad = pulp.LpVariable.dict("squad", rows, cat="Binary")
+    lineup = pulp.LpVariable.dict("lineup", rows, cat="Binary")
+    captain = pulp.LpVariable.dict("captain", rows, cat="Binary")
+    model += pulp.lpSum(
+        points[idx] * (BENCH_WEIGHT * squad[idx] + (1 - BENCH_WEIGHT) * lineup[idx] + captain[idx]) for idx in rows
+    )
+    model += pulp.lpSum(squad[idx] for idx in rows) == sum(SQUAD_POSITIONS.values())
+    model += pulp.lpSum(lineup[idx] for idx in rows) == LINEUP_SIZE
+    model += pulp.lpSum(captain[idx] for idx in rows) == 1
+    model += pulp.lpSum(squad[idx] * players.loc[idx, "now_cost"] for idx in rows) <= SQUAD_BUDGET
+    for position, count in SQUAD_POSITIONS.items():
+        members = [idx for idx in rows if players.loc[idx, "position"] == position]
+        model += pulp.lpSum(squad[idx] for idx in members) == count
+        model += pulp.lpSum(lineup[idx] for idx in members) >= LINEUP_POSITIONS[position][0]
+        model += pulp.lpSum(lineup[idx] for idx in members) <= LINEUP_POSITIONS[position][1]
+    for team in players.team_slug.unique():
+        model += pulp.lpSum(squad[idx] for idx in rows if players.loc[idx, "team_slug"] == team) <= CLUB_LIMIT
+    for idx in rows:
+        model += lineup[idx] <= squad[idx]
+        model += captain[idx] <= lineup[idx]
+    model.solve(pulp.PULP_CBC_CMD(msg=False))
+    return pulp.value(model.objective)
@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+from tests.fixtures import REPO_DIRECTORY
+
+HEAVY_MODULES = ("boto3", "bs4", "lxml", "numpy", "pandas", "requests", "sqlalchemy")
+
+# What each entry point runs before doing any work, and the heavy modules it must not load while doing so.
+STARTUP = {
+    "import_scripts": ("import scripts", HEAVY_MODULES),
+    "help": ("import scripts; scripts.fbref_scraper(['--help'])", HEAVY_MODULES),
+    "fpl_data_fetcher": (
+        "from src.run_scripts import run_fpl_official",
+        ("boto3", "bs4", "lxml", "sqlalchemy", "sklearn"),
+    ),
+    "stats_combiner": (
+        "from src.run_scripts import run_stats_combiner",
+        ("boto3", "bs4", "lxml", "sqlalchemy", "sklearn"),
+    ),
+    "xp_predictions": (
+        "from src.run_scripts import run_xp_predictions",
+        ("boto3", "bs4", "lxml", "sqlalchemy", "sklearn"),
+    ),
+    "squad_optimizer": (
+        "from src.run_scripts import run_squad_optimizer",
+        ("boto3", "bs4", "lxml", "sqlalchemy", "sklearn", "pulp"),
+    ),
+}
+# Reports the loaded modules on stderr at exit, which also covers click leaving through SystemExit after --help.
+MODULE_REPORT = "import atexit, sys; atexit.register(lambda: print(' '.join(sys.modules), file=sys.stderr)); "
+
+
+def python(statement: str) -> subprocess.CompletedProcess:
+    # A fresh interpreter per run, since a module imported once stays cached for the rest of the process.
+    return subprocess.run(
+        [sys.executable, "-c", statement], cwd=REPO_DIRECTORY, capture_output=True, text=True, check=False
+    )
@@ -0,0 +1,144 @@
+import pandas as pd
+import pytest
+from bs4 import BeautifulSoup
+
+from src.constants import STATS_AVAILABLE, TEAM_URLS
+from src.fbref import checkpoints, competitions, scraper
+from src.fbref.collections import ShootingStats
+from src.fbref.competitions import parse_competition_html
+from src.schemas import fbref_columns
+from src.utilities import generate_csv
+from tests import fixtures
+
+EXTRACTORS = {
+    "shooting_stats": scraper.extract_shooting_stats,
+    "passing_stats": scraper.extract_passing_stats,
+    "extra_passing_stats": scraper.extract_extra_passing_stats,
+    "gca_stats": scraper.extract_gca_stats,
+    "defensive_action_stats": scraper.extract_defensive_actions,
+    "possession_stats": scraper.extract_possession_stats,
+    "playing_time_stats": scraper.extract_playing_time_stats,
+    "misc_stats": scraper.extract_misc_stats,
+}
+
+
+@pytest.mark.parametrize("category", STATS_AVAILABLE)
+def test_extractor(first_page, category):
+    assert EXTRACTORS[category](first_page)
+
+
+def test_extract_all_tables(first_page, monkeypatch):
+    parsed = []
+    parse_squad_html = scraper.parse_squad_html
+    monkeypatch.setattr(
+        scraper, "parse_squad_html", lambda content: parsed.append(content) or parse_squad_html(content)
+    )
+    tables = scraper.extract_all_tables(first_page)
+    # One parse of the page serves all eight tables, each the same rows as its own extractor returns.
+    assert len(parsed) == 1
+    assert tables == {category: EXTRACTORS[category](first_page) for category in STATS_AVAILABLE}
+    # Tables are found by prefix whatever competition suffix the page uses.
+    other_competition = fixtures.as_response(first_page.content.replace(b'_10728"', b'_9"'))
+    assert scraper.extract_all_tables(other_competition) == scraper.extract_all_tables(first_page)
+
+
+def test_extract_table_units(first_page):
+    # A table missing from the page is returned as its own error, the other categories are still extracted.
+    content = first_page.content.replace(b'id="stats_shooting_', b'id="removed_')
+    units = scraper.extract_table_units(content, ("shooting_stats", "passing_stats"))
+    assert isinstance(units["shooting_stats"], KeyError)
+    assert units["passing_stats"] == EXTRACTORS["passing_stats"](first_page)
+
+
+@pytest.mark.parametrize(
+    "kind, texts, expected",
+    [
+        ("text", ["Mohamed Salah", ""], ["Mohamed Salah", ""]),
+        ("signed", ["+1.2", "-0.4"], ["+1.2", "-0.4"]),
+        ("nationality", ["eg EGY"], [["eg", "EGY"]]),
+        ("age", ["28-190", ""], ["28 years and 190 days", "Age not known"]),
+        ("float", ["12.5", "0"], [12.5, 0.0]),
+        ("to_float", ["0.31", ""], [0.31, 0.0]),
+        ("thousands", ["2,520", ""], [2520.0, 0.0]),
+        ("int", ["17", "0"], [17, 0]),
+    ],
+)
+def test_convert_column(kind, texts, expected):
+    assert scraper._convert_column(kind, texts) == expected
+
+
+def test_extract_table_rows():
+    # Two header and two footer rows around the players, as on the squad pages.
+    cells = "".join(
+        f'<td data-stat="{field}">{text}</td>'
+        for field, text in [("nationality", "eg EGY"), ("position", "FW"), ("age", "28-190"), ("minutes_90s", "30.1")]
+    )
+    cells += "".join(f'<td data-stat="{field}">3</td>' for field in ShootingStats._fields[7:])
+    player = (
+        f'<tr><th data-stat="player"><a href="/en/players/e342ad68/Mohamed-Salah">Mohamed Salah</a></th>{cells}</tr>'
+    )
+    footer = '<tr><th data-stat="player">Squad Total</th></tr>'
+    table = BeautifulSoup(f"<table><tr></tr><tr></tr>{player}{footer}{footer}</table>", features="lxml").table
+
+    [row] = scraper.extract_table_rows(table, ShootingStats)
+    assert row.name == "Mohamed Salah" and row.fbref_id == "e342ad68"
+    assert row.profile_url == "https://fbref.com/en/players/e342ad68/Mohamed-Salah"
+    assert row.nationality == ["eg", "EGY"] and row.age == "28 years and 190 days" and row.minutes_90s == 30.1
+    assert row.goals == 3 and row.xg == 3.0 and row.xg_net == "3"
+
+
+def test_parse_competition_page():
+    squads = parse_competition_html(fixtures.synthetic_competition_page())
+    assert list(squads) == list(TEAM_URLS)
+    assert squads["liverpool"] == "https://fbref.com/en/squads/822bd0ba/2020-2021/Liverpool-Stats"
+
+
+def test_discover_squads_fallback(tmp_path, monkeypatch):
+    def request_obj(url, proxies, via_proxy):
+        raise ConnectionError(url)
+
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS", tmp_path)
+    monkeypatch.setattr(competitions, "request_obj", request_obj)
+    # Only the current Premier League season has known squads to fall back to.
+    squads = competitions.discover_squads([("premier_league", None), ("la_liga", None)], proxies=[])
+    assert squads == {("premier_league", None): TEAM_URLS}
+    assert checkpoints.read_squads(("premier_league", None)) is None
+
+
+def test_generate_csv(team_details):
+    # Reference: a chain of pd.merge per team on fbref_id, the way the frame used to be assembled.
+    teams = []
+    for team in team_details:
+        merged = pd.DataFrame(team[STATS_AVAILABLE[0]])
+        for category in STATS_AVAILABLE[1:]:
+            merged = merged.merge(pd.DataFrame(team[category]).drop(columns="name"), on="fbref_id")
+        teams.append(merged.assign(squad=team["team"].lower()))
+    expected = pd.concat(teams, ignore_index=True)
+
+    generated = generate_csv(team_details)
+    assert list(generated.columns) == fbref_columns() and sorted(generated.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(generated, expected[generated.columns])
+
+    # Namesakes keep their own rows and stats.
+    team = team_details[0]
+    name = team[STATS_AVAILABLE[0]][0].name
+    namesakes = generated[(generated.squad == team["team"].lower()) & (generated.name == name)]
+    assert len(namesakes) == 2 and namesakes.fbref_id.is_unique
+    for category in STATS_AVAILABLE:
+        for row in team[category]:
+            if row.name == name:
+                player = namesakes.set_index("fbref_id").loc[row.fbref_id]
+                assert all(player[field] == value for field, value in row._asdict().items() if field in player.index)
+
+
+def test_assemble_checkpointed_shard(team_details, tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS", tmp_path)
+    shard = ("premier_league", None)
+    team_urls = {team["team"].lower(): team["fbref_url"] for team in team_details}
+    assert checkpoints.missing_units(shard, team_urls) == {team: STATS_AVAILABLE for team in team_urls}
+    for team in team_details:
+        for category in STATS_AVAILABLE:
+            checkpoints.write_unit(shard, team["team"].lower(), category, team[category])
+
+    assert checkpoints.missing_units(shard, team_urls) == {}
+    assert checkpoints.assemble_shard(shard, team_urls) == team_details
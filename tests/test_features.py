@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+from src import features, run_scripts
+from src.constants import XP_FEATURES, XP_LAG_VARIABLES, XP_WINDOWS
+from src.utilities import build_mapper_index, combine_stats, generate_csv
+from tests import fixtures
+
+
+def feature_store(history, cumulative=False):
+    store = features.FeatureStore(XP_LAG_VARIABLES)
+    for gameweek, frame in history.groupby("gw"):
+        store.append_gameweek(gameweek, frame, cumulative=cumulative)
+    return store
+
+
+def test_feature_store(tmp_path, monkeypatch):
+    history = fixtures.gameweek_history()
+    store = feature_store(history)
+    # Same windows as the notebooks' groupby(player).rolling(window).sum(), taken at each player's latest gameweek.
+    history = history.sort_values(["player_id", "gw"])
+    reference = pd.DataFrame({"player_id": history.player_id.drop_duplicates().values})
+    for variable in XP_LAG_VARIABLES:
+        for window in XP_WINDOWS:
+            rolled = history.groupby("player_id")[variable].rolling(window).sum()
+            reference[f"{variable}_in_prev_{window}"] = rolled.groupby(level=0).last().values
+    lagged = store.lag_features(reference.player_id)
+    assert lagged.columns[1:].tolist() == [feature for feature in XP_FEATURES if "_in_prev_" in feature]
+    pd.testing.assert_frame_equal(lagged, reference, check_dtype=False)
+
+    # Season-to-date totals give the same windows once differenced.
+    totals = history.assign(
+        **{variable: history.groupby("player_id")[variable].cumsum() for variable in XP_LAG_VARIABLES}
+    )
+    cumulative = feature_store(totals.sort_values("gw"), cumulative=True)
+    pd.testing.assert_frame_equal(cumulative.lag_features(reference.player_id), reference, check_dtype=False)
+    with pytest.raises(ValueError):
+        store.append_gameweek(38, history[history.gw == 38])
+
+    monkeypatch.setattr(features, "FEATURE_STORE", tmp_path)
+    features.save_feature_store(store, "season")
+    loaded = features.load_feature_store("season")
+    pd.testing.assert_frame_equal(loaded.lag_features(), store.lag_features())
+
+
+def test_combined_lag_features(team_details):
+    # The default variables are the lag variables the snapshots carry, the FPL assists winning over fbref's.
+    fbref_data = generate_csv(team_details)
+    fpl_data = fixtures.fpl_snapshot()
+    assert set(features.SNAPSHOT_LAG_VARIABLES) <= set(fpl_data.columns) | set(fbref_data.columns)
+    mappers = fixtures.mappers()
+    fbref_ids = mappers.fbref_id.tolist()
+    fbref_data["profile_url"] = [
+        f"https://fbref.com/en/players/{fbref_ids[row % len(fbref_ids)]}/Player" for row in range(len(fbref_data))
+    ]
+    combined = combine_stats(fbref_data, fpl_data, mapper_index=build_mapper_index(mappers))
+    lag_frame = features.combined_lag_frame(combined)
+    assert lag_frame.player_id.is_unique and list(lag_frame.columns[1:]) == features.SNAPSHOT_LAG_VARIABLES
+    player = lag_frame.player_id.iloc[0]
+    rows = combined[combined.player_id == player]
+    assert lag_frame.assists.iloc[0] == rows.assists_fpl.iloc[0] and lag_frame.minutes.iloc[0] == rows.minutes.sum()
+
+    # The combiner appends the season-to-date totals of each gameweek once.
+    store = features.FeatureStore()
+    run_scripts._append_lag_features(store, 1, combined)
+    later = combined.assign(assists_fpl=combined.assists_fpl + 2)
+    run_scripts._append_lag_features(store, 2, later)
+    run_scripts._append_lag_features(store, 2, later)
+    lagged = store.lag_features([player])
+    assert store.gameweeks == [1, 2] and lagged.assists_in_prev_1.iloc[0] == 2
+    assert lagged.assists_in_prev_3.isna().all()
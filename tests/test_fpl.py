@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from src.fpl.bootstrap import read_sections
+from src.fpl.downloader import extract_fpl_elements, extract_player_fpl_stats
+from tests import fixtures
+
+
+@pytest.mark.parametrize("sections", [("events",), ("elements", "teams"), None])
+def test_read_bootstrap_sections(bootstrap_payload, sections):
+    body = fixtures.BOOTSTRAP_FIXTURE.read_bytes()
+    expected = {section: bootstrap_payload[section] for section in sections or bootstrap_payload}
+    assert read_sections(body, sections) == expected
+    assert read_sections(fixtures.BOOTSTRAP_FIXTURE, sections) == expected
+
+
+def test_extract_fpl_elements(bootstrap_payload, fpl_team_mapper):
+    elements, teams = bootstrap_payload["elements"], bootstrap_payload["teams"]
+    expected = pd.DataFrame.from_dict(
+        [extract_player_fpl_stats(player=player, fpl_team_mapper=fpl_team_mapper) for player in elements]
+    )
+    assert len(expected) == len(elements)
+    pd.testing.assert_frame_equal(extract_fpl_elements(elements, teams), expected)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from src.fpl import fixtures as fpl_fixtures
+from tests import fixtures
+
+
+def test_fixture_matrix():
+    gw_data = pd.read_csv(fixtures.GW_DATA_FIXTURE)
+    matrix = fpl_fixtures.fixtures_from_gw_data(gw_data)
+    starts = np.arange(1, 39)
+
+    # Same totals as summing the notebooks' per-team gameweek rows, blank gameweeks adding nothing.
+    gw_data["gameweek"] = gw_data.gw.str.replace("gw_", "").astype(int)
+    by_gameweek = gw_data.pivot_table(index="id", columns="gameweek", values="fdr", aggfunc="sum")
+    by_gameweek = by_gameweek.reindex(columns=range(1, 39), fill_value=0).fillna(0)
+    for window in (1, 3, 5, 10):
+        reference = np.stack([by_gameweek.loc[:, start : start + window - 1].sum(axis=1) for start in starts], axis=1)
+        assert (fpl_fixtures.window_sums(matrix, starts, window) == reference).all()
+    assert (matrix.fixtures.sum(axis=1) == 38).all() and (matrix.home.sum(axis=1) == 19).all()
+    assert (matrix.fixtures == 0).any() and (matrix.fixtures == 2).any()
+
+
+def test_fixtures_from_api():
+    api = fpl_fixtures.fixtures_from_api(
+        [
+            {"event": 1, "team_h": 1, "team_a": 2, "team_h_difficulty": 2, "team_a_difficulty": 4},
+            {"event": 2, "team_h": 2, "team_a": 3, "team_h_difficulty": 3, "team_a_difficulty": 3},
+            {"event": None, "team_h": 3, "team_a": 1, "team_h_difficulty": 2, "team_a_difficulty": 5},
+        ]
+    )
+    assert api.teams.tolist() == [1, 2, 3]
+    assert fpl_fixtures.window_sums(api, 1, 2).tolist() == [2, 7, 3]
+    assert fpl_fixtures.window_sums(api, 1, 2, "home").tolist() == [1, 1, 0]
+    assert np.isnan(fpl_fixtures.window_difficulty(api, 1, 1)[2])
+    assert fpl_fixtures.team_rows(api, [3, 7, 1]).tolist() == [2, -1, 0]
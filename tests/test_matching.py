@@ -0,0 +1,10 @@
+from src.matching import match_players
+from tests import fixtures
+
+
+def test_match_players():
+    fbref_players = fixtures.fbref_players()
+    matches, review = match_players(fixtures.fpl_snapshot().reset_index(), fbref_players)
+    checked = matches.merge(fixtures.mappers(), on="fbref_id", suffixes=("", "_mapped"))
+    assert (checked.player_id == checked.player_id_mapped).all()
+    assert len(matches) >= 0.9 * fbref_players.fbref_id.nunique()
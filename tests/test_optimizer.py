@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.constants import (
+    BENCH_WEIGHT,
+    CLUB_LIMIT,
+    LINEUP_POSITIONS,
+    LINEUP_SIZE,
+    SQUAD_BUDGET,
+    SQUAD_POSITIONS,
+)
+from src.optimizer import planner, problem
+from tests import fixtures
+
+
+def plan_points(plan):
+    # Objective of the plan before transfer hits: captains count twice, bench players BENCH_WEIGHT.
+    weights = np.where(plan.starting, 1.0, BENCH_WEIGHT) + plan.captain
+    return (plan.expected_points * weights).sum()
+
+
+def check_plan(plan, budget):
+    for _, squad in plan.groupby("gameweek"):
+        assert squad.position.value_counts().to_dict() == SQUAD_POSITIONS
+        assert squad.team_slug.value_counts().max() <= CLUB_LIMIT
+        assert squad.now_cost.sum() <= budget
+        lineup = squad[squad.starting].position.value_counts()
+        assert lineup.sum() == LINEUP_SIZE and squad.captain.sum() == 1
+        assert all(low <= lineup.get(position, 0) <= high for position, (low, high) in LINEUP_POSITIONS.items())
+
+
+def test_squad_optimizer(monkeypatch):
+    pytest.importorskip("pulp")
+    monkeypatch.setattr(problem, "_PROBLEMS", {})
+    snapshot = fixtures.fpl_snapshot().reset_index()
+    single = fixtures.expected_points(snapshot, [20])
+    pool = planner.candidate_pool(snapshot, single)
+    reference = fixtures.plain_pulp_squad(pool, single.reindex(pool.player_id)[20].to_numpy())
+    plan, solver = planner.plan_squad(pool, single, solver="pulp")
+    assert solver == "pulp" and abs(plan_points(plan) - reference) < 1e-6
+    check_plan(plan, SQUAD_BUDGET)
+
+    heuristic, solver = planner.plan_squad(pool, single, solver="heuristic")
+    assert solver == "heuristic" and plan_points(heuristic) >= 0.95 * reference
+    check_plan(heuristic, SQUAD_BUDGET)
+
+    # Transfer plans from the picked squad, what-if runs over the same pool reuse the problem built for it.
+    horizon = fixtures.expected_points(snapshot, [20, 21, 22], seed=1)
+    pool = planner.candidate_pool(snapshot, horizon, plan.player_id.tolist())
+    current = plan.player_id.tolist()
+    budget = 5 + plan.now_cost.sum()
+    for seed in range(2):
+        what_if = fixtures.expected_points(snapshot, [20, 21, 22], seed=seed + 1)
+        transfers, solver = planner.plan_squad(pool, what_if, current, bank=5, free_transfers=1)
+        assert solver == "pulp"
+        check_plan(transfers, budget)
+    assert len(problem._PROBLEMS) == 2
+    heuristic, _ = planner.plan_squad(pool, what_if, current, bank=5, free_transfers=1, solver="heuristic")
+    check_plan(heuristic, budget)
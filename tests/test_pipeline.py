@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from src.fbref import pipeline
+from tests import fixtures
+
+
+@pytest.fixture
+def team_urls(squad_pages, monkeypatch):
+    # Four squads, the first ones answer last so pages finish out of the order they were requested in.
+    teams = list(squad_pages)[:4]
+
+    def request_obj(url, proxies, via_proxy):
+        team = url.rsplit("/", 1)[1]
+        if team == "failing":
+            raise ConnectionError(url)
+        time.sleep(0.01 * (len(teams) - teams.index(team)))
+        return fixtures.as_response(squad_pages[team])
+
+    monkeypatch.setattr(pipeline, "request_obj", request_obj)
+    return {team: f"https://fbref.com/en/squads/{team}" for team in teams}
+
+
+def test_scrape_teams(team_urls, team_details):
+    sequential = pipeline.scrape_teams(team_urls, [])
+    expected = [{**team, "fbref_url": team_urls[team["team"].lower()]} for team in team_details[:4]]
+    assert sequential == expected
+    assert pipeline.scrape_teams(team_urls, [], fetch_workers=4) == expected
+    assert pipeline.scrape_teams(team_urls, [], fetch_workers=4, parse_workers=2) == expected
+
+
+def test_scrape_teams_failure(team_urls):
+    with pytest.raises(ConnectionError):
+        pipeline.scrape_teams({**team_urls, "failing": "https://fbref.com/en/squads/failing"}, [], fetch_workers=4)
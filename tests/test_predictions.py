@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from src import predictions
+from src.constants import XP_MODEL
+from tests import fixtures
+
+
+def test_xp_predictions():
+    pytest.importorskip("sklearn")
+    model = predictions.load_model(XP_MODEL)
+    assert predictions.load_model(XP_MODEL) is model
+    features = pd.read_csv(fixtures.XP_FEATURES_FIXTURE)
+
+    scored = predictions.score_players(features, model)
+    # Same numbers as the predictions recorded by the notebook that trained the model.
+    recorded = pd.read_csv(fixtures.XP_PREDICTIONS_FIXTURE).drop_duplicates("element")
+    compared = scored.merge(recorded[["element", "model_predictions"]], on="element")
+    assert len(compared) == len(features)
+    assert (compared.expected_points - compared.model_predictions).abs().max() < 1e-9
+    with pytest.raises(ValueError):
+        predictions.build_feature_matrix(features.drop(columns="fdr"))
@@ -0,0 +1,67 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from src import response_cache
+from src.utilities import request_obj
+
+
+@pytest.fixture
+def page_server():
+    # Serves page["body"] under page["etag"], a request sending back the current ETag is answered 304.
+    page = {"body": b"<html>v1</html>", "etag": '"v1"', "seen": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            page["seen"].append(self.headers.get("If-None-Match"))
+            not_modified = self.headers.get("If-None-Match") == page["etag"]
+            self.send_response(304 if not_modified else 200)
+            self.send_header("ETag", page["etag"])
+            self.send_header("Content-Length", "0" if not_modified else str(len(page["body"])))
+            self.end_headers()
+            if not not_modified:
+                self.wfile.write(page["body"])
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/squads/liverpool", page
+    server.shutdown()
+
+
+@pytest.fixture
+def cache_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "_CACHE", dict(response_cache._CACHE))
+    return tmp_path
+
+
+def test_revalidation(page_server, cache_root):
+    url, page = page_server
+    response_cache.configure_response_cache(fetch_date="20210801", root=cache_root)
+    assert request_obj(url, [], False).content == b"<html>v1</html>"
+
+    # An unchanged page costs a 304 and is served from the cache, a stale ETag gets the new body back and stored.
+    response_cache.configure_response_cache(fetch_date="20210802", root=cache_root)
+    response = request_obj(url, [], False)
+    assert response.status_code == 200 and response.content == b"<html>v1</html>"
+    page.update(body=b"<html>v2</html>", etag='"v2"')
+    assert request_obj(url, [], False).content == b"<html>v2</html>"
+    assert page["seen"] == [None, '"v1"', '"v1"']
+    assert response_cache.lookup(url, "20210802")["headers"]["ETag"] == '"v2"'
+
+
+def test_replay(page_server, cache_root):
+    url, page = page_server
+    response_cache.configure_response_cache(fetch_date="20210801", root=cache_root)
+    request_obj(url, [], False)
+    response_cache.configure_response_cache(replay=True, fetch_date="20210801", root=cache_root)
+    assert request_obj(url, [], False).content == b"<html>v1</html>" and len(page["seen"]) == 1
+
+    # A page missing from the replayed day is an error, never a network request.
+    response_cache.configure_response_cache(replay=True, fetch_date="20210802", root=cache_root)
+    with pytest.raises(Exception, match="No cached response"):
+        request_obj(url, [], False)
+    assert len(page["seen"]) == 1
@@ -0,0 +1,47 @@
+from io import BytesIO
+
+import pandas as pd
+
+from src.schemas import compact_dataframe, dataframe_to_parquet, read_snapshot
+from src.utilities import serialize_dataframe
+from tests import fixtures
+
+
+def test_compact_snapshot():
+    plain = read_snapshot(fixtures.COMBINED_FIXTURE, compact=False)
+    compact = read_snapshot(fixtures.COMBINED_FIXTURE)
+    assert compact.memory_usage(deep=True).sum() < 0.6 * plain.memory_usage(deep=True).sum()
+
+    assert compact.xg_net.dtype == "float32" and compact.plus_minus.dtype == "float32"
+    assert compact.team.dtype == "category" and compact.goals.dtype == "Int16" and compact.player_id.dtype == "Int32"
+    for column in plain.columns:
+        if pd.api.types.is_numeric_dtype(plain[column]) and not isinstance(compact[column].dtype, pd.CategoricalDtype):
+            difference = (plain[column] - compact[column].astype("float64")).abs().max()
+            assert pd.isna(difference) or difference <= 1e-6 * max(plain[column].abs().max(), 1), column
+        else:
+            assert (
+                plain[column]
+                .astype(object)
+                .fillna("")
+                .astype(str)
+                .equals(compact[column].astype(object).fillna("").astype(str))
+            )
+
+    # Parquet snapshots are written in the compact types, signed text included.
+    written = pd.read_parquet(BytesIO(dataframe_to_parquet(plain)))
+    assert written.dtypes.astype(str).equals(compact.dtypes.astype(str))
+    widened = compact_dataframe(pd.DataFrame({"goals": [1, 40000], "player_id": [1, None], "xg_net": ["+0.3", ""]}))
+    assert widened.dtypes.astype(str).tolist() == ["Int32", "Int32", "float32"]
+
+
+def test_parquet_round_trip():
+    compact = read_snapshot(fixtures.COMBINED_FIXTURE)
+    body = serialize_dataframe(read_snapshot(fixtures.COMBINED_FIXTURE, compact=False), file_format="parquet")
+    restored = read_snapshot(BytesIO(body), file_format="parquet")
+    # Text columns that are empty throughout come back without a type for their (empty) categories.
+    assert restored.dtypes.astype(str).equals(compact.dtypes.astype(str))
+    pd.testing.assert_frame_equal(restored.astype(object), compact.astype(object))
+
+    # Projected reads return only the requested columns.
+    projected = read_snapshot(BytesIO(body), file_format="parquet", columns=["xg", "player_id", "team"])
+    pd.testing.assert_frame_equal(projected, compact[["xg", "player_id", "team"]])
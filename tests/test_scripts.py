@@ -0,0 +1,85 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+import scripts
+from src import features, predictions, response_cache, run_scripts, utilities
+from src.constants import XP_FEATURE_STORE, XP_FEATURES, XP_MODEL
+from tests import fixtures
+
+
+@pytest.fixture
+def fbref_runs(monkeypatch):
+    # run_fbref is replaced by a recorder, the command only has to hand it the parsed options.
+    runs = []
+    monkeypatch.setattr(response_cache, "_CACHE", dict(response_cache._CACHE))
+    monkeypatch.setattr(run_scripts, "run_fbref", lambda **options: runs.append(options))
+    return runs
+
+
+@pytest.mark.parametrize("arguments, resume", [([], True), (["--resume"], True), (["--no-resume"], False)])
+def test_fbref_scraper_resume(fbref_runs, arguments, resume):
+    result = CliRunner().invoke(scripts.fbref_scraper, [*arguments, "--seasons", "2019-2020,2020-2021"])
+    assert result.exit_code == 0, result.output
+    [options] = fbref_runs
+    assert options["resume"] is resume and options["seasons"] == ["2019-2020", "2020-2021"]
+
+
+def test_xp_predictions_command(spaces, tmp_path, monkeypatch):
+    pytest.importorskip("sklearn")
+    monkeypatch.setattr(utilities, "cache_date", lambda: "20210523")
+    monkeypatch.setattr(features, "FEATURE_STORE", tmp_path)
+    # Presigned urls are read by pandas outside of moto, the snapshot is read from the bucket instead.
+    monkeypatch.setattr(
+        run_scripts,
+        "fetch_file_url_from_do_spaces",
+        lambda do_filepath: BytesIO(utilities.get_object_from_do_spaces(do_filepath)),
+    )
+    table = pd.read_csv(fixtures.XP_FEATURES_FIXTURE)
+    # The combined snapshot lists the players with their ict_index and price.
+    snapshot = table[["element", "ict_index", "value"]].rename(columns={"element": "player_id", "value": "now_cost"})
+    utilities.load_file_to_do_spaces(snapshot, source="combined_stats", gameweek=38)
+    features_path = tmp_path / "features.csv"
+    table.to_csv(features_path, index=False)
+    arguments = ["--features", str(features_path), "--gameweek", "38"]
+    key = "xp_predictions/20210523_GW38_xp_predictions.csv"
+
+    def uploaded():
+        predictions = pd.read_csv(spaces.get_object(Bucket="fpl-stats", Key=key)["Body"], index_col=0)
+        return predictions.rename(columns={"player_id": "element"})
+
+    # Without a feature store the table gives the lags too, the predictions are the ones the notebook recorded.
+    result = CliRunner().invoke(scripts.xp_predictions, arguments)
+    assert result.exit_code == 0, result.output
+    recorded = pd.read_csv(fixtures.XP_PREDICTIONS_FIXTURE).drop_duplicates("element")
+    compared = uploaded().merge(recorded[["element", "model_predictions"]], on="element")
+    assert len(compared) == len(table)
+    assert (compared.expected_points - compared.model_predictions).abs().max() < 1e-9
+
+    # The feature store's lags replace the table's, which then only has to carry the features nobody else has.
+    history = fixtures.gameweek_history()
+    player_ids = history.player_id.drop_duplicates()
+    history["player_id"] = history.player_id.map(dict(zip(player_ids, table.element)))
+    store = features.FeatureStore()
+    for gameweek, frame in history.groupby("gw"):
+        store.append_gameweek(gameweek, frame)
+    features.save_feature_store(store, XP_FEATURE_STORE)
+    remaining = [feature for feature in XP_FEATURES if feature not in store.feature_names() + ["ict_index", "value"]]
+    table[["element", *remaining]].to_csv(features_path, index=False)
+    result = CliRunner().invoke(scripts.xp_predictions, arguments)
+    assert result.exit_code == 0, result.output
+    lags = store.lag_features(table.element)
+    expected = predictions.score_players(
+        table.assign(**{feature: lags[feature].to_numpy() for feature in store.feature_names()}),
+        predictions.load_model(XP_MODEL),
+    )
+    compared = uploaded().merge(expected, on="element", suffixes=("", "_expected"))
+    assert len(compared) == len(table)
+    assert (compared.expected_points - compared.expected_points_expected).abs().max() < 1e-9
+
+    # Features neither the snapshot nor the store has are not scored as zeros, nothing is uploaded.
+    spaces.delete_object(Bucket="fpl-stats", Key=key)
+    result = CliRunner().invoke(scripts.xp_predictions, ["--gameweek", "38"])
+    assert result.exit_code == 0 and spaces.list_objects_v2(Bucket="fpl-stats", Prefix="xp_")["KeyCount"] == 0
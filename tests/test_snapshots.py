@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from src import run_scripts, snapshots
+from src.schemas import compact_dataframe
+
+
+@pytest.fixture
+def gameweek_runs(spaces, monkeypatch):
+    # Every call to load_delta_to_do_spaces is a run of GW5 on the next day.
+    dates = iter(["20210801", "20210802", "20210803"])
+    monkeypatch.setattr(snapshots, "check_live_gw", lambda: "5")
+    monkeypatch.setattr(snapshots, "cache_date", lambda: next(dates))
+
+
+def as_text(dataframe: pd.DataFrame) -> pd.DataFrame:
+    return dataframe.astype(object).astype(str).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_delta_round_trip(gameweek_runs, file_format):
+    # fbref ids that look like numbers must come back as the same text, and a player can be listed by two squads.
+    base = pd.DataFrame(
+        {
+            "fbref_id": ["00012345", "e342ad68", "e342ad68", "1e300"],
+            "squad": ["arsenal", "liverpool", "chelsea", "everton"],
+            "xg": [1.5, 7.25, 0.5, 0.0],
+        }
+    )
+    changed = base.assign(xg=[1.5, 8.0, 0.5, 0.0]).drop(index=3)
+    added = pd.concat([changed, pd.DataFrame({"fbref_id": ["0009"], "squad": ["leeds"], "xg": [0.25]})])
+
+    snapshots.load_delta_to_do_spaces(base, "fbref", file_format)
+    assert snapshots.load_delta_to_do_spaces(changed, "fbref", file_format)["deltas"][0]["changed"] == 1
+    manifest = snapshots.load_delta_to_do_spaces(added, "fbref", file_format)
+    assert [len(entry["removed"]) for entry in manifest["deltas"]] == [1, 0]
+
+    rebuilt = snapshots.read_delta_snapshot("fbref", "5")
+    pd.testing.assert_frame_equal(as_text(rebuilt), as_text(compact_dataframe(added)))
+    pd.testing.assert_frame_equal(
+        as_text(snapshots.read_delta_snapshot("fbref", "5", snapshot_date="20210801")), as_text(compact_dataframe(base))
+    )
+    projected = snapshots.read_delta_snapshot("fbref", "5", columns=["xg"])
+    assert list(projected.columns) == ["fbref_id", "xg"] and projected.xg.tolist() == added.xg.tolist()
+
+    # The combiner reads the rebuilt gameweek rather than a full snapshot.
+    combined = run_scripts._read_gameweek_snapshot("fbref", "5", {}, "csv", ["xg"])
+    pd.testing.assert_frame_equal(combined, projected)
+    assert run_scripts._read_gameweek_snapshot("fbref", "6", {}, "csv") is None
+
+
+def test_delta_same_day_reruns(spaces, monkeypatch):
+    # A resumed or retried run on the same day keeps the changes of the run before it.
+    monkeypatch.setattr(snapshots, "check_live_gw", lambda: "5")
+    monkeypatch.setattr(snapshots, "cache_date", lambda: "20210801")
+    base = pd.DataFrame({"player_id": [1, 2, 3], "form": [1.0, 2.0, 3.0]})
+    first = base.assign(form=[1.0, 9.0, 3.0])
+    second = first.assign(form=[7.0, 9.0, 3.0])
+    for dataframe in (base, first, second):
+        manifest = snapshots.load_delta_to_do_spaces(dataframe, "fpl_official")
+
+    assert len({entry["path"] for entry in manifest["deltas"]}) == 2 and "row_hashes" not in manifest
+    rebuilt = snapshots.read_delta_snapshot("fpl_official", "5")
+    assert rebuilt.form.tolist() == [7.0, 9.0, 3.0]
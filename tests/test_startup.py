@@ -0,0 +1,10 @@
+import pytest
+
+from tests.startup import MODULE_REPORT, STARTUP, python
+
+
+@pytest.mark.parametrize("entry_point", STARTUP)
+def test_startup_imports(entry_point):
+    statement, forbidden = STARTUP[entry_point]
+    loaded = set(python(MODULE_REPORT + statement).stderr.split())
+    assert not loaded.intersection(forbidden), f"{entry_point} imports {sorted(loaded.intersection(forbidden))}"
@@ -0,0 +1,23 @@
+from src import storage
+from src.utilities import (
+    get_object_from_do_spaces,
+    list_objects_in_do_spaces,
+    put_object_to_do_spaces,
+)
+
+
+def test_spaces_uploads(spaces, monkeypatch):
+    monkeypatch.setattr(storage, "UPLOAD_MULTIPART_THRESHOLD", 5 * 1024 * 1024)
+    monkeypatch.setattr(storage, "UPLOAD_PART_SIZE", 5 * 1024 * 1024)
+    assert storage.storage_client() is spaces
+
+    small, large = b"player_id,form\n1,2.5\n", bytes(range(256)) * (48 * 1024)
+    put_object_to_do_spaces("fbref/small.csv", small)
+    put_object_to_do_spaces("fbref/large.csv", large)
+    queued = [put_object_to_do_spaces(f"fbref/queued_{number}.csv", small, background=True) for number in range(8)]
+    assert storage.wait_for_uploads() == 0 and all(future.done() for future in queued)
+
+    assert get_object_from_do_spaces("fbref/small.csv") == small
+    assert get_object_from_do_spaces("fbref/large.csv") == large
+    assert "-" in spaces.head_object(Bucket="fpl-stats", Key="fbref/large.csv")["ETag"]
+    assert len(list_objects_in_do_spaces("fbref/queued_")) == 8
@@ -0,0 +1,26 @@
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+
+from src.fpl.downloader import extract_fpl_elements
+from src.store import metadata, player_history, store_engine, store_snapshot
+
+
+def test_snapshot_store(bootstrap_payload, tmp_path):
+    url = f"sqlite:///{tmp_path / 'snapshots.sqlite'}"
+    frame = extract_fpl_elements(bootstrap_payload["elements"], bootstrap_payload["teams"])
+    for gameweek in range(1, 8):
+        store_snapshot(frame, "fpl_official", gameweek=str(gameweek), snapshot_date=f"202108{gameweek:02d}", url=url)
+    # Storing the same date again replaces its rows.
+    assert store_snapshot(frame, "fpl_official", gameweek="7", snapshot_date="20210807", url=url) == len(frame)
+
+    player_ids = frame.player_id.head(20).tolist()
+    history = player_history("fpl_official", player_ids, ["form"], last_gameweeks=6, url=url)
+    assert len(history) == 6 * len(player_ids)
+    assert history.gameweek.min() == 2
+
+
+def test_migrations_match_tables(tmp_path):
+    # The revisions of db/migrations build the same tables as the collections define today.
+    engine = store_engine(f"sqlite:///{tmp_path / 'migrated.sqlite'}")
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), metadata) == []
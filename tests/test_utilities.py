@@ -0,0 +1,142 @@
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+import pytest
+
+from src import utilities
+from src.constants import HTTP_RETRY_STATUSES
+from src.utilities import (
+    build_http_session,
+    build_mapper_index,
+    combine_stats,
+    generate_csv,
+)
+from tests import fixtures
+
+
+def test_combine_stats(team_details):
+    # The fbref side reuses the generated squads, with profile ids swapped for the ids in the recorded mapper.
+    fbref_data = generate_csv(team_details)
+    mappers = fixtures.mappers()
+    fbref_ids = mappers.fbref_id.tolist()
+    fbref_data["profile_url"] = [
+        f"https://fbref.com/en/players/{fbref_ids[row % len(fbref_ids)]}/Player" for row in range(len(fbref_data))
+    ]
+    fpl_data = fixtures.fpl_snapshot()
+
+    # Reference: the merges the combiner used to run, without the Unnamed index columns.
+    merged_fbref = fbref_data.assign(fbref_id=fbref_data.profile_url.str.split("/").str[5]).merge(
+        mappers, on="fbref_id"
+    )
+    expected = fpl_data.merge(mappers, on="player_id")
+    expected = expected.merge(merged_fbref, how="left", on="player_id", suffixes=("_fpl", "_fbref"))
+    expected = expected.loc[:, ~expected.columns.str.startswith("Unnamed")]
+    combined = combine_stats(fbref_data, fpl_data, mapper_index=build_mapper_index(mappers))
+    pd.testing.assert_frame_equal(combined, expected)
+
+    projected = combine_stats(fbref_data, fpl_data, mappers, fbref_columns=["xg", "name"], fpl_columns=["form"])
+    assert list(projected.columns) == ["player_id", "form", "fbref_id_fpl", "name", "fbref_id_fbref", "xg"]
+
+
+@pytest.fixture
+def flaky_server():
+    # Answers 503 to the first request of each path and 200 afterwards, counting the requests it saw.
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append(self.path)
+            self.send_response(200 if seen.count(self.path) > 1 else 503)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", seen
+    server.shutdown()
+
+
+def test_http_session_retries(flaky_server):
+    url, seen = flaky_server
+    session = build_http_session(pool_size=4, retries=2, backoff_factor=0)
+    adapter = session.get_adapter(url)
+    assert adapter._pool_maxsize == 4 and adapter.max_retries.status_forcelist == HTTP_RETRY_STATUSES
+    assert session.get(f"{url}/bootstrap").status_code == 200
+    assert seen == ["/bootstrap", "/bootstrap"]
+
+    # Without retries the 503 is returned as is.
+    assert build_http_session(retries=0).get(f"{url}/fixtures").status_code == 503
+
+
+@pytest.fixture
+def bootstrap_server(tmp_path, monkeypatch):
+    # Serves the recorded payload with an ETag and answers 304 when it is sent back, recording the request headers.
+    requests_sent = []
+    body = fixtures.BOOTSTRAP_FIXTURE.read_bytes()
+
+    def request_obj(url, proxies, via_proxy, headers=None):
+        requests_sent.append(headers or {})
+        not_modified = (headers or {}).get("If-None-Match") == '"v1"'
+        response = fixtures.as_response(b"" if not_modified else body)
+        response.status_code = 304 if not_modified else 200
+        response.headers["ETag"] = '"v1"'
+        return response
+
+    monkeypatch.setattr(utilities, "request_obj", request_obj)
+    monkeypatch.setattr(utilities, "fetch_proxies", lambda debug: [])
+    monkeypatch.setattr(utilities, "FPL_BOOTSTRAP_CACHE", tmp_path / "bootstrap-static.json")
+    monkeypatch.setattr(utilities, "_BOOTSTRAP", {"source": None, "fetched_at": 0.0, "sections": {}, "gameweek": None})
+    return requests_sent
+
+
+def test_fetch_bootstrap(bootstrap_server, bootstrap_payload):
+    events = utilities.fetch_bootstrap(sections=("events",))
+    assert events == {"events": bootstrap_payload["events"]} and bootstrap_server == [{}]
+    # Memory serves the rest of the run, gameweek included.
+    assert utilities.fetch_bootstrap(sections=("teams",)) == {"teams": bootstrap_payload["teams"]}
+    assert utilities.check_live_gw() == utilities.live_gameweek(bootstrap_payload)
+    assert len(bootstrap_server) == 1
+
+    # A new run reads the disk copy while it is fresh, and revalidates it with a conditional GET once it is not.
+    utilities._set_bootstrap(None, 0.0)
+    assert utilities.fetch_bootstrap(sections=("events",)) == events and len(bootstrap_server) == 1
+    utilities._set_bootstrap(None, 0.0)
+    assert utilities.fetch_bootstrap(ttl=0, sections=("events",)) == events
+    assert bootstrap_server[-1] == {"If-None-Match": '"v1"'}
+    assert utilities.FPL_BOOTSTRAP_CACHE.read_bytes() == fixtures.BOOTSTRAP_FIXTURE.read_bytes()
+
+
+def test_check_live_gw_raises(bootstrap_server, bootstrap_payload, monkeypatch):
+    # A failing proxy falls back to a direct request, and when that fails too there is no gameweek to return.
+    served = utilities.request_obj
+
+    def request_obj(url, proxies, via_proxy, headers=None):
+        if via_proxy or not direct_up:
+            raise ConnectionError("connection refused")
+        return served(url, proxies, via_proxy, headers)
+
+    direct_up = True
+    monkeypatch.setattr(utilities, "request_obj", request_obj)
+    assert utilities.check_live_gw() == utilities.live_gameweek(bootstrap_payload) and len(bootstrap_server) == 1
+
+    utilities._set_bootstrap(None, 0.0)
+    utilities.FPL_BOOTSTRAP_CACHE.unlink()
+    direct_up = False
+    with pytest.raises(ConnectionError):
+        utilities.check_live_gw()
+
+
+def test_request_timings_are_bounded(flaky_server, monkeypatch):
+    url, seen = flaky_server
+    monkeypatch.setattr(utilities, "_HTTP_SESSION", build_http_session(retries=0))
+    monkeypatch.setattr(utilities, "REQUEST_TIMINGS", deque(maxlen=2))
+    for page in range(3):
+        utilities.request_obj(f"{url}/squads/{page}", [], False)
+    assert [timing["url"] for timing in utilities.REQUEST_TIMINGS] == [f"{url}/squads/1", f"{url}/squads/2"]